@@ -24,9 +24,12 @@ import os
 
 import torch
 import torch.distributed as dist
-import torch.multiprocessing as mp  # May not be strictly needed if using torchrun  # noqa: F401
+import torch.multiprocessing as mp
 
-from .src.utils import ggl
+from .src.utils import ggl, helper
+
+# Modes that are allowed to launch CPU DDP workers with the built-in spawner
+SPAWNABLE_MODES = ("train", "chain")
 
 
 def main():
@@ -60,59 +63,177 @@ def main():
         verbose,
     ) = ggl.get_arguments()
 
-    # Initialize DDP if configured and multiple GPUs are available
+    # CPU data-parallel without torchrun: spawn the workers ourselves over gloo
+    n_procs = getattr(config, "ddp_cpu_processes", 0) if config else 0
+    if (
+        config
+        and getattr(config, "use_ddp", False)
+        and "WORLD_SIZE" not in os.environ
+        and n_procs > 1
+        and mode in SPAWNABLE_MODES
+        and helper.get_ddp_backend(config) == "gloo"
+    ):
+        if verbose:
+            print(f"Spawning {n_procs} CPU DDP worker processes (gloo backend)")
+        os.environ.setdefault("MASTER_ADDR", "127.0.0.1")
+        os.environ.setdefault("MASTER_PORT", str(helper.find_free_port()))
+        mp.spawn(
+            _spawned_worker,
+            args=(
+                n_procs,
+                mode,
+                options,
+                workspace_name,
+                project_name,
+                verbose,
+                getattr(config, "resume", None),
+            ),
+            nprocs=n_procs,
+            join=True,
+        )
+        return
+
+    run_mode(config, mode, options, workspace_name, project_name, verbose)
+
+
+def _spawned_worker(
+    local_rank, n_procs, mode, options, workspace_name, project_name, verbose, resume
+):
+    """Entry point of a CPU DDP worker launched by `torch.multiprocessing.spawn`.
+
+    Sets the torch.distributed environment variables torchrun would set, reloads the project
+    config (the Config class does not survive pickling) and runs the requested mode.
+
+    Args:
+        local_rank (int): Index of the worker, provided by `mp.spawn`.
+        n_procs (int): Total number of workers.
+        mode (str): BEAD mode to run.
+        options (str): Options passed with the `-o` flag.
+        workspace_name (str): Name of the workspace.
+        project_name (str): Name of the project.
+        verbose (bool): Verbose mode.
+        resume (str): Checkpoint to resume training from, passed with the `--resume` flag.
+    """
+    os.environ["RANK"] = str(local_rank)
+    os.environ["LOCAL_RANK"] = str(local_rank)
+    os.environ["WORLD_SIZE"] = str(n_procs)
+    os.environ["LOCAL_WORLD_SIZE"] = str(n_procs)
+
+    config = ggl.load_config(workspace_name, project_name)
+    config.ddp_backend = "gloo"
+    config.resume = resume
+    run_mode(config, mode, options, workspace_name, project_name, verbose)
+
+
+def setup_ddp(config, verbose):
+    """Initializes the torch.distributed process group if DDP is requested.
+
+    Uses nccl on multi-GPU nodes and gloo for CPU data-parallel training (see
+    `helper.get_ddp_backend`). The rank information is read from the environment set by
+    torchrun or by the built-in CPU spawner.
+
+    Args:
+        config (dataClass): Base class selecting user inputs.
+        verbose (bool): Verbose mode.
+
+    Returns:
+        Tuple: (is_ddp_active, rank, local_rank, world_size)
+    """
+    rank = 0
     local_rank = 0
     world_size = 1
     is_ddp_active = False
 
-    if (
-        config
-        and hasattr(config, "use_ddp")
-        and config.use_ddp
-        and torch.cuda.is_available()
-        and torch.cuda.device_count() > 1
-    ):
-        try:
-            # LOCAL_RANK and WORLD_SIZE are set by torchrun or torch.distributed.launch
-            local_rank = int(os.environ.get("LOCAL_RANK", 0))
-            world_size = int(os.environ.get("WORLD_SIZE", 1))
-
-            if (
-                world_size > 1
-            ):  # Proceed with DDP only if world_size indicates multiple processes
-                print(
-                    f"Initializing DDP: RANK {os.environ.get('RANK')}, LOCAL_RANK {local_rank}, WORLD_SIZE {world_size}"
-                )
+    if not (config and hasattr(config, "use_ddp") and config.use_ddp):
+        return is_ddp_active, rank, local_rank, world_size
+
+    try:
+        backend = helper.get_ddp_backend(config)
+        # LOCAL_RANK and WORLD_SIZE are set by torchrun or the CPU spawner
+        rank = int(os.environ.get("RANK", 0))
+        local_rank = int(os.environ.get("LOCAL_RANK", 0))
+        world_size = int(os.environ.get("WORLD_SIZE", 1))
+
+        if (
+            world_size > 1
+        ):  # Proceed with DDP only if world_size indicates multiple processes
+            print(
+                f"Initializing DDP ({backend}): RANK {rank}, LOCAL_RANK {local_rank}, WORLD_SIZE {world_size}"
+            )
+            if backend == "nccl":
                 torch.cuda.set_device(local_rank)
-                dist.init_process_group(backend="nccl", init_method="env://")
-                is_ddp_active = True
-                if local_rank == 0 and verbose:
-                    print(
-                        f"DDP initialized. World size: {world_size}. Running on {torch.cuda.device_count()} GPUs."
-                    )
             else:
+                local_world_size = int(
+                    os.environ.get("LOCAL_WORLD_SIZE", world_size)
+                )
+                threads = helper.set_cpu_threads_per_process(
+                    config, local_rank, local_world_size
+                )
                 if verbose:
-                    print(
-                        "DDP use_ddp is True, but world_size is 1. Running in non-DDP mode."
-                    )
-                # Fallback to non-DDP if world_size is 1 (e.g. launched without torchrun on single GPU)
-                config.use_ddp = False
+                    print(f"Rank {rank}: using {threads} intra-op threads")
+            dist.init_process_group(backend=backend, init_method="env://")
+            config.ddp_backend = backend
+            is_ddp_active = True
+            if rank == 0 and verbose:
+                devices = (
+                    f"{torch.cuda.device_count()} GPUs"
+                    if backend == "nccl"
+                    else f"{world_size} CPU processes"
+                )
+                print(f"DDP initialized. World size: {world_size}. Running on {devices}.")
+        else:
+            if verbose:
+                print(
+                    "DDP use_ddp is True, but world_size is 1. Running in non-DDP mode."
+                )
+            # Fallback to non-DDP if world_size is 1 (e.g. launched without torchrun)
+            config.use_ddp = False
 
-        except KeyError:
-            print(
-                "DDP environment variables (LOCAL_RANK, WORLD_SIZE) not set. Running in non-DDP mode."
-            )
-            config.use_ddp = False  # Fallback if env vars are missing
-        except Exception as e:
-            print(f"Error initializing DDP: {e}. Running in non-DDP mode.")
-            config.use_ddp = False  # Fallback on any other DDP init error
+    except KeyError:
+        print(
+            "DDP environment variables (LOCAL_RANK, WORLD_SIZE) not set. Running in non-DDP mode."
+        )
+        config.use_ddp = False  # Fallback if env vars are missing
+    except Exception as e:
+        print(f"Error initializing DDP: {e}. Running in non-DDP mode.")
+        config.use_ddp = False  # Fallback on any other DDP init error
+        rank, local_rank, world_size = 0, 0, 1
+
+    return is_ddp_active, rank, local_rank, world_size
+
+
+def run_mode(config, mode, options, workspace_name, project_name, verbose):
+    """Sets up DDP (if configured) and dispatches the requested BEAD mode.
+
+    Args:
+        config (dataClass): Base class selecting user inputs, None for new_project mode.
+        mode (str): BEAD mode to run.
+        options (str): Options passed with the `-o` flag.
+        workspace_name (str): Name of the workspace.
+        project_name (str): Name of the project.
+        verbose (bool): Verbose mode.
+
+    Raises:
+        NameError: If the specified mode is not recognized.
+    """
+    is_ddp_active, rank, local_rank, world_size = setup_ddp(config, verbose)
 
     # Pass DDP status and ranks to helper functions if needed, or store in config
     if config:  # Ensure config is not None (e.g. for new_project mode)
         config.is_ddp_active = is_ddp_active
+        config.rank = rank
         config.local_rank = local_rank
         config.world_size = world_size
 
+    # CPU DDP workers already split the cores between them in setup_ddp, sweep trials get
+    # their own core blocks, and tune searches over the cores and threads itself
+    if (
+        config
+        and mode not in ("sweep", "select_checkpoint", "tune")
+        and not (is_ddp_active and config.ddp_backend == "gloo")
+    ):
+        helper.apply_cpu_settings(config)
+
     # Set CUDNN benchmark for potential speedup if input sizes are consistent
     if torch.cuda.is_available():
         torch.backends.cudnn.benchmark = True
@@ -146,6 +267,16 @@ def main():
         ggl.run_plots(paths, config, verbose)
     elif mode == "diagnostics":
         ggl.run_diagnostics(paths, config, verbose)
+    elif mode == "tune":
+        ggl.run_tuning(paths, config, verbose)
+    elif mode == "sweep":
+        ggl.run_sweep(paths, config, verbose)
+    elif mode == "select_checkpoint":
+        ggl.run_checkpoint_selection(paths, config, verbose)
+    elif mode == "export":
+        ggl.run_export(paths, config, verbose)
+    elif mode == "serve":
+        ggl.run_server(paths, config, verbose)
     elif mode == "chain":
         ggl.run_full_chain(
             workspace_name, project_name, paths, config, options, verbose
@@ -13,10 +13,15 @@ Classes:
     IAF: Inverse Autoregressive Flow.
     CNN_Flow: Convolutional neural network based normalizing flow.
     NSF_AR: Neural Spline Flow with autoregressive structure.
+
+Functions:
+    full_precision: Decorator running a flow's forward pass in float32 under autocast.
 """
 
 from __future__ import print_function
 
+import functools
+
 import numpy as np
 import torch
 import torch.nn as nn
@@ -33,6 +38,29 @@ from .layers import (
 )
 
 
+def full_precision(forward):
+    """
+    Runs a flow's forward pass in float32, even inside a mixed precision autocast region.
+
+    Log-det-jacobians (logs of determinants, spline bin searches, gated log-sums) lose too much
+    precision in float16/bfloat16, so floating point tensor arguments are cast to float32 and
+    autocast is disabled for the duration of the flow.
+    """
+
+    @functools.wraps(forward)
+    def wrapper(self, *args, **kwargs):
+        tensor = next((a for a in args if isinstance(a, torch.Tensor)), None)
+        device_type = tensor.device.type if tensor is not None else "cpu"
+        with torch.amp.autocast(device_type=device_type, enabled=False):
+            args = [
+                a.float() if isinstance(a, torch.Tensor) and a.is_floating_point() else a
+                for a in args
+            ]
+            return forward(self, *args, **kwargs)
+
+    return wrapper
+
+
 class Planar(nn.Module):
     def __init__(self):
         super(Planar, self).__init__()
@@ -45,6 +73,7 @@ class Planar(nn.Module):
 
         return 1 - self.h(x) ** 2
 
+    @full_precision
     def forward(self, zk, u, w, b):
         zk = zk.unsqueeze(2)
 
@@ -126,6 +155,7 @@ class Sylvester(nn.Module):
 
         return z, log_det_j
 
+    @full_precision
     def forward(self, zk, r1, r2, q_ortho, b, sum_ldj=True):
         return self._forward(zk, r1, r2, q_ortho, b, sum_ldj)
 
@@ -188,6 +218,7 @@ class TriangularSylvester(nn.Module):
 
         return z, log_det_j
 
+    @full_precision
     def forward(self, zk, r1, r2, q_ortho, b, sum_ldj=True):
         return self._forward(zk, r1, r2, q_ortho, b, sum_ldj)
 
@@ -246,6 +277,7 @@ class IAF(nn.Module):
 
         self.param_list = torch.nn.ParameterList(self.param_list)
 
+    @full_precision
     def forward(self, z, h_context):
         logdets = 0.0
         for i, flow in enumerate(self.flows):
@@ -282,6 +314,7 @@ class CNN_Flow(nn.Module):
             block = Dilation_Block(dim, kernel_size, test_mode)
             self.layers.append(block)
 
+    @full_precision
     def forward(self, x):
         logdetSum = 0
         output = x
@@ -315,6 +348,7 @@ class NSF_AR(nn.Module):
     def reset_parameters(self):
         init.uniform_(self.init_param, -1 / 2, 1 / 2)
 
+    @full_precision
     def forward(self, x):
         z = torch.zeros_like(x)
         logdets = 0  # torch.zeros(z.shape[0])
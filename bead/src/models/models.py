@@ -288,6 +288,8 @@ class ConvVAE(ConvAE):
         # log-det-jacobian = 0 without flows
         self.ldj = 0
         self.z_size = z_dim
+        # Scoring with the posterior mean sets this to False (see helper.set_scoring_mode)
+        self.sample_latents = True
 
     def encode(self, x):
         # Conv
@@ -317,6 +319,8 @@ class ConvVAE(ConvAE):
         return out
 
     def reparameterize(self, mean, logvar):
+        if not self.sample_latents:
+            return mean
         z = mean + torch.randn_like(mean) * torch.exp(0.5 * logvar)
         return z
 
@@ -8,21 +8,31 @@ and latent variables are saved for later analysis.
 
 Functions:
     seed_worker: Sets seeds for workers to ensure reproducibility.
+    score_batches: Scores batches of events and writes the outputs into the result sinks.
+    score_ensemble_batches: Scores batches of events with every member of an ensemble.
+    check_quantized_model: Quantizes a model and keeps it only if it passes the accuracy checks.
+    infer_shard: Scores one contiguous range of events (runs in a worker process).
+    infer_sharded: Scores all events in parallel worker processes.
     infer: Main function for performing inference on test data.
 """
 
+import json
 import os
 import random
 import time
 import warnings
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from types import SimpleNamespace
 
 import numpy as np
 import torch
+import torch.multiprocessing as mp
 from torch.utils.data import ConcatDataset, DataLoader
 from tqdm import TqdmExperimentalWarning
 from tqdm.rich import tqdm
 
-from ..utils import diagnostics, helper
+from ..utils import diagnostics, ensemble, helper, quantization, score_cache, sinks
 
 warnings.filterwarnings("ignore", category=TqdmExperimentalWarning)
 
@@ -37,6 +47,364 @@ def seed_worker(worker_id):
     random.seed(worker_seed)
 
 
+def score_batches(
+    model,
+    loss_fn,
+    batches,
+    config,
+    device,
+    loss_sink,
+    output_sink=None,
+    output_names=(),
+    row=0,
+    full_precision=False,
+    parameters=None,
+):
+    """
+    Runs the forward pass and the per-event losses over batches of events and writes them into
+    the result sinks, starting at a given row.
+
+    Args:
+        model (nn.Module): The model, in eval mode.
+        loss_fn (loss.BaseLoss): The loss defining the anomaly scores.
+        batches (iterable): Input tensors, one per batch, in event order.
+        config (dataClass): Base class selecting user inputs
+        device (torch.device): Device to run on
+        loss_sink (sinks.MemmapSink): Sink of the per-event loss components
+        output_sink (sinks.MemmapSink): Sink of the selected per-event outputs, or None
+        output_names (tuple): Names of the selected outputs, see `sinks.INFERENCE_OUTPUTS`
+        row (int): Row of the first event
+        full_precision (bool): If True, autocast is not used (e.g. for activation extraction)
+        parameters (list): Parameters for the regularization terms of the loss, default is the
+            parameters of `model`. A frozen exported model has its weights inlined, so the
+            parameters of the eager model are passed instead.
+
+    Returns:
+        int: The row after the last event written.
+    """
+    if parameters is None:
+        parameters = list(model.parameters())
+    num_samples = helper.set_scoring_mode(model, config)
+
+    with torch.no_grad():
+        for inputs in batches:
+            inputs = inputs.to(device)
+
+            amp_context = (
+                nullcontext() if full_precision else helper.autocast(config, device)
+            )
+            with amp_context:
+                out, targets = helper.sample_forward(model, inputs, num_samples)
+            recon, mu, logvar, ldj, z0, zk = out
+
+            # Compute the loss of every event (and posterior sample)
+            losses = loss_fn.calculate_per_event(
+                recon=recon,
+                target=targets,
+                mu=mu,
+                logvar=logvar,
+                zk=zk,
+                parameters=parameters,
+                log_det_jacobian=0,
+                generator_labels=None,
+            )
+            losses = helper.average_samples(losses, num_samples)
+            recon, mu, logvar, ldj, z0, zk = helper.average_samples(out, num_samples)
+
+            rows = slice(row, row + inputs.shape[0])
+            row = rows.stop
+            # Skipped outputs are never copied to the host
+            if output_sink is not None:
+                outputs = sinks.latents_to_numpy(mu, logvar, ldj, z0, zk)
+                if "reconstructed" in output_names:
+                    outputs["reconstructed"] = recon.detach().float().cpu().numpy()
+                output_sink.write(rows, outputs)
+            loss_sink.write(
+                rows,
+                {
+                    name: component.detach().float().cpu().numpy()
+                    for name, component in zip(
+                        loss_fn.component_names, losses, strict=True
+                    )
+                },
+            )
+
+    return row
+
+
+def score_ensemble_batches(
+    model_ensemble, loss_fn, batches, config, device, loss_sink, row=0
+):
+    """
+    Scores batches of events with every member of an ensemble in one vectorized forward pass per
+    batch, and writes the aggregated and the per-member loss components into the loss sink.
+
+    Args:
+        model_ensemble (ensemble.ModelEnsemble): The ensemble.
+        loss_fn (loss.BaseLoss): The loss defining the anomaly scores.
+        batches (iterable): Input tensors, one per batch, in event order.
+        config (dataClass): Base class selecting user inputs
+        device (torch.device): Device to run on
+        loss_sink (sinks.MemmapSink): Sink of the aggregated loss components (`<name>`) and the
+            per-member loss components (`<name>_members`, one column per member)
+        row (int): Row of the first event
+
+    Returns:
+        int: The row after the last event written.
+    """
+    aggregation = getattr(config, "ensemble_aggregation", "mean")
+    num_samples = helper.set_scoring_mode(model_ensemble.base, config)
+
+    with torch.no_grad():
+        for inputs in batches:
+            inputs = inputs.to(device)
+            with helper.autocast(config, device):
+                members = model_ensemble.score(loss_fn, inputs, num_samples)
+
+            rows = slice(row, row + inputs.shape[0])
+            row = rows.stop
+            scores = {}
+            for name, component in zip(loss_fn.component_names, members, strict=True):
+                component = component.detach().float()
+                scores[name] = ensemble.aggregate(component, aggregation).cpu().numpy()
+                scores[f"{name}_members"] = component.T.cpu().numpy()
+            loss_sink.write(rows, scores)
+
+    return row
+
+
+def check_quantized_model(model, loss_fn, datasets, config, output_path, verbose=False):
+    """
+    Quantizes the Linear layers of a model to int8 and compares it with the fp32 model on a fixed
+    random subset of the background and signal events. The comparison is written to
+    `output_path/results/quantization_check.json`.
+
+    Args:
+        model (nn.Module): The fp32 model, on CPU and in eval mode
+        loss_fn (loss.BaseLoss): The loss defining the anomaly scores
+        datasets (list): The background and the signal dataset, in this order
+        config (dataClass): Base class selecting user inputs
+        output_path (string): Path to the output directory
+        verbose (bool): If True, prints the comparison
+
+    Returns:
+        nn.Module: The quantized model, or None if it exceeds the tolerances.
+    """
+    eval_size = getattr(config, "quantization_eval_size", 10000)
+    generator = torch.Generator().manual_seed(0)
+    inputs, labels = [], []
+    for label, dataset in enumerate(datasets):
+        data = dataset.data
+        if eval_size > 0 and len(data) > eval_size:
+            rows = torch.randperm(len(data), generator=generator)[:eval_size]
+            data = data[rows.sort().values]
+        inputs.append(data.float())
+        labels.append(torch.full((len(data),), label))
+
+    quantized = quantization.quantize_model(model)
+    report = quantization.check_quantization(
+        model,
+        quantized,
+        loss_fn,
+        torch.cat(inputs),
+        torch.cat(labels),
+        max_auc_drop=getattr(config, "quantization_max_auc_drop", 0.005),
+        max_score_shift=getattr(config, "quantization_max_score_shift", 0.05),
+        batch_size=max(1, getattr(config, "inference_batch_size", 1)),
+        config=config,
+        verbose=verbose,
+    )
+    with open(
+        os.path.join(output_path, "results", "quantization_check.json"), "w"
+    ) as f:
+        json.dump(report, f, indent=2)
+
+    if not report["accepted"]:
+        print(
+            f"Quantized model rejected (AUC drop {report['auc_drop']:.4f}, "
+            f"score shift {report['score_shift']:.4f}), using the fp32 model"
+        )
+        return None
+    return quantized
+
+
+def infer_shard(
+    model_path,
+    in_shape,
+    config_values,
+    inputs,
+    start,
+    stop,
+    output_paths,
+    loss_paths,
+    exported_path=None,
+    quantized=False,
+):
+    """
+    Scores one contiguous range of events with its own model replica. Runs in a worker process
+    of `infer_sharded` and writes into the result files allocated by the parent.
+
+    Args:
+        model_path (str): Path of the saved model
+        in_shape (list): Input shape of the model
+        config_values (dict): Option values of the project config
+        inputs (torch.Tensor): All events, in shared memory
+        start (int): First event of the shard
+        stop (int): End (exclusive) of the shard
+        output_paths (dict): Output name -> path of the selected per-event outputs
+        loss_paths (dict): Loss component name -> path of the per-event losses
+        exported_path (str): Path of the exported model to score with, or None
+        quantized (bool): If True, the Linear layers of the model are quantized to int8
+
+    Returns:
+        int: Number of events scored.
+    """
+    config = SimpleNamespace(**config_values)
+    device = torch.device("cpu")
+    model = helper.load_model(model_path=model_path, in_shape=in_shape, config=config)
+    model = model.to(device).eval()
+    parameters = list(model.parameters())
+    if exported_path is not None:
+        model = helper.load_exported_model(exported_path, device)
+    elif quantized:
+        model = quantization.quantize_model(model)
+    loss_fn = helper.get_loss(config.loss_function)(config=config)
+
+    num_events = len(inputs)
+    output_sink = (
+        sinks.MemmapSink(output_paths, num_events, create=False)
+        if output_paths
+        else None
+    )
+    loss_sink = sinks.MemmapSink(loss_paths, num_events, create=False)
+    batch_size = max(1, getattr(config, "inference_batch_size", 1))
+    score_batches(
+        model,
+        loss_fn,
+        inputs[start:stop].split(batch_size),
+        config,
+        device,
+        loss_sink,
+        output_sink,
+        tuple(output_paths),
+        row=start,
+        full_precision=exported_path is not None or quantized,
+        parameters=parameters,
+    )
+    if output_sink is not None:
+        output_sink.close()
+    loss_sink.close()
+    return stop - start
+
+
+def infer_sharded(
+    model,
+    loss_fn,
+    model_path,
+    in_shape,
+    inputs,
+    config,
+    output_paths,
+    loss_paths,
+    n_workers,
+    verbose: bool = False,
+    exported_path=None,
+    quantized=False,
+    start_row=0,
+):
+    """
+    Scores all events in parallel worker processes on CPU.
+
+    The events are split into `n_workers` contiguous shards. The parent allocates the result
+    files with one event scored by `model`, then every worker loads its own model replica, is
+    pinned to its own block of cores, and writes its shard at its row offset. Event order and
+    output files are the same as in single-process inference.
+
+    Args:
+        model (nn.Module): The model loaded in the parent, used to allocate the outputs
+        loss_fn (loss.BaseLoss): The loss defining the anomaly scores
+        model_path (str): Path of the saved model, loaded by every worker
+        in_shape (list): Input shape of the model
+        inputs (torch.Tensor): All events, background followed by signal
+        config (dataClass): Base class selecting user inputs
+        output_paths (dict): Output name -> path of the selected per-event outputs
+        loss_paths (dict): Loss component name -> path of the per-event losses
+        n_workers (int): Number of worker processes
+        verbose (bool): If True, prints the shards
+        exported_path (str): Path of the exported model the workers score with, or None
+        quantized (bool): If True, the workers quantize the Linear layers of their models
+        start_row (int): First event to score, the rows before it are left to the caller
+    """
+    num_events = len(inputs)
+    device = torch.device("cpu")
+    output_sink = sinks.MemmapSink(output_paths, num_events) if output_paths else None
+    loss_sink = sinks.MemmapSink(loss_paths, num_events)
+    score_batches(
+        model,
+        loss_fn,
+        [inputs[start_row : start_row + 1]],
+        config,
+        device,
+        loss_sink,
+        output_sink,
+        tuple(output_paths),
+        row=start_row,
+        full_precision=exported_path is not None or quantized,
+    )
+    if output_sink is not None:
+        output_sink.close()
+    loss_sink.close()
+
+    bounds = np.linspace(start_row, num_events, n_workers + 1).astype(int)
+    shards = [
+        (start, stop)
+        for start, stop in zip(bounds[:-1], bounds[1:], strict=True)
+        if stop > start
+    ]
+    # With cpu_affinity the main process is already pinned to its first torch_threads cores, so
+    # the shards split the cores it was allowed before pinning. Workers that are not given a
+    # block of their own must not inherit the narrowed affinity either.
+    allowed_cores = getattr(config, "allowed_cores", None)
+    blocks, threads = helper.get_core_blocks(len(shards), cores=allowed_cores)
+    blocks = [block or allowed_cores for block in blocks]
+    ctx = mp.get_context("spawn")
+    core_blocks = ctx.Queue()
+    for block in blocks:
+        core_blocks.put((block, threads))
+    if verbose:
+        print(
+            f"Scoring {num_events} events in {len(shards)} shards "
+            f"with {threads} threads each"
+        )
+
+    inputs = inputs.share_memory_()
+    config_values = helper.config_to_dict(config)
+    with ProcessPoolExecutor(
+        max_workers=len(shards),
+        mp_context=ctx,
+        initializer=helper.init_pinned_worker,
+        initargs=(core_blocks,),
+    ) as pool:
+        futures = [
+            pool.submit(
+                infer_shard,
+                model_path,
+                in_shape,
+                config_values,
+                inputs,
+                int(start),
+                int(stop),
+                output_paths,
+                loss_paths,
+                exported_path,
+                quantized,
+            )
+            for start, stop in shards
+        ]
+        for future in futures:
+            future.result()
+
+
 def infer(
     data_bkg,
     data_sig,
@@ -60,6 +428,17 @@ def infer(
         config (dataClass): Base class selecting user inputs
         verbose (bool): Verbose mode, default is False
 
+    The events are scored in batches of `config.inference_batch_size`, with the loss components
+    computed per event. Outputs and per-event losses are written straight into preallocated
+    memory-mapped `.npy` files in `output_path/results` (see `sinks.MemmapSink`).
+    `config.inference_outputs` selects what is written besides the scores: "scores" (nothing
+    else), "latents" or "all" (latents and reconstructions). With `config.use_score_cache`, the
+    background rows are reused from `output_path/score_cache` when the model, the options and the
+    background inputs are unchanged (see `score_cache.cache_key`), and only the signal is scored.
+    With `config.ensemble_models`, all listed models are scored in one vectorized forward pass;
+    the scores aggregated by `config.ensemble_aggregation` keep the usual file names and the
+    per-member scores are written to `<component>_members_test.npy`.
+
     Returns:
         bool: True if inference was successful, False otherwise
     """
@@ -81,7 +460,9 @@ def infer(
         events_sig,
         jets_sig,
         constituents_sig,
-    ) = data_bkg + data_sig
+    ) = (
+        data_bkg + data_sig
+    )
 
     (
         events_bkg_label,
@@ -90,7 +471,9 @@ def infer(
         events_sig_label,
         jets_sig_label,
         constituents_sig_label,
-    ) = labels_bkg + labels_sig
+    ) = (
+        labels_bkg + labels_sig
+    )
 
     if verbose:
         print("Data and labels split")
@@ -183,6 +566,69 @@ def infer(
     model = model.to(device)
     model.eval()
 
+    # The exported model (see the export mode) replaces the eager model for scoring. The loss
+    # regularization terms still read the eager parameters, as the frozen model inlines them.
+    # Forward hooks for activation extraction need the eager model.
+    parameters = list(model.parameters())
+
+    # An ensemble scores all member models in one vectorized forward pass per batch, in place of
+    # the single model
+    model_ensemble = None
+    member_paths = [model_path]
+    ensemble_models = getattr(config, "ensemble_models", [])
+    if ensemble_models and config.activation_extraction:
+        print("Activation extraction needs a single model, not using the ensemble")
+    elif ensemble_models:
+        member_paths = ensemble.resolve_member_paths(
+            ensemble_models, os.path.dirname(model_path)
+        )
+        model_ensemble = ensemble.ModelEnsemble(
+            [
+                helper.load_model(model_path=path, in_shape=in_shape, config=config)
+                .to(device)
+                .eval()
+                for path in member_paths
+            ]
+        )
+        if verbose:
+            print(f"Scoring with an ensemble of {len(member_paths)} models")
+
+    exported_path = None
+    if getattr(config, "use_exported_model", False) and model_ensemble is None:
+        if config.activation_extraction:
+            print(
+                "Activation extraction needs the eager model, not using the exported model"
+            )
+        else:
+            exported_path = os.path.join(os.path.dirname(model_path), "model_frozen.pt")
+            exported, metadata = helper.load_exported_model(
+                exported_path, device, return_metadata=True
+            )
+            # The latent sampling is traced into the export, so it must match the scoring mode
+            if helper.exported_scoring_matches(metadata, config):
+                model = exported
+                if verbose:
+                    print(f"Using the exported model {exported_path}")
+            else:
+                print(
+                    f"The exported model was exported with scoring_mode="
+                    f"{metadata.get('scoring_mode', 'unknown')}, not "
+                    f"{getattr(config, 'scoring_mode', 'sample')}. Using the eager model, "
+                    f"run the export mode again to use the exported model"
+                )
+                exported_path = None
+    elif (
+        getattr(config, "use_compile", False)
+        and not getattr(config, "use_quantized_model", False)
+        and model_ensemble is None
+        and not config.activation_extraction
+    ):
+        helper.enable_compile_cache(os.path.join(output_path, "compile_cache"))
+        model = helper.compile_model(model, config, verbose=verbose)
+
+    # Losses are computed per event, so the anomaly scores do not depend on the batch size
+    inference_batch_size = max(1, getattr(config, "inference_batch_size", 1))
+
     if verbose:
         print(f"Model loaded from {model_path}")
         print(f"Model architecture:\n{model}")
@@ -190,7 +636,10 @@ def infer(
         print("Inputs and model moved to device")
         # Pushing input data into the torch-DataLoader object and combines into one DataLoader object (a basic wrapper
         # around several DataLoader objects).
-        print("Loading data into DataLoader and using batch size of ", 1)
+        print(
+            "Loading data into DataLoader and using batch size of ",
+            inference_batch_size,
+        )
 
     if config.deterministic_algorithm:
         if config.verbose:
@@ -206,13 +655,13 @@ def infer(
         test_dl_list = [
             DataLoader(
                 ds,
-                batch_size=1,  # since we want the loss for every event, which then becomes the anomaly metric
+                batch_size=inference_batch_size,
                 shuffle=False,
-                worker_init_fn=seed_worker,
                 generator=g,
-                drop_last=True,
-                num_workers=config.parallel_workers,
-                pin_memory=True,
+                drop_last=False,
+                **helper.get_dataloader_kwargs(
+                    config, device, worker_init_fn=seed_worker
+                ),
             )
             for ds in [ds["events"], ds["jets"], ds["constituents"]]
         ]
@@ -221,11 +670,10 @@ def infer(
         test_dl_list = [
             DataLoader(
                 ds,
-                batch_size=1,
+                batch_size=inference_batch_size,
                 shuffle=False,
-                drop_last=True,
-                num_workers=config.parallel_workers,
-                pin_memory=True,
+                drop_last=False,
+                **helper.get_dataloader_kwargs(config, device),
             )
             for ds in [ds["events"], ds["jets"], ds["constituents"]]
         ]
@@ -249,130 +697,217 @@ def infer(
     # Select Loss Function
     try:
         loss_object = helper.get_loss(config.loss_function)
+        # The loss is not compiled: the per-event losses run it under torch.func.vmap
         loss_fn = loss_object(config=config)
         if verbose:
             print(f"Loss Function: {config.loss_function}")
     except ValueError as e:
         print(e)
 
-    # Output Lists
-    test_loss_data = []
-    reconstructed_data = []
-    mu_data = []
-    logvar_data = []
-    z0_data = []
-    zk_data = []
-    log_det_jacobian_data = []
+    # Per-event outputs are written into preallocated memory-mapped .npy files as the batches are
+    # produced, so detect can run on test sets larger than memory
+    inference_outputs = getattr(config, "inference_outputs", "all")
+    if inference_outputs not in sinks.INFERENCE_OUTPUTS:
+        raise ValueError(
+            f"Unsupported inference_outputs: {inference_outputs}. "
+            f"Choose from {', '.join(sinks.INFERENCE_OUTPUTS)}."
+        )
+    output_names = sinks.INFERENCE_OUTPUTS[inference_outputs]
+    if model_ensemble is not None and output_names:
+        print("Ensembles only write the anomaly scores, ignoring inference_outputs")
+        output_names = ()
+    save_dir = os.path.join(output_path, "results")
+    output_paths = {
+        name: os.path.join(save_dir, f"test_{name}_data.npy")
+        for name in sinks.INFERENCE_OUTPUTS["all"]
+    }
+    # Outputs of an earlier run that are not written now would no longer match the scores
+    for name, path in output_paths.items():
+        if name not in output_names and os.path.exists(path):
+            os.remove(path)
+
+    loss_paths = {
+        name: os.path.join(save_dir, f"{name}_test.npy")
+        for name in loss_fn.component_names
+    }
+    # The aggregated scores keep the usual file names, the member scores go next to them
+    if model_ensemble is not None:
+        loss_paths.update(
+            {
+                f"{name}_members": os.path.join(save_dir, f"{name}_members_test.npy")
+                for name in loss_fn.component_names
+            }
+        )
+    selected_paths = {name: output_paths[name] for name in output_names}
+
+    # The int8 model is only used if it keeps the AUC and the score distribution of the fp32 model
+    quantized = False
+    if (
+        getattr(config, "use_quantized_model", False)
+        and exported_path is None
+        and model_ensemble is None
+    ):
+        if device.type != "cpu" or config.activation_extraction:
+            print(
+                "Quantized inference needs a CPU and no activation extraction, using fp32"
+            )
+        else:
+            quantized_model = check_quantized_model(
+                model, loss_fn, test_dl.dataset.datasets, config, output_path, verbose
+            )
+            if quantized_model is not None:
+                model, quantized = quantized_model, True
+                if verbose:
+                    print("Using the int8 quantized model")
+
+    # Background rows scored before by the same model, options and background inputs are taken
+    # from the cache, and only the remaining events are scored
+    bkg_dataset, sig_dataset = test_dl.dataset.datasets
+    num_events, num_bkg = len(test_dl.dataset), len(bkg_dataset)
+    cache, cache_key, cached = None, None, None
+    if getattr(config, "use_score_cache", False) and not config.activation_extraction:
+        cache = score_cache.ScoreCache(
+            os.path.join(output_path, "score_cache"),
+            max_entries=getattr(config, "score_cache_size", 4),
+        )
+        cache_key = score_cache.cache_key(
+            member_paths + ([exported_path] if exported_path else []),
+            config,
+            bkg_dataset.data,
+            extra={"quantized": quantized},
+        )
+        cached = cache.load(cache_key, list(selected_paths) + list(loss_paths))
+        if verbose:
+            print(
+                f"Background scores {'found in' if cached is not None else 'not in'} "
+                f"the score cache"
+            )
+    first_row = num_bkg if cached is not None else 0
 
     start = time.time()
 
-    # Registering hooks for activation extraction
-    if config.activation_extraction:
-        hooks = model.store_hooks()
-
     if verbose:
         print("Beginning Inference")
 
-    # Inference
-    parameters = model.parameters()
-
-    with torch.no_grad():
-        for idx, batch in enumerate(tqdm(test_dl)):
-            inputs, labels = batch
-            inputs = inputs.to(device)
+    # Parallel CPU inference shards the events over worker processes with their own models
+    inference_workers = getattr(config, "inference_workers", 0)
+    sharded = (
+        inference_workers > 1
+        and device.type == "cpu"
+        and not config.activation_extraction
+        and model_ensemble is None
+        and first_row < num_events
+    )
+    if sharded:
+        infer_sharded(
+            model,
+            loss_fn,
+            model_path,
+            in_shape,
+            torch.cat([dataset.data for dataset in test_dl.dataset.datasets]),
+            config,
+            selected_paths,
+            loss_paths,
+            inference_workers,
+            verbose,
+            exported_path,
+            quantized,
+            start_row=first_row,
+        )
 
-            out = helper.call_forward(model, inputs)
-            recon, mu, logvar, ldj, z0, zk = out
+    # The sharded workers have allocated the outputs already
+    output_sink = (
+        sinks.MemmapSink(selected_paths, num_rows=num_events, create=not sharded)
+        if output_names
+        else None
+    )
+    loss_sink = sinks.MemmapSink(loss_paths, num_rows=num_events, create=not sharded)
+    if cached is not None:
+        rows = slice(0, num_bkg)
+        if output_sink is not None:
+            output_sink.write(rows, {name: cached[name] for name in selected_paths})
+        loss_sink.write(rows, {name: cached[name] for name in loss_paths})
+
+    if not sharded:
+        # Registering hooks accumulating the activation statistics over the whole dataset
+        if config.activation_extraction:
+            recorder = diagnostics.ActivationRecorder(model.get_layers())
+
+        score_dl = test_dl
+        if first_row > 0:
+            score_dl = DataLoader(
+                sig_dataset,
+                batch_size=inference_batch_size,
+                shuffle=False,
+                drop_last=False,
+                **helper.get_dataloader_kwargs(
+                    config,
+                    device,
+                    worker_init_fn=(
+                        seed_worker if config.deterministic_algorithm else None
+                    ),
+                ),
+            )
 
-            # Compute the loss
-            losses = loss_fn.calculate(
-                recon=recon,
-                target=inputs,
-                mu=mu,
-                logvar=logvar,
-                zk=zk,
+        if model_ensemble is not None:
+            score_ensemble_batches(
+                model_ensemble,
+                loss_fn,
+                (inputs for inputs, _ in tqdm(score_dl)),
+                config,
+                device,
+                loss_sink,
+                row=first_row,
+            )
+        else:
+            # Activations are extracted in full precision, and the exported and quantized models
+            # run without autocast
+            score_batches(
+                model,
+                loss_fn,
+                (inputs for inputs, _ in tqdm(score_dl)),
+                config,
+                device,
+                loss_sink,
+                output_sink,
+                output_names,
+                row=first_row,
+                full_precision=(
+                    config.activation_extraction
+                    or exported_path is not None
+                    or quantized
+                ),
                 parameters=parameters,
-                log_det_jacobian=0,
-                generator_labels=None,
             )
 
-            test_loss_data.append(losses)
-            reconstructed_data.append(recon.detach().cpu().numpy())
-            mu_data.append(mu.detach().cpu().numpy())
-            logvar_data.append(logvar.detach().cpu().numpy())
-            log_det_jacobian_data.append(ldj.detach().cpu().numpy())
-            z0_data.append(z0.detach().cpu().numpy())
-            zk_data.append(zk.detach().cpu().numpy())
+    if output_sink is not None:
+        output_sink.close()
+    loss_sink.close()
+
+    if cache is not None and cached is None:
+        cache.save(
+            cache_key,
+            {
+                name: np.load(path, mmap_mode="r")[:num_bkg]
+                for name, path in {**selected_paths, **loss_paths}.items()
+            },
+        )
 
     end = time.time()
 
     # Saving activations values
     if config.activation_extraction:
-        activations = diagnostics.dict_to_square_matrix(model.get_activations())
-        model.detach_hooks(hooks)
-        np.save(os.path.join(output_path, "models", "activations.npy"), activations)
+        recorder.remove()
+        np.save(
+            os.path.join(output_path, "models", "activations.npy"),
+            recorder.nap_matrix(),
+        )
+        np.save(
+            os.path.join(output_path, "models", "activations_std.npy"),
+            recorder.nap_matrix("std"),
+        )
 
     if verbose:
         print(f"Inference took {(end - start) / 60:.3} minutes")
 
-    # Convert all the data to numpy arrays
-    (
-        reconstructed_data,
-        mu_data,
-        logvar_data,
-        z0_data,
-        zk_data,
-        log_det_jacobian_data,
-    ) = [
-        np.array(x)
-        for x in [
-            reconstructed_data,
-            mu_data,
-            logvar_data,
-            z0_data,
-            zk_data,
-            log_det_jacobian_data,
-        ]
-    ]
-
-    # Reshape the data
-    (reconstructed_data, mu_data, logvar_data, z0_data, zk_data) = [
-        x.reshape(x.shape[0] * x.shape[1], *x.shape[2:])
-        for x in [reconstructed_data, mu_data, logvar_data, z0_data, zk_data]
-    ]
-
-    # Save all the data
-    save_dir = os.path.join(output_path, "results")
-    np.save(
-        os.path.join(save_dir, "test_reconstructed_data.npy"),
-        reconstructed_data,
-    )
-    np.save(
-        os.path.join(save_dir, "test_mu_data.npy"),
-        mu_data,
-    )
-    np.save(
-        os.path.join(save_dir, "test_logvar_data.npy"),
-        logvar_data,
-    )
-    np.save(
-        os.path.join(save_dir, "test_z0_data.npy"),
-        z0_data,
-    )
-    np.save(
-        os.path.join(save_dir, "test_zk_data.npy"),
-        zk_data,
-    )
-    np.save(
-        os.path.join(save_dir, "test_log_det_jacobian_data.npy"),
-        log_det_jacobian_data,
-    )
-
-    helper.save_loss_components(
-        loss_data=test_loss_data,
-        component_names=loss_fn.component_names,
-        suffix="test",
-        save_dir=save_dir,
-    )
-
     return True
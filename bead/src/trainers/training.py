@@ -7,25 +7,32 @@ Functions:
     fit: Performs one epoch of training on the training set.
     validate: Evaluates the model on the validation set.
     seed_worker: Sets seeds for workers to ensure reproducibility.
+    collect_latents: Streams the latents of a dataset into memory-mapped outputs.
+    get_training_state: Collects the full training state for checkpointing.
+    load_training_state: Restores a training state saved in a checkpoint.
+    is_full_validation_epoch: Checks if an epoch ends with a full validation.
     train: Main function that handles the entire training process.
 """
 
+import json
+import math
 import os
 import random
 import time
 import warnings
+from contextlib import nullcontext
 
 import numpy as np
 import torch
 import torch.amp
 import torch.distributed as dist
 from torch.nn.parallel import DistributedDataParallel as DDP
-from torch.utils.data import DataLoader
+from torch.utils.data import DataLoader, RandomSampler, Subset
 from torch.utils.data.distributed import DistributedSampler
 from tqdm import TqdmExperimentalWarning
 from tqdm.rich import tqdm
 
-from ..utils import helper
+from ..utils import checkpointing, diagnostics, helper, loss, sinks, tuning
 from ..utils.annealing import AnnealingManager
 
 warnings.filterwarnings("ignore", category=TqdmExperimentalWarning)
@@ -43,6 +50,9 @@ def fit(
     local_rank,
     epoch_num,
     verbose: bool = False,
+    latent_recorder=None,
+    profiler=None,
+    step_callback=None,
 ):
     """
     This function trains the model on the train set. It computes the losses and does the backwards propagation, and updates the optimizer as well.
@@ -54,9 +64,17 @@ def fit(
         loss_fn (lossObject): Defines the loss function used to train the model
         optimizer (torch.optim): Chooses optimizer for gradient descent.
         device (torch.device): Chooses which device to use with torch
-        scaler (torch.cuda.amp.GradScaler): Scaler for mixed precision training
+        scaler (torch.amp.GradScaler): Scaler for mixed precision training
         is_ddp_active (bool): Flag indicating if DDP is active
         local_rank (int): Local rank of the process in DDP
+        latent_recorder (sinks.EpochLatentRecorder): If given, the latents of every batch are
+            written out from the training forward passes
+        profiler (diagnostics.TrainingProfiler): If given, records sampled per-phase step timings
+        step_callback (callable): If given, called without arguments after every optimizer step
+            (e.g. to validate every n steps)
+
+    `config.gradient_accumulation_steps` micro-batches are accumulated per optimizer step, so the
+    effective batch size per rank is `batch_size * gradient_accumulation_steps`.
 
     Returns:
         list, model object: Training losses, Epoch_loss and trained model
@@ -84,43 +102,75 @@ def fit(
     else:
         pbar = dataloader
 
+    if profiler is None:
+        profiler = diagnostics.TrainingProfiler(enabled=False)
+
+    # Gradients of `accumulation_steps` micro-batches are summed before each optimizer step
+    accumulation_steps = max(1, getattr(config, "gradient_accumulation_steps", 1))
+
     for _idx, batch in enumerate(pbar):
+        profiler.step_begin(epoch_num, _idx)
         inputs, gen_labels = batch
-        inputs = inputs.to(device, non_blocking=True)
-        gen_labels = gen_labels.to(device, non_blocking=True)
-        optimizer.zero_grad(set_to_none=True)
-
-        with torch.amp.autocast(
-            device_type=device.type,
-            dtype=torch.float16
-            if config.use_amp and device.type == "cuda"
-            else torch.float32,
-            enabled=(config.use_amp and device.type == "cuda"),
-        ):
-            out = helper.call_forward(ddp_model, inputs)
-            recon, mu, logvar, ldj, z0, zk = out
+        with profiler.phase("h2d"):
+            inputs = inputs.to(device, non_blocking=True)
+            gen_labels = gen_labels.to(device, non_blocking=True)
 
-            losses = loss_fn.calculate(
-                recon=recon,
-                target=inputs,
-                mu=mu,
-                logvar=logvar,
-                zk=zk,
-                parameters=model_for_loss_params.parameters(),
-                log_det_jacobian=ldj
-                if hasattr(ldj, "item")
-                else torch.tensor(0.0, device=device),  # ldj gets extra love
-                generator_labels=gen_labels,
-            )
-        loss, *_ = losses
+        group_start = _idx - _idx % accumulation_steps
+        # The last group of an epoch may hold fewer micro-batches
+        group_size = min(accumulation_steps, actual_num_batches_for_rank - group_start)
+        is_optimizer_step = _idx == group_start + group_size - 1
+        if _idx == group_start:
+            optimizer.zero_grad(set_to_none=True)
+
+        # Skip the gradient all-reduce on all but the last micro-batch of a group
+        sync_context = (
+            ddp_model.no_sync()
+            if is_ddp_active and not is_optimizer_step
+            else nullcontext()
+        )
+
+        with sync_context:
+            with profiler.phase("forward"), helper.autocast(config, device):
+                out = helper.call_forward(ddp_model, inputs)
+            # The loss (KL, log-det-jacobian, reductions) is computed in float32 outside autocast
+            recon, mu, logvar, ldj, z0, zk = helper.outputs_to_float(out)
+            if latent_recorder is not None:
+                latent_recorder(_idx, mu, logvar, ldj, z0, zk)
+
+            with profiler.phase("loss"):
+                losses = loss_fn.calculate(
+                    recon=recon,
+                    target=inputs,
+                    mu=mu,
+                    logvar=logvar,
+                    zk=zk,
+                    parameters=model_for_loss_params.parameters(),
+                    log_det_jacobian=ldj
+                    if hasattr(ldj, "item")
+                    else torch.tensor(0.0, device=device),  # ldj gets extra love
+                    generator_labels=gen_labels,
+                )
+            loss, *_ = losses
 
-        scaler.scale(loss).backward()
-        scaler.step(optimizer)
-        scaler.update()
+            # Averaging over the micro-batches keeps the gradient scale of one large batch
+            with profiler.phase("backward"):
+                scaler.scale(loss / group_size).backward()
+
+        if is_optimizer_step:
+            with profiler.phase("optimizer"):
+                scaler.step(optimizer)
+                scaler.update()
 
         running_loss += loss.item()
         num_batches_processed_this_rank += 1
 
+        # Step-based validation is timed as a phase of its step, so that it is not counted as
+        # data wait of the next step
+        if is_optimizer_step and step_callback is not None:
+            with profiler.phase("validation"):
+                step_callback()
+        profiler.step_end(inputs.shape[0])
+
     # DDP sanity check
     if num_batches_processed_this_rank == 0:
         epoch_loss_train = 0.0
@@ -198,27 +248,21 @@ def validate(
             inputs = inputs.to(device, non_blocking=True)
             gen_labels = gen_labels.to(device, non_blocking=True)
 
-            with torch.amp.autocast(
-                device_type=device.type,
-                dtype=torch.float16
-                if config.use_amp and device.type == "cuda"
-                else torch.float32,
-                enabled=(config.use_amp and device.type == "cuda"),
-            ):
+            with helper.autocast(config, device):
                 out = helper.call_forward(ddp_model, inputs)
-                recon, mu, logvar, ldj, z0, zk = out
-                losses = loss_fn.calculate(
-                    recon=recon,
-                    target=inputs,
-                    mu=mu,
-                    logvar=logvar,
-                    zk=zk,
-                    parameters=model_for_loss_params.parameters(),
-                    log_det_jacobian=ldj
-                    if hasattr(ldj, "item")
-                    else torch.tensor(0.0, device=device),
-                    generator_labels=gen_labels,
-                )
+            recon, mu, logvar, ldj, z0, zk = helper.outputs_to_float(out)
+            losses = loss_fn.calculate(
+                recon=recon,
+                target=inputs,
+                mu=mu,
+                logvar=logvar,
+                zk=zk,
+                parameters=model_for_loss_params.parameters(),
+                log_det_jacobian=ldj
+                if hasattr(ldj, "item")
+                else torch.tensor(0.0, device=device),
+                generator_labels=gen_labels,
+            )
             loss, *_ = losses
             running_loss += loss.item()
             num_batches_processed_this_rank += 1
@@ -260,12 +304,183 @@ def seed_worker(worker_id):
     random.seed(worker_seed)
 
 
+def collect_latents(
+    config,
+    model,
+    dataset,
+    sink,
+    loader_args,
+    device,
+    is_ddp_active,
+    rank,
+    world_size,
+    recorder=None,
+    verbose: bool = False,
+):
+    """
+    Writes the latents of every event in the dataset into a memory-mapped sink.
+
+    The rows are split into contiguous shards, one per DDP rank. If the latents were already
+    captured during the last training epoch (`recorder`), only the rows that epoch did not see
+    (e.g. dropped by `drop_last`) are processed.
+
+    Args:
+        config (dataClass): Base class selecting user inputs
+        model (modelObject): The trained model (DDP wrapped or not)
+        dataset (torch.Dataset): The training dataset
+        sink (sinks.MemmapSink): The sink the latents are written into
+        loader_args (dict): DataLoader arguments for the pass
+        device (torch.device): Chooses which device to use with torch
+        is_ddp_active (bool): Flag indicating if DDP is active
+        rank (int): Global rank of the process in DDP
+        world_size (int): Number of DDP processes
+        recorder (sinks.EpochLatentRecorder): Recorder of the last training epoch, or None
+        verbose (bool): If True, prints additional information
+    """
+    model = model.module if isinstance(model, DDP) else model
+    model.eval()
+
+    if recorder is not None:
+        consumed = torch.from_numpy(recorder.consumed.astype(np.uint8)).to(device)
+        if is_ddp_active:
+            dist.all_reduce(consumed, op=dist.ReduceOp.MAX)
+        rows = np.flatnonzero(consumed.cpu().numpy() == 0)
+    else:
+        rows = np.arange(len(dataset))
+    rows = np.array_split(rows, world_size)[rank]
+
+    if len(rows) > 0:
+        loader = DataLoader(Subset(dataset, rows.tolist()), shuffle=False, **loader_args)
+        start = 0
+        with torch.no_grad():
+            for inputs, _ in tqdm(
+                loader,
+                desc=f"Latent collection pass (Rank {rank})",
+                disable=not verbose or rank != 0,
+            ):
+                inputs = inputs.to(device, non_blocking=True)
+                with helper.autocast(config, device):
+                    _, mu, logvar, ldj, z0, zk = helper.call_forward(model, inputs)
+                batch_rows = rows[start : start + inputs.shape[0]]
+                sink.write(batch_rows, sinks.latents_to_numpy(mu, logvar, ldj, z0, zk))
+                start += inputs.shape[0]
+
+    sink.close()
+    if verbose and rank == 0:
+        print(f"Training-set latents written to: {os.path.dirname(sink.paths['mu'])}")
+
+
+def get_training_state(
+    model,
+    optimizer,
+    scaler,
+    lr_scheduler,
+    early_stopper,
+    annealing_manager,
+    loss_history,
+):
+    """
+    Collects everything needed to resume training into a single dictionary.
+
+    Args:
+        model (modelObject): The model being trained (DDP wrapped or not)
+        optimizer (torch.optim): The optimizer
+        scaler (torch.amp.GradScaler): Scaler for mixed precision training
+        lr_scheduler (helper.LRScheduler): LR scheduler, or None
+        early_stopper (helper.EarlyStopping): Early stopper, or None
+        annealing_manager (AnnealingManager): Annealing manager, or None
+        loss_history (dict): Per-epoch loss containers of the training loop
+
+    Returns:
+        dict: The training state
+    """
+    return {
+        "model": helper.unwrap_model(model).state_dict(),
+        "optimizer": optimizer.state_dict(),
+        "scaler": scaler.state_dict(),
+        "lr_scheduler": lr_scheduler.state_dict() if lr_scheduler else None,
+        "early_stopper": early_stopper.state_dict() if early_stopper else None,
+        "annealing": annealing_manager.state_dict() if annealing_manager else None,
+        "rng": checkpointing.capture_rng_state(),
+        "loss_history": loss_history,
+    }
+
+
+def load_training_state(
+    state,
+    model,
+    optimizer,
+    scaler,
+    lr_scheduler,
+    early_stopper,
+    annealing_manager,
+    loss_history,
+):
+    """
+    Restores a training state produced by `get_training_state` in place.
+
+    Args:
+        state (dict): The training state loaded from a checkpoint
+        model (modelObject): The model being trained (DDP wrapped or not)
+        optimizer (torch.optim): The optimizer
+        scaler (torch.amp.GradScaler): Scaler for mixed precision training
+        lr_scheduler (helper.LRScheduler): LR scheduler, or None
+        early_stopper (helper.EarlyStopping): Early stopper, or None
+        annealing_manager (AnnealingManager): Annealing manager, or None
+        loss_history (dict): Per-epoch loss containers of the training loop, extended in place
+
+    Returns:
+        int: The epoch to continue training from
+    """
+    helper.unwrap_model(model).load_state_dict(state["model"])
+    optimizer.load_state_dict(state["optimizer"])
+    scaler.load_state_dict(state["scaler"])
+    if lr_scheduler and state["lr_scheduler"] is not None:
+        lr_scheduler.load_state_dict(state["lr_scheduler"])
+    if early_stopper and state["early_stopper"] is not None:
+        early_stopper.load_state_dict(state["early_stopper"])
+    if annealing_manager and state["annealing"] is not None:
+        annealing_manager.load_state_dict(state["annealing"])
+    checkpointing.restore_rng_state(state["rng"])
+    for key, values in state["loss_history"].items():
+        loss_history[key].extend(values)
+    return state["epoch"] + 1
+
+
+def is_full_validation_epoch(config, epoch):
+    """
+    Checks if an epoch ends with a full validation: the last epoch, and every epoch that saves a
+    checkpoint or an intermittent model.
+
+    Args:
+        config (dataClass): Base class selecting user inputs
+        epoch (int): The 0-based epoch
+
+    Returns:
+        bool: True if the full validation set is evaluated after the epoch
+    """
+    epoch_number = epoch + 1
+    return (
+        epoch_number == config.epochs
+        or (
+            getattr(config, "checkpointing", False)
+            and epoch_number % getattr(config, "checkpoint_patience", 1) == 0
+        )
+        or (
+            config.intermittent_model_saving
+            and epoch > 0
+            and epoch_number % config.intermittent_saving_patience == 0
+        )
+    )
+
+
 def train(
     data,
     labels,
     output_path,
     config,
     verbose: bool = False,
+    epoch_callback=None,
 ):
     """
     Processes the entire training loop by calling the `fit()` and `validate()`. Appart from this, this is the main function where the data is converted
@@ -281,6 +496,9 @@ def train(
         project_path (string): Path to the project directory
         config (dataClass): Base class selecting user inputs
         verbose (bool): If True, prints additional information during training
+        epoch_callback (callable): Called on rank 0 after every epoch as
+            `epoch_callback(epoch, validation_loss)` with the 1-based epoch. Training stops, like
+            with early stopping, when it returns False (e.g. a sweep scheduler pruning the trial).
 
     Returns:
         modelObject: fully trained model ready to perform inference
@@ -289,6 +507,7 @@ def train(
     is_ddp_active = config.is_ddp_active
     local_rank = config.local_rank
     world_size = config.world_size
+    rank = getattr(config, "rank", local_rank)
     device = helper.get_device(config)
 
     if "ConvVAE" in config.model_name or "ConvAE" in config.model_name:
@@ -342,17 +561,113 @@ def train(
     model = helper.model_init(input_shape, config)
     model = model.to(device)
 
+    train_dataset_selected = datasets[f"{config.input_level}s_train"]
+
+    # Initialize loss function
+    # Loss weights live on the training device and are updated in place by the annealing manager
+    config.loss_weights = loss.LossWeights(config, device)
+    loss_object = helper.get_loss(config.loss_function)
+    loss_fn = loss_object(config=config)
+
+    # Size the batch to this device before the DataLoaders are built
+    if getattr(config, "find_batch_size", False):
+        # Trials run independently on every rank, so the trial loss must not communicate
+        config.is_ddp_active = False
+        finder_loss_fn = loss_object(config=config)
+        config.is_ddp_active = is_ddp_active
+        search = tuning.find_batch_size(
+            model,
+            finder_loss_fn,
+            config,
+            train_dataset_selected,
+            device,
+            verbose=verbose and (not is_ddp_active or local_rank == 0),
+        )
+        max_batch_size = search["batch_size"] or 1
+        if is_ddp_active:
+            # Every rank has to run with the same batch size
+            max_batch_tensor = torch.tensor(max_batch_size, device=device)
+            dist.all_reduce(max_batch_tensor, op=dist.ReduceOp.MIN)
+            max_batch_size = int(max_batch_tensor.item())
+        effective_batch_size = getattr(config, "effective_batch_size", 0) or max_batch_size
+        config.batch_size, config.gradient_accumulation_steps = (
+            tuning.recommend_batch_settings(max_batch_size, effective_batch_size)
+        )
+        search.update(
+            max_batch_size=max_batch_size,
+            recommended_batch_size=config.batch_size,
+            recommended_gradient_accumulation_steps=config.gradient_accumulation_steps,
+        )
+        if rank == 0:
+            os.makedirs(os.path.join(output_path, "results"), exist_ok=True)
+            with open(
+                os.path.join(output_path, "results", "batch_size_finder.json"), "w"
+            ) as f:
+                json.dump(search, f, indent=2)
+        if verbose and (not is_ddp_active or local_rank == 0):
+            print(
+                f"Batch size finder ({search['stop_reason']}): using batch_size="
+                f"{config.batch_size} with gradient_accumulation_steps="
+                f"{config.gradient_accumulation_steps}"
+            )
+
+    # One batch of training data for the compile warm-up and the unused-parameter probe
+    example_input, example_labels = None, None
+    if getattr(config, "use_compile", False) or is_ddp_active:
+        example_batch = [
+            train_dataset_selected[i]
+            for i in range(min(config.batch_size, len(train_dataset_selected)))
+        ]
+        example_input = torch.stack([item[0] for item in example_batch]).to(device)
+        example_labels = torch.stack(
+            [torch.as_tensor(item[1]) for item in example_batch]
+        ).to(device)
+
+    if is_ddp_active:
+        # Probe the eager model once, so DDP can skip the per-step unused-parameter search
+        unused_parameters = helper.find_unused_parameters(
+            model, loss_fn, example_input, example_labels
+        )
+        # Every rank has to wrap the model with the same DDP options
+        has_unused = torch.tensor(float(bool(unused_parameters)), device=device)
+        dist.all_reduce(has_unused, op=dist.ReduceOp.MAX)
+        ddp_kwargs = helper.get_ddp_kwargs(config, has_unused.item() > 0)
+        if verbose and local_rank == 0:
+            if unused_parameters:
+                print(f"Parameters without gradient: {', '.join(unused_parameters)}")
+            print(
+                f"DDP options: static_graph={ddp_kwargs['static_graph']}, "
+                f"find_unused_parameters={ddp_kwargs['find_unused_parameters']}, "
+                f"bucket_cap_mb={ddp_kwargs['bucket_cap_mb']}"
+            )
+
+    # Opt-in compiled execution, warmed up on one batch so failures fall back to eager here
+    if getattr(config, "use_compile", False):
+        helper.enable_compile_cache(os.path.join(output_path, "compile_cache"))
+        model = helper.compile_model(
+            model,
+            config,
+            example_input,
+            verbose=verbose and (not is_ddp_active or local_rank == 0),
+        )
+        loss_fn = helper.compile_loss(
+            loss_fn, config, verbose=verbose and (not is_ddp_active or local_rank == 0)
+        )
+
     if is_ddp_active:
+        # device_ids must stay unset for CPU modules (gloo backend)
         model = DDP(
             model,
-            device_ids=[local_rank],
-            output_device=local_rank,
-            find_unused_parameters=True,  # Keep true for ldj handling
+            device_ids=[local_rank] if device.type == "cuda" else None,
+            output_device=local_rank if device.type == "cuda" else None,
+            **ddp_kwargs,
         )
         if verbose and local_rank == 0:
-            print(f"DDP initialized. Model wrapped. Running on {world_size} GPUs.")
+            print(
+                f"DDP initialized. Model wrapped. Running on {world_size} "
+                f"{'GPUs' if device.type == 'cuda' else 'CPU processes'}."
+            )
 
-    train_dataset_selected = datasets[f"{config.input_level}s_train"]
     validation_dataset_selected = (
         datasets[f"{config.input_level}s_val"] if config.train_size < 1.0 else None
     )
@@ -365,7 +680,7 @@ def train(
         train_sampler = DistributedSampler(
             train_dataset_selected,
             num_replicas=world_size,
-            rank=local_rank,
+            rank=rank,
             shuffle=True,
             drop_last=True,
         )
@@ -376,7 +691,7 @@ def train(
             validation_sampler = DistributedSampler(
                 validation_dataset_selected,
                 num_replicas=world_size,
-                rank=local_rank,
+                rank=rank,
                 shuffle=False,
                 drop_last=True,
             )
@@ -397,16 +712,39 @@ def train(
     common_loader_args = {
         "batch_size": config.batch_size,
         "drop_last": True,
-        "num_workers": config.parallel_workers,
-        "pin_memory": True,
-        "worker_init_fn": seed_worker if config.deterministic_algorithm else None,
         "generator": generator_seed if config.deterministic_algorithm else None,
+        **helper.get_dataloader_kwargs(
+            config,
+            device,
+            worker_init_fn=seed_worker if config.deterministic_algorithm else None,
+        ),
     }
 
+    # Latents can be written out from the last epoch's forward passes instead of an extra pass.
+    # The batches are mapped back to dataset rows through the indices the sampler yielded.
+    latent_collection = getattr(config, "latent_collection", "final_pass")
+    if latent_collection not in ("final_pass", "last_epoch", "skip"):
+        raise ValueError(
+            f"Unsupported latent_collection: {latent_collection}. "
+            "Choose from 'final_pass', 'last_epoch' or 'skip'."
+        )
+    recording_sampler = None
+    if latent_collection == "last_epoch":
+        base_sampler = (
+            train_sampler
+            if train_sampler is not None
+            else RandomSampler(
+                train_dataset_selected,
+                generator=generator_seed if config.deterministic_algorithm else None,
+            )
+        )
+        recording_sampler = sinks.RecordingSampler(base_sampler)
+        shuffle_train = False
+
     # Create DataLoaders for training and validation datasets
     train_dataloader = DataLoader(
         train_dataset_selected,
-        sampler=train_sampler,
+        sampler=recording_sampler if recording_sampler is not None else train_sampler,
         shuffle=shuffle_train,
         **common_loader_args,
     )
@@ -420,25 +758,71 @@ def train(
             **common_loader_args,
         )
 
-    # Initialize loss function, optimizer
-    loss_object = helper.get_loss(config.loss_function)
-    loss_fn = loss_object(config=config)
+    # Intermediate validations can run on a fixed random subset of the validation set. They drive
+    # the LR scheduler and early stopping; the full set is evaluated at checkpoints and at the end.
+    has_validation = (
+        config.train_size < 1.0
+        and validation_dataloader is not None
+        and len(validation_dataloader) > 0
+    )
+    val_every_n_epochs = max(1, getattr(config, "val_every_n_epochs", 1))
+    val_every_n_steps = getattr(config, "val_every_n_steps", 0)
+    signal_dataloader = validation_dataloader
+    val_subset_size = getattr(config, "val_subset_size", 0)
+    if has_validation and 0 < val_subset_size < len(validation_dataset_selected):
+        # At least one batch per rank
+        val_subset_size = max(val_subset_size, config.batch_size * world_size)
+        rows = torch.randperm(
+            len(validation_dataset_selected), generator=torch.Generator().manual_seed(0)
+        )[:val_subset_size]
+        validation_subset = Subset(validation_dataset_selected, rows.sort().values.tolist())
+        signal_dataloader = DataLoader(
+            validation_subset,
+            sampler=DistributedSampler(
+                validation_subset,
+                num_replicas=world_size,
+                rank=rank,
+                shuffle=False,
+                drop_last=True,
+            )
+            if is_ddp_active
+            else None,
+            shuffle=False,
+            **common_loader_args,
+        )
 
+    # Patience is given in epochs, but counted in validations
+    validations_per_epoch = 1.0
+    if has_validation and val_every_n_steps > 0:
+        accumulation_steps = max(1, getattr(config, "gradient_accumulation_steps", 1))
+        optimizer_steps_per_epoch = math.ceil(len(train_dataloader) / accumulation_steps)
+        validations_per_epoch = optimizer_steps_per_epoch / val_every_n_steps
+    elif has_validation:
+        validations_per_epoch = 1.0 / val_every_n_epochs
+
+    def patience_in_validations(patience):
+        if validations_per_epoch == 1.0:
+            return patience
+        return max(1, math.ceil(patience * validations_per_epoch))
+
+    # Initialize optimizer
     optimizer = helper.get_optimizer(config.optimizer, model.parameters(), lr=config.lr)
-    amp_scaler = torch.amp.GradScaler(
-        enabled=(config.use_amp and device.type == "cuda")
-    )
+    amp_scaler = helper.get_grad_scaler(config, device)
 
     # Initialize early stopping and learning rate scheduler if specified
     early_stopper = (
         helper.EarlyStopping(
-            patience=config.early_stopping_patience, min_delta=config.min_delta
+            patience=patience_in_validations(config.early_stopping_patience),
+            min_delta=config.min_delta,
         )
         if config.early_stopping
         else None
     )
     lr_scheduler = (
-        helper.LRScheduler(optimizer=optimizer, patience=config.lr_scheduler_patience)
+        helper.LRScheduler(
+            optimizer=optimizer,
+            patience=patience_in_validations(config.lr_scheduler_patience),
+        )
         if config.lr_scheduler
         else None
     )
@@ -453,17 +837,125 @@ def train(
     validation_loss_components_per_epoch = []
     train_avg_epoch_losses = []
     validation_avg_epoch_losses = []
+    loss_history = {
+        "train_loss_components_per_epoch": train_loss_components_per_epoch,
+        "validation_loss_components_per_epoch": validation_loss_components_per_epoch,
+        "train_avg_epoch_losses": train_avg_epoch_losses,
+        "validation_avg_epoch_losses": validation_avg_epoch_losses,
+    }
+
+    # Full training-state checkpoints so preempted runs can continue with --resume
+    resume = getattr(config, "resume", None)
+    checkpoint_manager = None
+    if getattr(config, "checkpointing", False) or resume:
+        checkpoint_manager = checkpointing.CheckpointManager(
+            os.path.join(output_path, "models", "checkpoints"),
+            retention=getattr(config, "checkpoint_retention", 2),
+        )
+
+    start_epoch = 0
+    if resume:
+        # Every rank restores the same state, so the replicas stay in sync
+        state = checkpoint_manager.load(None if resume == "latest" else resume)
+        start_epoch = load_training_state(
+            state,
+            model,
+            optimizer,
+            amp_scaler,
+            lr_scheduler,
+            early_stopper,
+            annealing_manager,
+            loss_history,
+        )
+        if is_ddp_active and local_rank != 0:
+            # Loss histories are only tracked on rank 0
+            for values in loss_history.values():
+                values.clear()
+        if early_stopper and early_stopper.early_stop:
+            start_epoch = config.epochs
+        if verbose and (not is_ddp_active or local_rank == 0):
+            print(f"Resuming training from epoch {start_epoch + 1}")
+
+    # Memory-mapped outputs for the training-set latents
+    results_save_dir = os.path.join(output_path, "results")
+    os.makedirs(results_save_dir, exist_ok=True)
+    latent_sink, latent_recorder = None, None
+    if latent_collection != "skip" and len(train_dataset_selected) > 0:
+        latent_sink = sinks.MemmapSink(
+            {
+                name: os.path.join(results_save_dir, f"train_{name}_data.npy")
+                for name in sinks.LATENT_NAMES
+            },
+            num_rows=len(train_dataset_selected),
+            rank=rank,
+            is_ddp_active=is_ddp_active,
+        )
+
+    # Sampled per-step phase timings and per-epoch throughput (rank 0 only)
+    profiler = diagnostics.TrainingProfiler(
+        output_path,
+        device,
+        sample_every=getattr(config, "profile_every_n_steps", 50),
+        world_size=world_size,
+        enabled=getattr(config, "profile_training", False)
+        and (not is_ddp_active or local_rank == 0),
+    )
+
+    def update_schedulers(validation_loss):
+        # The LR scheduler steps on every rank, early stopping decides on rank 0
+        if lr_scheduler:
+            lr_scheduler(validation_loss.item())
+        if early_stopper and (not is_ddp_active or local_rank == 0):
+            early_stopper(validation_loss.item())
+
+    # Most recent (loss components, loss) validation, logged for every epoch
+    latest_validation = None
+    last_validation_full = True
+    optimizer_steps = 0
+
+    def validate_every_n_steps():
+        nonlocal latest_validation, optimizer_steps
+        optimizer_steps += 1
+        if optimizer_steps % val_every_n_steps:
+            return
+        latest_validation = validate(
+            config,
+            model,
+            signal_dataloader,
+            loss_fn,
+            device,
+            is_ddp_active,
+            local_rank,
+            epoch,
+            verbose,
+        )
+        update_schedulers(latest_validation[1])
+        model.train()
+
     start_time = time.time()
 
     if verbose and (not is_ddp_active or local_rank == 0):
         print(f"Beginning training for {config.epochs} epochs")
 
-    for epoch in range(config.epochs):
+    for epoch in range(start_epoch, config.epochs):
         if is_ddp_active and train_sampler is not None:
             train_sampler.set_epoch(epoch)
         if is_ddp_active and validation_sampler is not None:
             validation_sampler.set_epoch(epoch)
 
+        if (
+            recording_sampler is not None
+            and latent_sink is not None
+            and epoch == config.epochs - 1
+        ):
+            latent_recorder = sinks.EpochLatentRecorder(
+                latent_sink,
+                recording_sampler,
+                config.batch_size,
+                len(train_dataset_selected),
+            )
+
+        profiler.epoch_begin()
         batch_train_losses_components, current_train_epoch_loss_avg = fit(
             config,
             model,
@@ -476,35 +968,71 @@ def train(
             local_rank,
             epoch,
             verbose,
+            latent_recorder=latent_recorder,
+            profiler=profiler,
+            step_callback=validate_every_n_steps
+            if has_validation and val_every_n_steps > 0
+            else None,
         )
+        epoch_profile = profiler.epoch_end(epoch)
+        if epoch_profile and verbose:
+            memory = (
+                f"peak memory: {epoch_profile['peak_memory_mb']:.1f} MB"
+                if "peak_memory_mb" in epoch_profile
+                else f"process peak RSS: {epoch_profile['process_peak_rss_mb']:.1f} MB"
+            )
+            print(
+                f"# Epoch {epoch + 1} throughput: {epoch_profile['global_samples_per_s']:.1f} samples/s, "
+                + memory
+            )
 
-        current_validation_epoch_loss_for_schedulers = current_train_epoch_loss_avg
-        batch_validation_losses_components_for_log = batch_train_losses_components
-
-        if (
-            config.train_size < 1.0
-            and validation_dataloader is not None
-            and len(validation_dataloader) > 0
-        ):
-            (
-                batch_validation_losses_components_for_log,
-                current_validation_epoch_loss_for_schedulers,
-            ) = validate(
-                config,
-                model,
-                validation_dataloader,
-                loss_fn,
-                device,
-                is_ddp_active,
-                local_rank,
-                epoch,
-                verbose,
+        if not has_validation:
+            # Without a validation set, the training loss drives the schedulers
+            latest_validation = (
+                batch_train_losses_components,
+                current_train_epoch_loss_avg,
             )
+            update_schedulers(current_train_epoch_loss_avg)
+        else:
+            validated_full = False
+            if latest_validation is None or (
+                val_every_n_steps <= 0 and (epoch + 1) % val_every_n_epochs == 0
+            ):
+                latest_validation = validate(
+                    config,
+                    model,
+                    signal_dataloader,
+                    loss_fn,
+                    device,
+                    is_ddp_active,
+                    local_rank,
+                    epoch,
+                    verbose,
+                )
+                update_schedulers(latest_validation[1])
+                validated_full = signal_dataloader is validation_dataloader
+            if is_full_validation_epoch(config, epoch) and not validated_full:
+                latest_validation = validate(
+                    config,
+                    model,
+                    validation_dataloader,
+                    loss_fn,
+                    device,
+                    is_ddp_active,
+                    local_rank,
+                    epoch,
+                    verbose,
+                )
+                validated_full = True
+            last_validation_full = validated_full
 
-        if lr_scheduler:
-            lr_scheduler(current_validation_epoch_loss_for_schedulers.item())
+        (
+            batch_validation_losses_components_for_log,
+            current_validation_epoch_loss_for_schedulers,
+        ) = latest_validation
 
         # Using only rank 0 to log and broadcast decisions when using DDP
+        stop_requested = False
         if not is_ddp_active or local_rank == 0:
             train_avg_epoch_losses.append(current_train_epoch_loss_avg.item())
             train_loss_components_per_epoch.append(batch_train_losses_components)
@@ -525,12 +1053,16 @@ def train(
                 helper.save_model(model, path, config)
 
             if early_stopper:
-                early_stopper(current_validation_epoch_loss_for_schedulers.item())
                 if early_stopper.early_stop and verbose:
                     print(
                         f"Rank {local_rank}: Early stopping condition met at epoch {epoch + 1}. Will signal other ranks."
                     )
 
+            if epoch_callback is not None:
+                stop_requested = not epoch_callback(
+                    epoch + 1, current_validation_epoch_loss_for_schedulers.item()
+                )
+
         # Apply hyperparameter annealing if configured
         # Note: This is placed after early_stopper updates so the most recent counter is used
         annealing_metrics = {}
@@ -559,11 +1091,38 @@ def train(
             if annealed_params and (not is_ddp_active or local_rank == 0) and verbose:
                 print(f"Annealed parameters for epoch {epoch + 1}: {annealed_params}")
 
+        # Keep the loss weights identical on every rank, one collective per epoch
+        if is_ddp_active:
+            config.loss_weights.broadcast(src=0)
+
+        if checkpoint_manager and (not is_ddp_active or local_rank == 0):
+            checkpoint_patience = getattr(config, "checkpoint_patience", 1)
+            if (
+                (epoch + 1) % checkpoint_patience == 0
+                or epoch + 1 == config.epochs
+                or (early_stopper and early_stopper.early_stop)
+                or stop_requested
+            ):
+                checkpoint_manager.save(
+                    get_training_state(
+                        model,
+                        optimizer,
+                        amp_scaler,
+                        lr_scheduler,
+                        early_stopper,
+                        annealing_manager,
+                        loss_history,
+                    ),
+                    epoch,
+                )
+
         # Synchronize early stopping signal and stop across all ranks based on decision from rank 0
         if is_ddp_active:
             if local_rank == 0:
                 should_stop_epoch_flag = (
-                    1.0 if early_stopper and early_stopper.early_stop else 0.0
+                    1.0
+                    if (early_stopper and early_stopper.early_stop) or stop_requested
+                    else 0.0
                 )
                 stop_signal_tensor = torch.tensor(
                     [should_stop_epoch_flag], dtype=torch.float32, device=device
@@ -584,12 +1143,39 @@ def train(
                 if verbose:
                     print(f"Early stopping at epoch {epoch + 1}.")
                 break
+            if stop_requested:
+                if verbose:
+                    print(f"Training stopped by the epoch callback at epoch {epoch + 1}.")
+                break
 
         if is_ddp_active and verbose:
             print(
                 f"[Rank {local_rank}, Epoch {epoch + 1}] TRAIN MAIN: Reached end of epoch logic."
             )
 
+    # The final model is always evaluated on the full validation set
+    if has_validation and not last_validation_full:
+        batch_validation_losses_components, validation_loss = validate(
+            config,
+            model,
+            validation_dataloader,
+            loss_fn,
+            device,
+            is_ddp_active,
+            local_rank,
+            epoch,
+            verbose,
+        )
+        if validation_avg_epoch_losses:
+            validation_avg_epoch_losses[-1] = validation_loss.item()
+            validation_loss_components_per_epoch[-1] = (
+                batch_validation_losses_components
+            )
+
+    if checkpoint_manager:
+        checkpoint_manager.close()
+    profiler.close()
+
     end_time = time.time()
     if verbose and (not is_ddp_active or local_rank == 0):
         print(
@@ -606,61 +1192,27 @@ def train(
                 f"Final model saved to: {os.path.join(output_path, 'models', 'model.pt')}"
             )
 
-        # Prepare final data collection pass
-        actual_model_for_evaluation = model.module if isinstance(model, DDP) else model
-        actual_model_for_evaluation.eval()
-
-        mu_data_list, logvar_data_list, z0_data_list, zk_data_list, ldj_data_list = (
-            [],
-            [],
-            [],
-            [],
-            [],
+    # Stream the training-set latents into the memory-mapped outputs, sharded across ranks
+    if latent_sink is not None:
+        latent_pass_loader_args = common_loader_args.copy()
+        latent_pass_loader_args["drop_last"] = False
+        collect_latents(
+            config,
+            model,
+            train_dataset_selected,
+            latent_sink,
+            latent_pass_loader_args,
+            device,
+            is_ddp_active,
+            rank,
+            world_size,
+            recorder=latent_recorder,
+            verbose=verbose,
         )
+    elif verbose and (not is_ddp_active or local_rank == 0):
+        print("Skipping training-set latent collection.")
 
-        if train_dataset_selected is not None and len(train_dataset_selected) > 0:
-            final_pass_dataloader_args = common_loader_args.copy()
-            final_pass_dataloader_args.pop("sampler", None)
-            final_pass_dataloader_args["shuffle"] = False
-
-            final_pass_dataloader = DataLoader(
-                train_dataset_selected, **final_pass_dataloader_args
-            )
-
-            with torch.no_grad():
-                for _idx, batch in enumerate(
-                    tqdm(
-                        final_pass_dataloader,
-                        desc="Final data collection pass (Rank 0)",
-                        disable=not verbose,
-                    )
-                ):
-                    inputs, _ = batch
-                    inputs = inputs.to(device, non_blocking=True)
-                    with torch.amp.autocast(
-                        device_type=device.type,
-                        enabled=(config.use_amp and device.type == "cuda"),
-                    ):
-                        out = helper.call_forward(actual_model_for_evaluation, inputs)
-                        _, mu, logvar, ldj, z0, zk = out
-                    mu_data_list.append(mu.detach().cpu().numpy())
-                    logvar_data_list.append(logvar.detach().cpu().numpy())
-                    if hasattr(ldj, "detach"):
-                        ldj_data_list.append(ldj.detach().cpu().numpy())
-                    elif isinstance(ldj, (float, int, np.number)):
-                        ldj_data_list.append(np.array(ldj))
-                    else:
-                        ldj_data_list.append(np.array(0.0))
-                    z0_data_list.append(z0.detach().cpu().numpy())
-                    zk_data_list.append(zk.detach().cpu().numpy())
-        else:
-            if verbose:
-                print(
-                    "Skipping final data collection pass as training dataset is empty or invalid."
-                )
-
-        results_save_dir = os.path.join(output_path, "results")
-        os.makedirs(results_save_dir, exist_ok=True)
+    if not is_ddp_active or local_rank == 0:
         np.save(
             os.path.join(results_save_dir, "train_epoch_loss_data.npy"),
             np.array(train_avg_epoch_losses),
@@ -671,48 +1223,6 @@ def train(
                 np.array(validation_avg_epoch_losses),
             )
 
-        if mu_data_list:
-            np.save(
-                os.path.join(results_save_dir, "train_mu_data.npy"),
-                np.concatenate(mu_data_list, axis=0),
-            )
-        if logvar_data_list:
-            np.save(
-                os.path.join(results_save_dir, "train_logvar_data.npy"),
-                np.concatenate(logvar_data_list, axis=0),
-            )
-        if z0_data_list:
-            np.save(
-                os.path.join(results_save_dir, "train_z0_data.npy"),
-                np.concatenate(z0_data_list, axis=0),
-            )
-        if zk_data_list:
-            np.save(
-                os.path.join(results_save_dir, "train_zk_data.npy"),
-                np.concatenate(zk_data_list, axis=0),
-            )
-
-        # Handling ldj with extra love
-        if ldj_data_list:
-            try:
-                if (
-                    ldj_data_list
-                    and isinstance(ldj_data_list[0], np.ndarray)
-                    and len(ldj_data_list[0].shape) > 0
-                ):
-                    final_ldj_data = np.concatenate(ldj_data_list, axis=0)
-                elif ldj_data_list:
-                    final_ldj_data = np.array(ldj_data_list)
-                else:
-                    final_ldj_data = np.array([])
-                np.save(
-                    os.path.join(results_save_dir, "train_log_det_jacobian_data.npy"),
-                    final_ldj_data,
-                )
-            except Exception as e:
-                if verbose:
-                    print(f"Could not save train_log_det_jacobian_data: {e}")
-
         helper.save_loss_components(
             loss_data=train_loss_components_per_epoch,
             component_names=loss_fn.component_names,
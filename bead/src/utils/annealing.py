@@ -90,6 +90,12 @@ class AnnealingManager:
         self.is_ddp_active = config.is_ddp_active if hasattr(config, "is_ddp_active") else False
         self.world_size = config.world_size if hasattr(config, "world_size") else 1
         self.rank = config.rank if hasattr(config, "rank") else 0
+        # gloo (CPU DDP) can only broadcast CPU tensors, nccl needs them on the GPU
+        self.comm_device = (
+            torch.device("cuda")
+            if torch.cuda.is_available() and getattr(config, "ddp_backend", "nccl") != "gloo"
+            else torch.device("cpu")
+        )
         
         # Initialize annealing parameters from config
         self._initialize_annealing_params()
@@ -201,6 +207,7 @@ class AnnealingManager:
                 # Update parameter if changed
                 if new_value != current_value:
                     self._set_attr_value(obj, attr_name, new_value)
+                    self._update_loss_weight(obj, attr_name, new_value)
                     annealed_params[param_name] = new_value
             except (AttributeError, IndexError, KeyError) as e:
                 # Skip parameters that don't exist yet or can't be accessed
@@ -250,7 +257,7 @@ class AnnealingManager:
             
         # Create tensor for broadcasting
         if len(param_list) > 0:
-            tensor = torch.tensor(param_list, dtype=torch.float32).cuda() if torch.cuda.is_available() else torch.tensor(param_list, dtype=torch.float32)
+            tensor = torch.tensor(param_list, dtype=torch.float32, device=self.comm_device)
             dist.broadcast(tensor, src=0)
             
             # Store type information for receiver to properly reconstruct values
@@ -258,7 +265,7 @@ class AnnealingManager:
                 # Send type information to other processes
                 # For now, we support int, float, bool
                 # A more comprehensive solution would be needed for complex types
-                type_info = torch.zeros(len(param_types), dtype=torch.int32).cuda() if torch.cuda.is_available() else torch.zeros(len(param_types), dtype=torch.int32)
+                type_info = torch.zeros(len(param_types), dtype=torch.int32, device=self.comm_device)
                 for i, t in enumerate(param_types):
                     if t == bool:
                         type_info[i] = 1
@@ -281,11 +288,11 @@ class AnnealingManager:
         param_list = [0.0] * len(self.param_maps)
         if len(param_list) > 0:
             # Receive values
-            tensor = torch.tensor(param_list, dtype=torch.float32).cuda() if torch.cuda.is_available() else torch.tensor(param_list, dtype=torch.float32)
+            tensor = torch.tensor(param_list, dtype=torch.float32, device=self.comm_device)
             dist.broadcast(tensor, src=0)
             
             # Receive type information
-            type_info = torch.zeros(len(param_list), dtype=torch.int32).cuda() if torch.cuda.is_available() else torch.zeros(len(param_list), dtype=torch.int32)
+            type_info = torch.zeros(len(param_list), dtype=torch.int32, device=self.comm_device)
             dist.broadcast(type_info, src=0)
             
             # Update local parameters with received values
@@ -310,12 +317,67 @@ class AnnealingManager:
                 
                 if new_value != current_value:
                     setattr(obj, attr_name, new_value)
+                    self._update_loss_weight(obj, attr_name, new_value)
                     annealed_params[param_name] = new_value
                     
             return annealed_params
         
         return {}
     
+    def state_dict(self):
+        """
+        Return the annealing progress so that training can be resumed from a checkpoint.
+        
+        Returns:
+            dict: Per-parameter strategy settings (step counters, indices, trigger flags)
+            and the current value of every annealed parameter.
+        """
+        state = {}
+        for param_name, param_map in self.param_maps.items():
+            try:
+                value = self._get_attr_value(param_map["object"], param_map["attr_name"])
+            except (AttributeError, IndexError, KeyError):
+                value = None
+            state[param_name] = {
+                "settings": dict(param_map["settings"]),
+                "value": value,
+            }
+        return state
+    
+    def load_state_dict(self, state):
+        """
+        Restore the annealing progress saved by `state_dict`.
+        
+        Args:
+            state: Dictionary returned by `state_dict`.
+        """
+        for param_name, param_state in state.items():
+            if param_name not in self.param_maps:
+                continue
+            param_map = self.param_maps[param_name]
+            param_map["settings"].update(param_state["settings"])
+            if param_state["value"] is not None:
+                try:
+                    self._set_attr_value(param_map["object"], param_map["attr_name"], param_state["value"])
+                    self._update_loss_weight(param_map["object"], param_map["attr_name"], param_state["value"])
+                except AttributeError as e:
+                    if self.rank == 0:
+                        print(f"Warning: Could not restore annealed parameter '{param_name}': {str(e)}")
+    
+    def _update_loss_weight(self, obj, attr_name, value):
+        """
+        Write an annealed config value into the shared loss-weight registry (if the losses use it),
+        so the change reaches the loss functions without rebuilding them.
+        
+        Args:
+            obj: The object the annealed attribute belongs to.
+            attr_name: The attribute path of the annealed parameter.
+            value: The new value.
+        """
+        loss_weights = getattr(self.config, "loss_weights", None)
+        if obj is self.config and loss_weights is not None and attr_name in loss_weights:
+            loss_weights.set(attr_name, value)
+    
     def _get_attr_value(self, obj, attr_path):
         """
         Get a value from an object using a dot-notation attribute path.
@@ -0,0 +1,212 @@
+"""
+Full training-state checkpointing for preemption-safe training.
+
+A checkpoint holds everything needed to continue a run where it stopped: model and optimizer
+weights, the AMP GradScaler, LR scheduler, EarlyStopping and AnnealingManager progress, the RNG
+states and the per-epoch loss histories. Checkpoints are snapshotted to host memory in the
+training loop and serialised on a background thread, so the loop never waits on the disk.
+Files are written atomically (temporary file + rename) and old checkpoints are rotated out.
+
+Functions:
+    snapshot: Recursively copies tensors in a (nested) state to CPU memory.
+    capture_rng_state: Collects the python, numpy and torch RNG states.
+    restore_rng_state: Restores RNG states collected by capture_rng_state.
+
+Classes:
+    CheckpointManager: Writes, rotates and loads training-state checkpoints.
+"""
+
+import glob
+import os
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+CHECKPOINT_PATTERN = re.compile(r"checkpoint_epoch_(\d+)\.pt$")
+
+
+def snapshot(state):
+    """
+    Recursively copies all tensors of a (nested) state to CPU memory.
+
+    The copy decouples the checkpoint from the live training state, which keeps changing while
+    the background thread serialises it.
+
+    Args:
+        state: A tensor, or dict/list/tuple containing tensors and plain python objects.
+
+    Returns:
+        The same structure with every tensor replaced by a detached CPU copy.
+    """
+    if isinstance(state, torch.Tensor):
+        return state.detach().to("cpu", copy=True)
+    if isinstance(state, dict):
+        return {k: snapshot(v) for k, v in state.items()}
+    if isinstance(state, (list, tuple)):
+        return type(state)(snapshot(v) for v in state)
+    return state
+
+
+def capture_rng_state():
+    """
+    Collects the RNG states of python, numpy and torch (including all CUDA devices).
+
+    Returns:
+        dict: RNG states keyed by library.
+    """
+    state = {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "torch": torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def restore_rng_state(state):
+    """
+    Restores RNG states collected by `capture_rng_state`.
+
+    Args:
+        state (dict): RNG states keyed by library.
+    """
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+
+class CheckpointManager:
+    """
+    Writes, rotates and loads full training-state checkpoints.
+
+    Args:
+        checkpoint_dir (str): Directory the checkpoints are written to.
+        retention (int): Number of most recent checkpoints to keep on disk (0 keeps all).
+        async_write (bool): If True, serialise checkpoints on a background thread.
+
+    Example usage:
+        manager = CheckpointManager("output/models/checkpoints", retention=2)
+        for epoch in range(epochs):
+            ...
+            manager.save({"model": model.state_dict(), ...}, epoch)
+        manager.close()
+    """
+
+    def __init__(self, checkpoint_dir, retention=2, async_write=True):
+        self.checkpoint_dir = checkpoint_dir
+        self.retention = retention
+        self.async_write = async_write
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+
+        # A single worker keeps the writes ordered
+        self._executor = ThreadPoolExecutor(max_workers=1) if async_write else None
+        self._pending = None
+
+    def checkpoint_path(self, epoch):
+        """Returns the file path of the checkpoint for a given (0-indexed) epoch."""
+        return os.path.join(self.checkpoint_dir, f"checkpoint_epoch_{epoch + 1:04d}.pt")
+
+    def save(self, state, epoch):
+        """
+        Snapshots the training state and writes it to disk.
+
+        Only the snapshot (device-to-host copy) happens on the calling thread. If a previous write
+        is still in flight, it is waited for first so at most one snapshot is held in memory.
+
+        Args:
+            state (dict): Training state, e.g. model/optimizer state dicts and counters.
+            epoch (int): The epoch (0-indexed) the state belongs to.
+        """
+        cpu_state = snapshot(state)
+        cpu_state["epoch"] = epoch
+
+        if self._executor is None:
+            self._write(cpu_state, epoch)
+            return
+
+        self.wait()
+        self._pending = self._executor.submit(self._write, cpu_state, epoch)
+
+    def _write(self, cpu_state, epoch):
+        """Atomically writes a checkpoint and applies the retention policy."""
+        path = self.checkpoint_path(epoch)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            torch.save(cpu_state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        # A preemption mid-write leaves only the .tmp file behind, never a truncated checkpoint
+        os.replace(tmp_path, path)
+        self._rotate()
+
+    def _rotate(self):
+        """Deletes the oldest checkpoints beyond the retention limit."""
+        if self.retention <= 0:
+            return
+        for path in self.list_checkpoints()[: -self.retention]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def list_checkpoints(self):
+        """
+        Lists the complete checkpoints in the checkpoint directory.
+
+        Returns:
+            list: Checkpoint paths sorted from oldest to newest epoch.
+        """
+        paths = []
+        for path in glob.glob(os.path.join(self.checkpoint_dir, "checkpoint_epoch_*.pt")):
+            match = CHECKPOINT_PATTERN.search(os.path.basename(path))
+            if match:
+                paths.append((int(match.group(1)), path))
+        return [path for _, path in sorted(paths)]
+
+    def latest(self):
+        """
+        Returns the path of the most recent checkpoint, or None if there is none.
+        """
+        checkpoints = self.list_checkpoints()
+        return checkpoints[-1] if checkpoints else None
+
+    def load(self, path=None, map_location="cpu"):
+        """
+        Loads a checkpoint.
+
+        Args:
+            path (str): Checkpoint to load. Defaults to the most recent one.
+            map_location: Passed on to `torch.load`.
+
+        Returns:
+            dict: The saved training state.
+
+        Raises:
+            FileNotFoundError: If no checkpoint is available.
+        """
+        self.wait()
+        path = path or self.latest()
+        if path is None or not os.path.exists(path):
+            raise FileNotFoundError(
+                f"No checkpoint found to resume from in {self.checkpoint_dir}"
+            )
+        return torch.load(path, map_location=map_location, weights_only=False)
+
+    def wait(self):
+        """Blocks until the in-flight write (if any) has finished, re-raising its errors."""
+        if self._pending is not None:
+            self._pending.result()
+            self._pending = None
+
+    def close(self):
+        """Flushes the in-flight write and shuts down the writer thread."""
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -6,17 +6,28 @@ profiling model performance, and generating diagnostic plots for understanding m
 
 Functions:
     get_mean_node_activations: Calculate mean activations for each node.
+    pad_to_square_matrix: Stack per-layer node values into a NaN-padded matrix.
     dict_to_square_matrix: Convert activation dictionary to square matrix.
     plot: Generate neural activation pattern plot.
     nap_diagnose: Neural activation pattern diagnosis.
     pytorch_profile: Profile PyTorch code execution.
     c_profile: Profile Python code execution with cProfile.
+
+Classes:
+    RunningNodeStats: Streaming per-node mean and variance of a layer's activations.
+    ActivationRecorder: Forward hooks accumulating activation statistics over a dataset.
+    TrainingProfiler: Sampled per-step phase timings and per-epoch throughput for training.
 """
 
 import cProfile
 import io
+import json
 import os
 import pstats
+import resource
+import sys
+import time
+from contextlib import contextmanager, nullcontext
 from pstats import SortKey
 
 import matplotlib.colors
@@ -24,19 +35,33 @@ import matplotlib.pyplot as plt
 import matplotlib.ticker
 import numpy as np
 import torch
+import torch.nn.functional as F
+from torch.nn.utils.rnn import pad_sequence
 from torch.profiler import ProfilerActivity, profile, record_function
 
 
 def get_mean_node_activations(input_dict: dict) -> dict:
     output_dict = {}
     for kk in input_dict:
-        output_dict_layer = []
-        for node in input_dict[kk].T:
-            output_dict_layer.append(torch.mean(node).item())
-        output_dict[kk] = output_dict_layer
+        values = input_dict[kk]
+        output_dict[kk] = values.reshape(-1, values.shape[-1]).mean(0).tolist()
     return output_dict
 
 
+def pad_to_square_matrix(layers: list) -> np.array:
+    """Stacks the per-node values of every layer into one matrix, padding layers with fewer
+    nodes with NaNs.
+
+    Args:
+        layers (list): One 1D tensor of node values per layer.
+
+    Returns:
+        square_matrix (np.array): Matrix with shape (layers, largest number of nodes).
+    """
+    rows = [torch.as_tensor(layer, dtype=torch.float64).cpu() for layer in layers]
+    return pad_sequence(rows, batch_first=True, padding_value=float("nan")).numpy()
+
+
 def dict_to_square_matrix(input_dict: dict) -> np.array:
     """Function changes an input dictionary into a square np.array. Adds NaNs when the dimension of a dict key is less than of the final square matrix.
 
@@ -47,24 +72,108 @@ def dict_to_square_matrix(input_dict: dict) -> np.array:
         square_matrix (np.array)
     """
     means_dict = get_mean_node_activations(input_dict)
-    max_number_of_nodes = 0
-    number_of_layers = len(input_dict)
-    for kk in means_dict:
-        if len(means_dict[kk]) > max_number_of_nodes:
-            max_number_of_nodes = len(means_dict[kk])
-    square_matrix = np.empty((number_of_layers, max_number_of_nodes))
-    counter = 0
-    for kk in input_dict:
-        layer = np.array(means_dict[kk])
-        if len(layer) == max_number_of_nodes:
-            square_matrix[counter] = layer
+    return pad_to_square_matrix([means_dict[kk] for kk in input_dict])
+
+
+class RunningNodeStats:
+    """
+    Streaming per-node mean and variance of a layer's activations.
+
+    Batches are merged with the parallel variance update of Chan et al., so the statistics cover
+    every event seen without keeping the activations. The accumulators stay on the device of the
+    activations and are only copied to the host when read.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = None
+        self.m2 = None
+
+    def update(self, values):
+        """
+        Adds a batch of activations.
+
+        Args:
+            values (torch.Tensor): Activations with the nodes as last dimension.
+        """
+        values = values.detach().reshape(-1, values.shape[-1]).float()
+        n = values.shape[0]
+        if n == 0:
+            return
+        batch_mean = values.mean(0)
+        batch_m2 = ((values - batch_mean) ** 2).sum(0)
+        if self.mean is None:
+            self.mean, self.m2 = batch_mean, batch_m2
         else:
-            layer = np.append(
-                layer, np.zeros(max_number_of_nodes - len(layer)) + np.nan
-            )
-            square_matrix[counter] = layer
-        counter += 1
-    return square_matrix
+            total = self.count + n
+            delta = batch_mean - self.mean
+            self.mean = self.mean + delta * (n / total)
+            self.m2 = self.m2 + batch_m2 + delta**2 * (self.count * n / total)
+        self.count += n
+
+    @property
+    def variance(self):
+        """Population variance per node."""
+        return self.m2 / max(self.count, 1)
+
+
+class ActivationRecorder:
+    """
+    Registers forward hooks that accumulate the per-node activation statistics of the given
+    layers over every forward pass, e.g. over a whole inference dataset.
+
+    Args:
+        layers (list): Modules whose outputs are recorded (e.g. `model.get_layers()`).
+        activation (callable): Applied to the layer outputs before accumulating, leaky ReLU
+            by default as in the model forward passes.
+
+    Example usage:
+        recorder = ActivationRecorder(model.get_layers())
+        for batch in dataloader:
+            model(batch)
+        recorder.remove()
+        nap = recorder.nap_matrix()
+    """
+
+    def __init__(self, layers, activation=F.leaky_relu):
+        self.activation = activation
+        self.stats = [RunningNodeStats() for _ in layers]
+        self.hooks = [
+            layer.register_forward_hook(self._hook(stats))
+            for layer, stats in zip(layers, self.stats, strict=True)
+        ]
+
+    def _hook(self, stats):
+        def hook(module, inputs, output):
+            stats.update(self.activation(output.detach()))
+
+        return hook
+
+    def remove(self):
+        """Removes the forward hooks, the accumulated statistics are kept."""
+        for hook in self.hooks:
+            hook.remove()
+        self.hooks = []
+
+    def nap_matrix(self, statistic="mean"):
+        """
+        Returns the neural activation pattern matrix used by `nap_diagnose`.
+
+        Args:
+            statistic (str): "mean" or "std" of the activations of every node.
+
+        Returns:
+            np.array: Matrix with shape (layers, largest number of nodes), NaN-padded.
+        """
+        if any(stats.count == 0 for stats in self.stats):
+            raise RuntimeError("No activations were recorded")
+        if statistic == "mean":
+            rows = [stats.mean for stats in self.stats]
+        elif statistic == "std":
+            rows = [stats.variance.sqrt() for stats in self.stats]
+        else:
+            raise ValueError(f"Unsupported statistic: {statistic}. Choose mean or std.")
+        return pad_to_square_matrix(rows)
 
 
 def plot(data: np.array, output_path: str) -> None:
@@ -168,3 +277,208 @@ def c_profile(func, *args, **kwargs):
     print(s.getvalue())
 
     return result
+
+
+class TrainingProfiler:
+    """
+    Lightweight training instrumentation that is cheap enough to leave on in production runs.
+
+    Every `sample_every`-th step is timed phase by phase (data wait, host-to-device copy, forward,
+    loss, backward, optimizer step and step-based validation). CUDA is synchronised only around
+    the phases of sampled steps, all other steps run untouched. At the end of every epoch the
+    throughput and the memory peak are recorded. On CUDA, `peak_memory_mb` is the peak allocated
+    memory of the epoch (the peak is reset at every `epoch_begin`). On CPU, only the peak RSS of
+    the whole process lifetime is available, recorded as `process_peak_rss_mb`, which never
+    decreases and cannot attribute memory to a single epoch. Records are appended as JSON lines
+    to `<output>/results/training_profile.jsonl`.
+
+    Args:
+        output_path (str): Path to the project output directory.
+        device (torch.device): Device the model is trained on.
+        sample_every (int): Profile every n-th step (1 profiles every step).
+        world_size (int): Number of DDP processes, used to estimate the global throughput.
+        enabled (bool): If False, every method is a no-op.
+
+    Example usage:
+        profiler = TrainingProfiler(output_path, device, sample_every=50)
+        profiler.epoch_begin()
+        for step, batch in enumerate(dataloader):
+            profiler.step_begin(epoch, step)
+            with profiler.phase("forward"):
+                out = model(batch)
+            ...
+            profiler.step_end(batch_size)
+        profiler.epoch_end(epoch)
+        profiler.close()
+    """
+
+    # "validation" is only timed on the steps followed by a step-based validation pass
+    PHASES = (
+        "data_wait",
+        "h2d",
+        "forward",
+        "loss",
+        "backward",
+        "optimizer",
+        "validation",
+    )
+
+    def __init__(
+        self, output_path=None, device=None, sample_every=50, world_size=1, enabled=True
+    ):
+        self.enabled = enabled and output_path is not None
+        self.device = device if device is not None else torch.device("cpu")
+        self.sample_every = max(1, sample_every)
+        self.world_size = world_size
+        self._file = None
+        if self.enabled:
+            results_dir = os.path.join(output_path, "results")
+            os.makedirs(results_dir, exist_ok=True)
+            self.file_path = os.path.join(results_dir, "training_profile.jsonl")
+            self._file = open(self.file_path, "a")
+
+        self._sampled = False
+        self._step_record = None
+        self._step_start = None
+        self._last_step_end = None
+        self._epoch_start = None
+        self._epoch_samples = 0
+        self._epoch_phase_totals = {}
+        self._epoch_sampled_steps = 0
+
+    def _sync(self):
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
+
+    def _memory_record(self):
+        if self.device.type == "cuda":
+            # Peak of the epoch, reset in epoch_begin
+            return {
+                "peak_memory_mb": torch.cuda.max_memory_allocated(self.device) / 2**20
+            }
+        # ru_maxrss is the peak of the process lifetime, reported in bytes on macOS and in
+        # kilobytes on Linux
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {
+            "process_peak_rss_mb": (
+                rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+            )
+        }
+
+    def _write(self, record):
+        self._file.write(json.dumps(record) + "\n")
+
+    def epoch_begin(self):
+        """Marks the start of a training epoch."""
+        if not self.enabled:
+            return
+        if self.device.type == "cuda":
+            torch.cuda.reset_peak_memory_stats(self.device)
+        self._epoch_start = time.perf_counter()
+        self._last_step_end = self._epoch_start
+        self._epoch_samples = 0
+        self._epoch_phase_totals = {phase: 0.0 for phase in self.PHASES}
+        self._epoch_sampled_steps = 0
+
+    def step_begin(self, epoch, step):
+        """
+        Marks the start of a step, right after the batch has been fetched.
+
+        Args:
+            epoch (int): Current epoch.
+            step (int): Index of the step within the epoch.
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self._sampled = step % self.sample_every == 0
+        if self._sampled:
+            self._step_record = {
+                "type": "step",
+                "epoch": epoch + 1,
+                "step": step,
+                "data_wait_ms": (now - self._last_step_end) * 1e3,
+            }
+            self._step_start = now
+
+    def phase(self, name):
+        """
+        Context manager timing one phase of a sampled step. A no-op on unsampled steps.
+
+        Args:
+            name (str): One of `TrainingProfiler.PHASES`.
+        """
+        if not (self.enabled and self._sampled):
+            return nullcontext()
+        return self._timed_phase(name)
+
+    @contextmanager
+    def _timed_phase(self, name):
+        self._sync()
+        start = time.perf_counter()
+        yield
+        self._sync()
+        self._step_record[f"{name}_ms"] = (time.perf_counter() - start) * 1e3
+
+    def step_end(self, batch_size):
+        """
+        Marks the end of a step.
+
+        Args:
+            batch_size (int): Number of samples processed in the step.
+        """
+        if not self.enabled:
+            return
+        self._epoch_samples += batch_size
+        now = time.perf_counter()
+        if self._sampled:
+            record = self._step_record
+            record["step_ms"] = (now - self._step_start) * 1e3
+            record["samples_per_s"] = batch_size / max(
+                now - self._step_start + record["data_wait_ms"] / 1e3, 1e-12
+            )
+            for phase in self.PHASES:
+                self._epoch_phase_totals[phase] += record.get(f"{phase}_ms", 0.0)
+            self._epoch_sampled_steps += 1
+            self._write(record)
+            self._sampled = False
+        self._last_step_end = now
+
+    def epoch_end(self, epoch):
+        """
+        Records the throughput, memory peak and mean phase timings of the epoch.
+
+        Args:
+            epoch (int): Current epoch.
+
+        Returns:
+            dict: The epoch record, or None if profiling is disabled.
+        """
+        if not self.enabled:
+            return None
+        self._sync()
+        epoch_time = time.perf_counter() - self._epoch_start
+        samples_per_s = self._epoch_samples / max(epoch_time, 1e-12)
+        record = {
+            "type": "epoch",
+            "epoch": epoch + 1,
+            "samples": self._epoch_samples,
+            "epoch_time_s": epoch_time,
+            "samples_per_s": samples_per_s,
+            "global_samples_per_s": samples_per_s * self.world_size,
+            **self._memory_record(),
+            "sampled_steps": self._epoch_sampled_steps,
+        }
+        for phase in self.PHASES:
+            record[f"mean_{phase}_ms"] = self._epoch_phase_totals[phase] / max(
+                self._epoch_sampled_steps, 1
+            )
+        self._write(record)
+        self._file.flush()
+        return record
+
+    def close(self):
+        """Closes the output file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
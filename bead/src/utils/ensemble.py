@@ -0,0 +1,142 @@
+"""
+Vectorized ensembles of trained models of the same architecture.
+
+The parameters and buffers of the members are stacked along a leading member dimension with
+`torch.func.stack_module_state`, and one forward pass evaluates every member on the same batch
+through `torch.func.vmap` over `functional_call`. Per-event loss components are computed for
+every member and aggregated over the members into one anomaly score per event.
+
+Functions:
+    resolve_member_paths: Resolves the configured ensemble members to model files.
+    aggregate: Aggregates per-member scores over the members.
+
+Classes:
+    ModelEnsemble: Evaluates all members of an ensemble in one vectorized forward pass.
+"""
+
+import copy
+import os
+
+import torch
+from torch.func import functional_call, stack_module_state, vmap
+
+from . import helper
+
+AGGREGATIONS = ("mean", "median", "max")
+
+
+def resolve_member_paths(members, models_dir):
+    """
+    Resolves the configured ensemble members to model files.
+
+    Args:
+        members (list): Model file names relative to `models_dir`, or absolute paths.
+        models_dir (str): Directory with the saved models.
+
+    Returns:
+        list: Paths of the member models.
+
+    Raises:
+        FileNotFoundError: If a member model does not exist.
+    """
+    paths = [os.path.join(models_dir, member) for member in members]
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        raise FileNotFoundError(f"Ensemble member models not found: {missing}")
+    return paths
+
+
+def aggregate(scores, aggregation="mean"):
+    """
+    Aggregates per-member scores over the members.
+
+    Args:
+        scores (torch.Tensor): Scores with shape (members, events).
+        aggregation (str): "mean", "median" or "max".
+
+    Returns:
+        torch.Tensor: One score per event.
+    """
+    if aggregation == "mean":
+        return scores.mean(0)
+    if aggregation == "median":
+        return scores.median(0).values
+    if aggregation == "max":
+        return scores.max(0).values
+    raise ValueError(
+        f"Unsupported ensemble_aggregation: {aggregation}. "
+        f"Choose from {', '.join(AGGREGATIONS)}."
+    )
+
+
+class ModelEnsemble:
+    """
+    Evaluates all members of an ensemble in one vectorized forward pass.
+
+    Args:
+        models (list): Trained models of the same architecture, in eval mode and on one device.
+    """
+
+    def __init__(self, models):
+        self.num_members = len(models)
+        self.params, self.buffers = stack_module_state(models)
+        # Structure of the members; its own weights are replaced by the stacked ones
+        self.base = copy.deepcopy(models[0]).eval()
+
+    def _member_forward(self, params, buffers, inputs):
+        recon, mu, logvar, ldj, z0, zk = functional_call(
+            self.base, (params, buffers), (inputs,)
+        )
+        # vmap only returns tensors, models without flows return a python scalar ldj
+        if not isinstance(ldj, torch.Tensor):
+            ldj = torch.zeros_like(mu[:, 0]) + ldj
+        return recon, mu, logvar, ldj, z0, zk
+
+    def forward(self, inputs):
+        """
+        Runs every member on the same events.
+
+        Args:
+            inputs (torch.Tensor): Events with the batch as first dimension.
+
+        Returns:
+            tuple: The model outputs with a leading member dimension.
+        """
+        return vmap(self._member_forward, in_dims=(0, 0, None), randomness="different")(
+            self.params, self.buffers, inputs
+        )
+
+    __call__ = forward
+
+    def member_parameters(self, member):
+        """Returns the parameters of one member, for the regularization terms of the loss."""
+        return [param[member] for param in self.params.values()]
+
+    def score(self, loss_fn, inputs, num_samples=1):
+        """
+        Computes the per-event loss components of every member.
+
+        Args:
+            loss_fn (loss.BaseLoss): The loss defining the anomaly scores.
+            inputs (torch.Tensor): Events with the batch as first dimension.
+            num_samples (int): Posterior samples per event (see `helper.sample_forward`).
+
+        Returns:
+            list: One tensor with shape (members, events) per loss component.
+        """
+        outputs, targets = helper.sample_forward(self, inputs, num_samples)
+        recon, mu, logvar, ldj, z0, zk = outputs
+        members = []
+        for member in range(self.num_members):
+            losses = loss_fn.calculate_per_event(
+                recon=recon[member],
+                target=targets,
+                mu=mu[member],
+                logvar=logvar[member],
+                zk=zk[member],
+                parameters=self.member_parameters(member),
+                log_det_jacobian=0,
+                generator_labels=None,
+            )
+            members.append(helper.average_samples(losses, num_samples))
+        return [torch.stack(component) for component in zip(*members, strict=True)]
@@ -0,0 +1,319 @@
+"""
+Lightweight model evaluation on a held-out background/signal sample.
+
+Used to compare many models (sweep trials, intermittent checkpoints) without a full `detect` run
+per model: the test tensors are loaded once, optionally subsampled, and every model scores them
+with batched per-event losses. Saved checkpoints are scored in parallel worker processes that
+share the test tensors.
+
+Functions:
+    load_test_tensors: Loads the background and signal test tensors of the configured input level.
+    score_events: Computes per-event loss components of a model in batches.
+    score_auc: Computes the AUC of per-event scores, ignoring non-finite scores.
+    evaluate_model: Scores a model and reports its losses, AUC and latency.
+    find_checkpoints: Lists the intermittent and final models of a models directory.
+    score_checkpoint: Loads and evaluates one saved model (runs in a worker process).
+    evaluate_checkpoints: Evaluates saved models in parallel on a shared sample.
+    promote_checkpoint: Copies a checkpoint to model.pt, keeping the final model.
+"""
+
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from sklearn.metrics import roc_auc_score
+
+from . import data_processing, helper
+
+
+def load_test_tensors(paths, config, subset_size=0, seed=0, verbose=False):
+    """
+    Loads the background and signal test tensors of the configured input level.
+
+    Args:
+        paths (dict): Dictionary of common paths used in the pipeline.
+        config (dataClass): Base class selecting user inputs.
+        subset_size (int): If > 0, a fixed random subset of this many background and as many
+            signal events is drawn.
+        seed (int): Seed of the subset selection.
+        verbose (bool): If True, prints out more information.
+
+    Returns:
+        tuple: (inputs, labels) with labels 0 for background and 1 for signal.
+    """
+    level_index = {"event": 0, "jet": 1, "constituent": 2}[config.input_level]
+    generator = torch.Generator().manual_seed(seed)
+
+    inputs, labels = [], []
+    for label, keyword in enumerate(("bkg_test", "sig_test")):
+        data = data_processing.preproc_inputs(paths, config, keyword, verbose)
+        data, _ = helper.data_label_split(data)
+        tensor = data[level_index].float()
+        if subset_size > 0 and len(tensor) > subset_size:
+            rows = torch.randperm(len(tensor), generator=generator)[:subset_size]
+            tensor = tensor[rows.sort().values]
+        inputs.append(tensor)
+        labels.append(torch.full((len(tensor),), float(label)))
+
+    inputs = torch.cat(inputs)
+    if "ConvVAE" in config.model_name or "ConvAE" in config.model_name:
+        inputs = inputs.unsqueeze(1)
+    return inputs, torch.cat(labels)
+
+
+def score_events(
+    model, loss_fn, inputs, batch_size=1024, device=None, config=None, parameters=None
+):
+    """
+    Computes the per-event loss components of a model in batches.
+
+    The values match the per-event losses of inference, which evaluates one event at a time.
+
+    Args:
+        model (nn.Module): The model, in eval mode.
+        loss_fn (loss.BaseLoss): The loss defining the anomaly scores.
+        inputs (torch.Tensor): Events to score.
+        batch_size (int): Number of events per forward pass.
+        device (torch.device): Device to run on. Defaults to the model's device.
+        config (dataClass): Base class selecting user inputs, used for the autocast settings and
+            the scoring mode (see `helper.set_scoring_mode`).
+        parameters (list): Parameters for the regularization terms of the loss, default is the
+            parameters of `model`.
+
+    Returns:
+        dict: Component name -> numpy array with one score per event.
+    """
+    device = device or next(model.parameters()).device
+    if parameters is None:
+        parameters = list(model.parameters())
+    num_samples = helper.set_scoring_mode(model, config)
+    components = []
+    with torch.no_grad():
+        for batch in inputs.split(batch_size):
+            batch = batch.to(device)
+            with helper.autocast(config, device):
+                out, targets = helper.sample_forward(model, batch, num_samples)
+            recon, mu, logvar, ldj, z0, zk = out
+            per_event = loss_fn.calculate_per_event(
+                recon=recon,
+                target=targets,
+                mu=mu,
+                logvar=logvar,
+                zk=zk,
+                parameters=parameters,
+                log_det_jacobian=0,
+                generator_labels=None,
+            )
+            per_event = helper.average_samples(per_event, num_samples)
+            components.append([c.float().cpu() for c in per_event])
+    return {
+        name: torch.cat(values).numpy()
+        for name, values in zip(
+            loss_fn.component_names, zip(*components, strict=True), strict=True
+        )
+    }
+
+
+def score_auc(scores, labels):
+    """
+    Computes the AUC of per-event scores, ignoring events with non-finite scores.
+
+    Args:
+        scores (np.ndarray): One score per event, higher meaning more signal-like.
+        labels (array-like): 0 for background, 1 for signal.
+
+    Returns:
+        float: The AUC, or NaN if the finite scores do not cover both classes.
+    """
+    labels = np.asarray(labels)
+    finite = np.isfinite(scores)
+    if len(np.unique(labels[finite])) != 2:
+        return float("nan")
+    return float(roc_auc_score(labels[finite], scores[finite]))
+
+
+def evaluate_model(model, loss_fn, inputs, labels, batch_size=1024, config=None):
+    """
+    Scores a held-out background/signal sample and reports losses, AUC and latency.
+
+    Args:
+        model (nn.Module): The model, in eval mode.
+        loss_fn (loss.BaseLoss): The loss defining the anomaly scores.
+        inputs (torch.Tensor): Background and signal events.
+        labels (torch.Tensor): 0 for background, 1 for signal.
+        batch_size (int): Number of events per forward pass.
+        config (dataClass): Base class selecting user inputs, used for the autocast settings.
+
+    Returns:
+        dict: Mean background loss, AUC of every loss component (`auc_<name>`, with `auc` for the
+            total loss) and the latency in microseconds per event.
+    """
+    start = time.perf_counter()
+    scores = score_events(model, loss_fn, inputs, batch_size, config=config)
+    elapsed = time.perf_counter() - start
+
+    # The first component is the total loss
+    total_name = loss_fn.component_names[0]
+    labels = np.asarray(labels)
+    result = {
+        "bkg_loss": float(scores[total_name][labels == 0].mean()),
+        "latency_us_per_event": elapsed / max(1, len(inputs)) * 1e6,
+    }
+    for name, values in scores.items():
+        result["auc" if name == total_name else f"auc_{name}"] = score_auc(
+            values, labels
+        )
+    return result
+
+
+def find_checkpoints(models_dir):
+    """
+    Lists the intermittent models (`model_epoch_N.pt`) and the final model of a models directory.
+
+    Args:
+        models_dir (str): Directory with the saved models.
+
+    Returns:
+        list: (epoch, path) pairs sorted by epoch, with epoch None for the final model (listed
+            last).
+    """
+    checkpoints = []
+    for name in os.listdir(models_dir):
+        match = re.fullmatch(r"model_epoch_(\d+)\.pt", name)
+        if match:
+            checkpoints.append((int(match.group(1)), os.path.join(models_dir, name)))
+    checkpoints.sort()
+    # After a promotion, the final model of the training run lives in model_final.pt
+    for name in ("model_final.pt", "model.pt"):
+        final_path = os.path.join(models_dir, name)
+        if os.path.exists(final_path):
+            checkpoints.append((None, final_path))
+            break
+    return checkpoints
+
+
+def score_checkpoint(model_path, config_values, inputs, labels, batch_size=1024):
+    """
+    Loads a saved model and evaluates it. Runs in a worker process of `evaluate_checkpoints`.
+
+    Args:
+        model_path (str): Path of the saved state dict.
+        config_values (dict): Option values of the project config.
+        inputs (torch.Tensor): Shared background and signal events.
+        labels (torch.Tensor): 0 for background, 1 for signal.
+        batch_size (int): Number of events per forward pass.
+
+    Returns:
+        dict: The checkpoint name, status and the results of `evaluate_model`.
+    """
+    config = SimpleNamespace(**config_values)
+    result = {"checkpoint": os.path.basename(model_path)}
+    try:
+        in_shape = [1] + list(inputs.shape[1:])
+        model = helper.load_model(model_path, in_shape, config)
+        model = model.to(helper.get_device(config)).eval()
+        loss_fn = helper.get_loss(config.loss_function)(config=config)
+        result.update(
+            status="completed",
+            **evaluate_model(model, loss_fn, inputs, labels, batch_size, config=config),
+        )
+    except Exception as e:
+        result.update(status="failed", error=f"{type(e).__name__}: {e}")
+    return result
+
+
+def evaluate_checkpoints(
+    config,
+    checkpoints,
+    inputs,
+    labels,
+    n_workers=0,
+    batch_size=1024,
+    verbose=False,
+):
+    """
+    Evaluates saved models in parallel worker processes on one shared background/signal sample.
+
+    The sample is moved to shared memory once, and every worker is pinned to its own block of
+    cores.
+
+    Args:
+        config (dataClass): Base class selecting user inputs.
+        checkpoints (list): (epoch, path) pairs, see `find_checkpoints`.
+        inputs (torch.Tensor): Background and signal events.
+        labels (torch.Tensor): 0 for background, 1 for signal.
+        n_workers (int): Number of worker processes (0 uses one per checkpoint, at most one per
+            core).
+        batch_size (int): Number of events per forward pass.
+        verbose (bool): If True, prints every evaluated checkpoint.
+
+    Returns:
+        list: One result per checkpoint (with its `epoch`), in the order of `checkpoints`.
+    """
+    n_workers = n_workers or min(len(checkpoints), helper.get_available_cores())
+    n_workers = max(1, min(n_workers, len(checkpoints)))
+    blocks, cores_per_worker = helper.get_core_blocks(n_workers)
+    ctx = mp.get_context("spawn")
+    core_blocks = ctx.Queue()
+    for block in blocks:
+        core_blocks.put((block, cores_per_worker))
+
+    inputs, labels = inputs.share_memory_(), labels.share_memory_()
+    config_values = helper.config_to_dict(config)
+
+    results = {}
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=ctx,
+        initializer=helper.init_pinned_worker,
+        initargs=(core_blocks,),
+    ) as pool:
+        futures = {
+            pool.submit(
+                score_checkpoint, path, config_values, inputs, labels, batch_size
+            ): epoch
+            for epoch, path in checkpoints
+        }
+        for future in as_completed(futures):
+            epoch = futures[future]
+            results[epoch] = {"epoch": epoch, **future.result()}
+            if verbose:
+                result = results[epoch]
+                print(
+                    f"{result['checkpoint']}: "
+                    + (
+                        f"auc={result['auc']:.4f}, bkg_loss={result['bkg_loss']:.5g}, "
+                        f"{result['latency_us_per_event']:.1f} us/event"
+                        if result["status"] == "completed"
+                        else result["error"]
+                    )
+                )
+    return [results[epoch] for epoch, _ in checkpoints]
+
+
+def promote_checkpoint(checkpoint_path, models_dir):
+    """
+    Copies a checkpoint to `model.pt`, so `detect` uses it. The final model of the training run
+    is kept as `model_final.pt` the first time a checkpoint is promoted.
+
+    Args:
+        checkpoint_path (str): Path of the checkpoint to promote.
+        models_dir (str): Directory with the saved models.
+
+    Returns:
+        str: Path of the promoted model.
+    """
+    model_path = os.path.join(models_dir, "model.pt")
+    if os.path.abspath(checkpoint_path) == os.path.abspath(model_path):
+        return model_path
+    final_path = os.path.join(models_dir, "model_final.pt")
+    if os.path.exists(model_path) and not os.path.exists(final_path):
+        shutil.copy2(model_path, final_path)
+    shutil.copy2(checkpoint_path, model_path)
+    return model_path
@@ -0,0 +1,177 @@
+"""
+Export of trained models as frozen TorchScript inference artefacts.
+
+The eager model is prepared for inference (BatchNorm layers folded into the preceding
+Conv/ConvTranspose/Linear layers, dropout removed), traced with a batch of example events and
+frozen, which inlines the weights and prunes training-only branches. The flow loops are unrolled
+by the trace. Before saving, the exported model is checked against the eager model. Settings baked
+into the trace, such as the scoring mode, are saved inside the artefact as `metadata.json`.
+
+Functions:
+    fold_batch_norm: Folds BatchNorm layers into the preceding Conv/Linear layers in place.
+    prepare_for_inference: Returns an eval-mode copy with folded BatchNorm and without dropout.
+    export_model: Traces, freezes, checks and saves a model.
+    check_parity: Compares the outputs of two models on the same events.
+
+Classes:
+    ExportWrapper: Makes every model output a tensor, as required by tracing.
+"""
+
+import copy
+import json
+
+import torch
+import torch.nn as nn
+from torch.nn.utils.fusion import fuse_conv_bn_eval, fuse_linear_bn_eval
+
+# Output names of the models, in order
+OUTPUT_NAMES = ("recon", "mu", "logvar", "log_det_jacobian", "z0", "zk")
+
+# Name of the metadata file stored inside the exported TorchScript archive
+METADATA_FILE = "metadata.json"
+
+
+def fold_batch_norm(module):
+    """
+    Folds every BatchNorm that directly follows a Conv2d, ConvTranspose2d or Linear layer inside
+    an `nn.Sequential` into that layer, and replaces the BatchNorm by `nn.Identity`. The module
+    has to be in eval mode, so the running statistics are used.
+
+    Args:
+        module (nn.Module): The module to fold, modified in place.
+
+    Returns:
+        int: Number of folded BatchNorm layers.
+    """
+    folded = 0
+    for child in module.modules():
+        if not isinstance(child, nn.Sequential):
+            continue
+        for i in range(1, len(child)):
+            layer, norm = child[i - 1], child[i]
+            if not isinstance(norm, (nn.BatchNorm1d, nn.BatchNorm2d)):
+                continue
+            if isinstance(layer, nn.Linear) and isinstance(norm, nn.BatchNorm1d):
+                child[i - 1] = fuse_linear_bn_eval(layer, norm)
+            elif isinstance(layer, (nn.Conv2d, nn.ConvTranspose2d)) and isinstance(
+                norm, nn.BatchNorm2d
+            ):
+                child[i - 1] = fuse_conv_bn_eval(
+                    layer, norm, transpose=isinstance(layer, nn.ConvTranspose2d)
+                )
+            else:
+                continue
+            child[i] = nn.Identity()
+            folded += 1
+    return folded
+
+
+def prepare_for_inference(model):
+    """
+    Returns an eval-mode copy of a model with BatchNorm folded and dropout modules removed.
+
+    Args:
+        model (nn.Module): The trained model.
+
+    Returns:
+        tuple: (prepared model, number of folded BatchNorm layers)
+    """
+    model = copy.deepcopy(model).eval()
+    folded = fold_batch_norm(model)
+    for child in list(model.modules()):
+        for child_name, grandchild in list(child.named_children()):
+            if isinstance(grandchild, nn.Dropout):
+                setattr(child, child_name, nn.Identity())
+    return model, folded
+
+
+class ExportWrapper(nn.Module):
+    """
+    Wraps a model so that every output is a tensor. Models without flows return a python scalar
+    log-det-jacobian, which is returned as one zero per event instead.
+
+    Args:
+        model (nn.Module): The model to wrap.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, x):
+        recon, mu, logvar, ldj, z0, zk = self.model(x)
+        if not isinstance(ldj, torch.Tensor):
+            ldj = torch.zeros_like(mu[:, 0]) + ldj
+        return recon, mu, logvar, ldj, z0, zk
+
+
+def check_parity(reference, candidate, inputs, seed=0):
+    """
+    Compares the outputs of two models on the same events. Both forward passes start from the
+    same RNG state, so the sampled latents match as well.
+
+    Args:
+        reference (nn.Module): The eager model.
+        candidate (nn.Module): The exported model.
+        inputs (torch.Tensor): Events to compare on.
+        seed (int): Seed of the latent sampling.
+
+    Returns:
+        dict: Output name -> maximum absolute difference.
+    """
+    with torch.no_grad():
+        torch.manual_seed(seed)
+        expected = ExportWrapper(reference)(inputs)
+        torch.manual_seed(seed)
+        actual = candidate(inputs)
+    return {
+        name: (a.float() - e.float()).abs().max().item() if e.numel() else 0.0
+        for name, e, a in zip(OUTPUT_NAMES, expected, actual, strict=True)
+    }
+
+
+def export_model(
+    model, example_inputs, export_path, atol=1e-4, metadata=None, verbose=False
+):
+    """
+    Exports a trained model as a frozen TorchScript artefact.
+
+    Args:
+        model (nn.Module): The trained model.
+        example_inputs (torch.Tensor): A batch of events used for tracing and the parity check.
+        export_path (str): Path of the exported model.
+        atol (float): Largest allowed absolute difference to the eager model.
+        metadata (dict): JSON-serialisable settings the trace depends on (e.g. `scoring_mode`),
+            read back by `helper.load_exported_model`.
+        verbose (bool): If True, prints the folding and the parity check.
+
+    Returns:
+        dict: Output name -> maximum absolute difference to the eager model.
+
+    Raises:
+        RuntimeError: If the exported model does not match the eager model within `atol`.
+    """
+    model = model.eval()
+    prepared, folded = prepare_for_inference(model)
+    wrapper = ExportWrapper(prepared).eval()
+    with torch.no_grad():
+        # The latent sampling makes the outputs random, so the built-in trace check would fail
+        traced = torch.jit.trace(wrapper, example_inputs, check_trace=False)
+    frozen = torch.jit.freeze(traced)
+
+    parity = check_parity(model, frozen, example_inputs)
+    if verbose:
+        print(f"Folded {folded} BatchNorm layers")
+        print(
+            "Max abs difference to the eager model: "
+            + ", ".join(f"{name}={diff:.2e}" for name, diff in parity.items())
+        )
+    if max(parity.values()) > atol:
+        raise RuntimeError(
+            f"Exported model differs from the eager model by more than {atol}: {parity}"
+        )
+
+    torch.jit.save(
+        frozen, export_path, _extra_files={METADATA_FILE: json.dumps(metadata or {})}
+    )
+    return parity
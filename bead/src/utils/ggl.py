@@ -15,6 +15,12 @@ Functions:
     run_inference: Execute model inference pipeline.
     run_plots: Generate plots from results.
     run_diagnostics: Run model diagnostics.
+    run_tuning: Tune CPU thread, worker and affinity settings and write them to the config.
+    run_sweep: Run a parallel hyperparameter sweep on one shared, preprocessed dataset.
+    run_checkpoint_selection: Score the saved checkpoints in parallel and pick the best one.
+    run_export: Export the trained model as a frozen, BatchNorm-folded TorchScript model.
+    run_server: Serve per-event scores of the trained model over a local socket.
+    update_config_file: Overwrite option values in a project config file.
     run_full_chain: Execute a sequence of operations.
 
 Classes:
@@ -23,7 +29,9 @@ Classes:
 
 import argparse
 import importlib
+import json
 import os
+import re
 import sys
 import time
 from dataclasses import dataclass
@@ -36,7 +44,18 @@ import torch
 from tqdm.rich import tqdm
 
 from ..trainers import inference, training
-from . import conversion, data_processing, diagnostics, helper, plotting
+from . import (
+    conversion,
+    data_processing,
+    diagnostics,
+    evaluation,
+    export,
+    helper,
+    plotting,
+    serving,
+    sweep,
+    tuning,
+)
 
 
 def get_arguments():
@@ -77,7 +96,18 @@ def get_arguments():
         "chain \t\t runs all modes (except new_project) in the sequence prescribed by the <-o> or <--options> flag.\n\t\t"
         " For example, when using <-m chain>, when you set <-o convertcsv_prepareinputs_train_detect>\n\t\t"
         " it will run the convert_csv, prepare_inputs, train and detect modes in sequence.\n\n"
-        "diagnostics \t runs the diagnostics mode. Generates runtime metrics using profilers\n\n",
+        "diagnostics \t runs the diagnostics mode. Plots the neural activation pattern saved by detect\n\t\t"
+        " with activation_extraction = True\n\n"
+        "tune \t\t runs short synthetic training and inference trials over CPU thread, DataLoader worker\n\t\t"
+        " and affinity settings and writes the fastest combination into the project config\n\n"
+        "sweep \t\t runs a grid or random hyperparameter sweep over the 'sweep_params' config option.\n\t\t"
+        " Loads the data once into shared memory, trains the trials in parallel and writes a summary table\n\n"
+        "select_checkpoint \t scores every intermittent model_epoch_N.pt and model.pt on a shared\n\t\t"
+        " background/signal test sample in parallel and optionally promotes the best one to model.pt\n\n"
+        "export \t\t folds BatchNorm into the preceding layers, traces and freezes the trained model\n\t\t"
+        " and saves it as models/model_frozen.pt after checking it against the eager model\n\n"
+        "serve \t\t loads the trained model once and returns per-event scores for batches of preprocessed\n\t\t"
+        " events sent to 'serve_address', coalescing concurrent requests into micro-batches\n\n",
     )
     parser.add_argument(
         "-p",
@@ -108,6 +138,16 @@ def get_arguments():
         action="store_true",
         help="Verbose mode",
     )
+    parser.add_argument(
+        "-r",
+        "--resume",
+        nargs="?",
+        const="latest",
+        default=None,
+        metavar="CHECKPOINT",
+        help="Resume training from a full training-state checkpoint.\n"
+        "Without a value, the latest checkpoint in <project>/output/models/checkpoints is used.\n\n",
+    )
     parser.set_defaults(verbose=False)
 
     args = parser.parse_args()
@@ -115,9 +155,6 @@ def get_arguments():
     workspace_name = args.project[0]
     project_name = args.project[1]
     project_path = os.path.join("bead/workspaces", workspace_name, project_name)
-    config_path = (
-        f"bead.workspaces.{workspace_name}.{project_name}.config.{project_name}_config"
-    )
 
     if args.mode == "new_project":
         config = None
@@ -129,8 +166,8 @@ def get_arguments():
             )
             sys.exit()
         else:
-            config = Config
-            importlib.import_module(config_path).set_config(config)
+            config = load_config(workspace_name, project_name)
+            config.resume = args.resume
 
     return (
         config,
@@ -142,6 +179,25 @@ def get_arguments():
     )
 
 
+def load_config(workspace_name: str, project_name: str):
+    """
+    Imports the project config module and applies it to the `Config` class.
+
+    Args:
+        workspace_name (str): Name of the workspace.
+        project_name (str): Name of the project.
+
+    Returns:
+        Config: The populated configuration class.
+    """
+    config_path = (
+        f"bead.workspaces.{workspace_name}.{project_name}.config.{project_name}_config"
+    )
+    config = Config
+    importlib.import_module(config_path).set_config(config)
+    return config
+
+
 @dataclass
 class Config:
     """
@@ -152,6 +208,12 @@ class Config:
     project_name: str
     file_type: str
     parallel_workers: int
+    torch_threads: int  # Torch intra-op threads (0 keeps the torch default)
+    torch_interop_threads: int  # Torch inter-op threads (0 keeps the torch default)
+    dataloader_workers: int  # DataLoader worker processes (-1 uses parallel_workers)
+    persistent_workers: bool  # Keep DataLoader workers alive between epochs
+    prefetch_factor: int  # Batches prefetched by each DataLoader worker
+    cpu_affinity: bool  # Pin torch threads and DataLoader workers to separate cores
     chunk_size: int
     num_jets: int
     num_constits: int
@@ -168,6 +230,9 @@ class Config:
     epochs: int
     lr: float
     batch_size: int
+    gradient_accumulation_steps: int  # Micro-batches accumulated per optimizer step
+    find_batch_size: bool  # Search the largest useful batch size on the device before training
+    effective_batch_size: int  # Events per optimizer step for the batch size finder (0: largest batch found)
     early_stopping: bool
     early_stoppin_patience: int
     lr_scheduler: bool
@@ -176,17 +241,66 @@ class Config:
     subsample_plot: bool
 
     use_ddp: bool  # To toggle torch Distributed Data Parallel
+    ddp_backend: str  # "auto", "nccl" or "gloo" (CPU data-parallel)
+    ddp_cpu_processes: int  # Worker processes to spawn for CPU DDP without torchrun
+    ddp_cpu_threads: int  # Intra-op threads per CPU DDP process (0 splits cores evenly)
+    ddp_static_graph: bool  # Let DDP reuse the graph of the first iteration (no unused-parameter search)
+    ddp_bucket_cap_mb: int  # Size of the DDP gradient all-reduce buckets in MB
+    ddp_gradient_as_bucket_view: bool  # Let gradients alias the all-reduce buckets (saves a copy)
     use_amp: bool  # To toggle torch Automatic Mixed Precision
+    amp_dtype: str  # "auto" (float16 on CUDA, bfloat16 on CPU), "float16" or "bfloat16"
+    use_compile: bool  # To toggle torch.compile for the model and loss (falls back to eager on failure)
+    compile_mode: str  # torch.compile mode: "default", "reduce-overhead" or "max-autotune"
     min_delta: int
     reg_param: float
     intermittent_model_saving: bool
     intermittent_saving_patience: int
+    val_every_n_epochs: int  # Validate after every n-th epoch
+    val_every_n_steps: int  # Validate every n optimizer steps instead (0: per epoch)
+    val_subset_size: int  # Fixed random validation subset for intermediate checks (0: full set)
+    checkpointing: bool  # Save full training-state checkpoints (resume with --resume)
+    checkpoint_patience: int  # Epochs between checkpoints
+    checkpoint_retention: int  # Most recent checkpoints kept on disk (0 keeps all)
+    latent_collection: str  # "final_pass", "last_epoch" (fused into the last epoch) or "skip"
+    profile_training: bool  # Write sampled per-phase step timings to output/results/training_profile.jsonl
+    profile_every_n_steps: int  # Profile every n-th training step
+    inference_batch_size: int  # Events per inference forward pass (anomaly scores stay per event)
+    inference_workers: int  # CPU inference worker processes scoring contiguous shards (0 or 1: single process)
+    use_exported_model: bool  # Run inference with models/model_frozen.pt written by the export mode
+    use_quantized_model: bool  # CPU inference with int8 dynamic quantization of the Linear layers, if it passes the checks below
+    quantization_eval_size: int  # Quantization check: background and signal test events compared with fp32 (0: all)
+    quantization_max_auc_drop: float  # Quantization check: largest allowed AUC drop
+    quantization_max_score_shift: float  # Quantization check: largest allowed KS statistic between fp32 and int8 scores
+    serve_address: str  # Serve mode: "<host>:<port>" for TCP or "unix:<path>" for a Unix socket
+    serve_max_batch_size: int  # Serve mode: events after which a micro-batch is scored without waiting
+    serve_max_delay_ms: float  # Serve mode: longest wait for more requests after the first of a micro-batch
+    scoring_mode: str  # Latents when scoring: "sample" (one posterior sample), "mean" (deterministic) or "average"
+    scoring_samples: int  # Posterior samples per event for scoring_mode = "average", in one vectorized forward pass
+    ensemble_models: list  # Detect with an ensemble of these files in output/models (e.g. ["model.pt", "model_epoch_50.pt"]), [] for a single model
+    ensemble_aggregation: str  # Ensemble score of an event over the members: "mean", "median" or "max"
+    use_score_cache: bool  # Reuse background scores of an unchanged model and background test set in detect
+    score_cache_size: int  # Score cache entries kept in output/score_cache (0 keeps all)
+    inference_outputs: str  # "scores" (per-event losses only), "latents" (+ mu, logvar, z0, zk, ldj) or "all" (+ reconstructions)
+    selection_eval_size: int  # Checkpoint selection: background and signal test events scored per checkpoint (0: all)
+    selection_workers: int  # Checkpoint selection: worker processes (0: one per checkpoint, at most one per core)
+    selection_metric: str  # Checkpoint selection: "auc" (highest) or "bkg_loss" (lowest) picks the best checkpoint
+    promote_best_checkpoint: bool  # Checkpoint selection: copy the best checkpoint to model.pt
     activation_extraction: bool
     deterministic_algorithm: bool
     separate_model_saving: bool
     subsample_size: int
     contrastive_temperature: float
     contrastive_weight: float
+    supcon_block_size: int  # Anchors per block for memory-efficient SupCon (0 uses the dense loss)
+    sweep_params: dict  # Sweep mode: config field -> list of values, or {"low", "high", "log"} for random search
+    sweep_strategy: str  # Sweep mode: "grid" or "random"
+    sweep_trials: int  # Sweep mode: number of random-search trials
+    sweep_workers: int  # Sweep mode: concurrent trials (0 derives it from the cores)
+    sweep_cores_per_trial: int  # Sweep mode: cores per trial (0 splits the cores evenly)
+    sweep_scheduler: str  # Sweep mode: "none" or "successive_halving" (stop poor trials at epoch rungs)
+    sweep_min_epochs: int  # Sweep mode: epochs before the first successive-halving rung
+    sweep_reduction_factor: int  # Sweep mode: only the best 1/factor of the trials pass a rung
+    sweep_eval_size: int  # Sweep mode: background and signal test events scored per trial (0: all, -1: no AUC)
 
 
 def create_default_config(workspace_name: str, project_name: str) -> str:
@@ -223,6 +337,7 @@ def set_config(c):
     c.epochs                       = 2
     c.lr                           = 0.001
     c.batch_size                   = 2
+    c.gradient_accumulation_steps  = 1
     c.early_stopping               = True
     c.lr_scheduler                 = True
     c.latent_space_plot_style      = "trimap"
@@ -234,19 +349,76 @@ def set_config(c):
 # === Additional configuration options ===
 
     c.use_ddp                      = False
+    c.ddp_backend                  = "auto"
+    c.ddp_cpu_processes            = 0
+    c.ddp_cpu_threads              = 0
+    c.ddp_static_graph             = True
+    c.ddp_bucket_cap_mb            = 25
+    c.ddp_gradient_as_bucket_view  = True
+    c.torch_threads                = 0
+    c.torch_interop_threads        = 0
+    c.dataloader_workers           = -1
+    c.persistent_workers           = False
+    c.prefetch_factor              = 2
+    c.cpu_affinity                 = False
+    c.find_batch_size              = False
+    c.effective_batch_size         = 0
     c.use_amp                      = False
+    c.amp_dtype                    = "auto"
+    c.use_compile                  = False
+    c.compile_mode                 = "default"
     c.early_stopping_patience      = 100
     c.min_delta                    = 0
     c.lr_scheduler_patience        = 50
     c.reg_param                    = 0.001
     c.intermittent_model_saving    = False
     c.intermittent_saving_patience = 100
+    c.val_every_n_epochs           = 1
+    c.val_every_n_steps            = 0
+    c.val_subset_size              = 0
+    c.checkpointing                = False
+    c.checkpoint_patience          = 1
+    c.checkpoint_retention         = 2
+    c.latent_collection            = "final_pass"
+    c.profile_training             = False
+    c.profile_every_n_steps        = 50
+    c.inference_batch_size         = 1024
+    c.inference_outputs            = "all"
+    c.ensemble_models              = []
+    c.ensemble_aggregation         = "mean"
+    c.use_score_cache              = False
+    c.score_cache_size             = 4
+    c.scoring_mode                 = "sample"
+    c.scoring_samples              = 8
+    c.inference_workers            = 0
+    c.use_exported_model           = False
+    c.use_quantized_model          = False
+    c.quantization_eval_size       = 10000
+    c.quantization_max_auc_drop    = 0.005
+    c.quantization_max_score_shift = 0.05
+    c.serve_address                = "127.0.0.1:7050"
+    c.serve_max_batch_size         = 4096
+    c.serve_max_delay_ms           = 2.0
+    c.selection_eval_size          = 10000
+    c.selection_workers            = 0
+    c.selection_metric             = "auc"
+    c.promote_best_checkpoint      = False
     c.activation_extraction        = False
     c.deterministic_algorithm      = False
     c.separate_model_saving        = False
     c.subsample_size               = 300000
     c.contrastive_temperature      = 0.07
     c.contrastive_weight           = 0.005
+    c.supcon_block_size            = 0
+    c.sweep_params                 = {{"lr": [0.001, 0.0001], "latent_space_size": [8, 15]}}
+    c.sweep_strategy               = "grid"
+    c.sweep_trials                 = 8
+    c.sweep_workers                = 0
+    c.sweep_cores_per_trial        = 0
+    c.sweep_scheduler              = "none"
+    c.sweep_min_epochs             = 1
+    c.sweep_reduction_factor       = 3
+    c.sweep_eval_size              = 10000
 
     # Parameter annealing configuration
     c.annealing_params = {{
@@ -507,6 +679,41 @@ def run_training(paths, config, verbose: bool = False):
 
     print("Training...")
 
+    data, gen_labels = load_training_tensors(paths, config, verbose)
+
+    # Output path
+    output_path = os.path.join(paths["project_path"], "output")
+    if verbose:
+        print(f"Output path: {output_path}")
+
+    trained_model = training.train(data, gen_labels, output_path, config, verbose)
+
+    print("Training complete")
+
+    end = time.time()
+
+    if verbose:
+        # Print model save path
+        print(f"Model saved to {os.path.join(output_path, 'models', 'model.pt')}")
+        print("\nThe model has the following structure:")
+        print(trained_model.type)
+        # print time taken in hours
+        print(f"The full training pipeline took: {(end - start) / 3600:.3} hours")
+
+
+def load_training_tensors(paths, config, verbose: bool = False):
+    """
+    Preprocesses the training data and splits off the generator labels, which are also saved
+    next to the processed tensors.
+
+    Args:
+        paths (dictionary): Dictionary of common paths used in the pipeline
+        config (dataClass): Base class selecting user inputs
+        verbose (bool): If True, prints out more information
+
+    Returns:
+        tuple: (data, gen_labels), the training and validation tensors and their generator labels
+    """
     keyword = "bkg_train"
 
     # Preprocess the data for training
@@ -541,24 +748,7 @@ def run_training(paths, config, verbose: bool = False):
     data = data_train + data_val
     gen_labels = gen_labels_train + gen_labels_val
 
-    # Output path
-    output_path = os.path.join(paths["project_path"], "output")
-    if verbose:
-        print(f"Output path: {output_path}")
-
-    trained_model = training.train(data, gen_labels, output_path, config, verbose)
-
-    print("Training complete")
-
-    end = time.time()
-
-    if verbose:
-        # Print model save path
-        print(f"Model saved to {os.path.join(output_path, 'models', 'model.pt')}")
-        print("\nThe model has the following structure:")
-        print(trained_model.type)
-        # print time taken in hours
-        print(f"The full training pipeline took: {(end - start) / 3600:.3} hours")
+    return data, gen_labels
 
 
 def run_inference(paths, config, verbose: bool = False):
@@ -668,26 +858,309 @@ def run_plots(paths, config, verbose: bool = False):
     print("Plotting complete")
 
 
-def run_diagnostics(project_path, verbose: bool):
+def run_diagnostics(paths, config, verbose: bool = False):
     """
-    Calls diagnostics.diagnose()
+    Main function of the diagnostics mode. Plots the neural activation pattern saved by `detect`
+    with `activation_extraction` enabled.
 
     Args:
-        input_path (str): path to the np.array contataining the activations values
-        output_path (str): path to store the diagnostics pdf
+        paths (dictionary): Dictionary of common paths used in the pipeline
+        config (dataClass): Base class selecting user inputs
+        verbose (bool): If True, prints out more information
     """
 
-    output_path = os.path.join(project_path, "plotting")
+    output_path = os.path.join(paths["output_path"], "plotting")
     if verbose:
         print("Performing diagnostics")
     if not os.path.exists(output_path):
         os.makedirs(output_path)
-    input_path = os.path.join(project_path, "training", "activations.npy")
+    input_path = os.path.join(paths["output_path"], "models", "activations.npy")
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(
+            f"{input_path} not found. Run detect with c.activation_extraction = True first."
+        )
     diagnostics.nap_diagnose(input_path, output_path, verbose)
     if verbose:
         print("Diagnostics complete")
 
 
+def run_tuning(paths, config, verbose: bool = False):
+    """
+    Main function of the tune mode. Runs short synthetic training and inference trials over
+    combinations of torch threads, DataLoader workers, persistent workers, prefetch factor and
+    CPU affinity, and writes the fastest combination into the project config.
+
+    Args:
+        paths (dictionary): Dictionary of common paths used in the pipeline
+        config (dataClass): Base class selecting user inputs
+        verbose (bool): If True, prints out more information
+    """
+    print("Tuning CPU settings...")
+
+    results = tuning.tune_cpu_settings(config, verbose=verbose)
+    best = results["best"]
+
+    results_path = os.path.join(paths["output_path"], "results")
+    os.makedirs(results_path, exist_ok=True)
+    with open(os.path.join(results_path, "cpu_tuning.json"), "w") as f:
+        json.dump(results, f, indent=2)
+
+    config_path = os.path.join(
+        paths["project_path"], "config", f"{config.project_name}_config.py"
+    )
+    update_config_file(
+        config_path, {name: best[name] for name in tuning.CPU_SETTINGS}
+    )
+
+    print(
+        "Fastest CPU settings: "
+        + ", ".join(f"{name}={best[name]}" for name in tuning.CPU_SETTINGS)
+    )
+    print(
+        f"Training: {best['train_events_per_second']:.0f} events/s, "
+        f"inference: {best['inference_events_per_second']:.0f} events/s"
+    )
+    if verbose:
+        print(f"Settings written to {config_path}")
+
+
+def run_sweep(paths, config, verbose: bool = False):
+    """
+    Main function of the sweep mode. Expands `config.sweep_params` into trials, loads the
+    training and test tensors once, trains the trials in parallel via `sweep.run_sweep` and
+    writes the summary to output/results/sweep_summary.csv and .json.
+
+    Args:
+        paths (dictionary): Dictionary of common paths used in the pipeline
+        config (dataClass): Base class selecting user inputs
+        verbose (bool): If True, prints out more information
+    """
+    start = time.time()
+
+    if getattr(config, "sweep_strategy", "grid") == "random":
+        trials = sweep.random_search(config.sweep_params, config.sweep_trials)
+    else:
+        trials = sweep.grid_search(config.sweep_params)
+    print(f"Sweeping {len(trials)} trials...")
+
+    data, gen_labels = load_training_tensors(paths, config, verbose)
+
+    eval_inputs, eval_labels = None, None
+    eval_size = getattr(config, "sweep_eval_size", 0)
+    if eval_size >= 0:
+        eval_inputs, eval_labels = evaluation.load_test_tensors(
+            paths, config, subset_size=eval_size, verbose=verbose
+        )
+
+    results = sweep.run_sweep(
+        config,
+        trials,
+        data,
+        gen_labels,
+        eval_inputs,
+        eval_labels,
+        os.path.join(paths["output_path"], "sweep"),
+        n_workers=getattr(config, "sweep_workers", 0),
+        cores_per_trial=getattr(config, "sweep_cores_per_trial", 0),
+        scheduler=None
+        if getattr(config, "sweep_scheduler", "none") == "none"
+        else config.sweep_scheduler,
+        verbose=verbose,
+    )
+
+    results_path = os.path.join(paths["output_path"], "results")
+    os.makedirs(results_path, exist_ok=True)
+    results = sweep.write_summary(
+        results,
+        os.path.join(results_path, "sweep_summary.csv"),
+        sort_by="auc" if eval_inputs is not None else "val_loss",
+    )
+    with open(os.path.join(results_path, "sweep_summary.json"), "w") as f:
+        json.dump(results, f, indent=2)
+
+    if results and results[0].get("status") != "failed":
+        print(
+            "Best trial: "
+            + os.path.join(
+                paths["output_path"], "sweep", f"trial_{results[0]['trial']:03d}"
+            )
+        )
+
+    end = time.time()
+    print("Sweep complete")
+    if verbose:
+        print(f"Trial outputs saved to {os.path.join(paths['output_path'], 'sweep')}")
+        print(f"The sweep took: {(end - start) / 3600:.3} hours")
+
+
+def run_checkpoint_selection(paths, config, verbose: bool = False):
+    """
+    Main function of the select_checkpoint mode. Scores every intermittent checkpoint and the
+    final model on one held-out background/signal sample in parallel worker processes, writes
+    loss, AUC and latency per checkpoint to output/results/checkpoint_selection.csv and .json and
+    optionally promotes the best checkpoint to model.pt.
+
+    Args:
+        paths (dictionary): Dictionary of common paths used in the pipeline
+        config (dataClass): Base class selecting user inputs
+        verbose (bool): If True, prints out more information
+    """
+    start = time.time()
+
+    models_dir = os.path.join(paths["output_path"], "models")
+    checkpoints = evaluation.find_checkpoints(models_dir)
+    if not checkpoints:
+        raise FileNotFoundError(
+            f"No saved models found in {models_dir}. "
+            "Train with intermittent_model_saving = True first."
+        )
+    print(f"Scoring {len(checkpoints)} checkpoints...")
+
+    inputs, labels = evaluation.load_test_tensors(
+        paths,
+        config,
+        subset_size=getattr(config, "selection_eval_size", 0),
+        verbose=verbose,
+    )
+    results = evaluation.evaluate_checkpoints(
+        config,
+        checkpoints,
+        inputs,
+        labels,
+        n_workers=getattr(config, "selection_workers", 0),
+        verbose=verbose,
+    )
+
+    results_path = os.path.join(paths["output_path"], "results")
+    os.makedirs(results_path, exist_ok=True)
+    metric = getattr(config, "selection_metric", "auc")
+    results = sweep.write_summary(
+        results, os.path.join(results_path, "checkpoint_selection.csv"), sort_by=metric
+    )
+    with open(os.path.join(results_path, "checkpoint_selection.json"), "w") as f:
+        json.dump(results, f, indent=2)
+
+    best = results[0]
+    if best["status"] != "completed":
+        print("No checkpoint could be evaluated")
+        return
+    print(f"Best checkpoint by {metric}: {best['checkpoint']}")
+    if getattr(config, "promote_best_checkpoint", False):
+        model_path = evaluation.promote_checkpoint(
+            os.path.join(models_dir, best["checkpoint"]), models_dir
+        )
+        print(f"Promoted {best['checkpoint']} to {model_path}")
+
+    end = time.time()
+    if verbose:
+        print(f"Checkpoint selection took: {(end - start) / 60:.3} minutes")
+
+
+def run_export(paths, config, verbose: bool = False):
+    """
+    Main function of the export mode. Folds BatchNorm into the preceding layers of the trained
+    model, traces and freezes it with a sample of test events and saves it as
+    output/models/model_frozen.pt, after checking its outputs against the eager model.
+    The detect mode runs the exported model when `use_exported_model` is set.
+
+    Args:
+        paths (dictionary): Dictionary of common paths used in the pipeline
+        config (dataClass): Base class selecting user inputs
+        verbose (bool): If True, prints out more information
+    """
+    models_dir = os.path.join(paths["output_path"], "models")
+    model_path = os.path.join(models_dir, "model.pt")
+    export_path = os.path.join(models_dir, "model_frozen.pt")
+    print(f"Exporting {model_path}...")
+
+    # A small background/signal sample fixes the input shape and is used for the parity check
+    inputs, _ = evaluation.load_test_tensors(
+        paths, config, subset_size=256, verbose=verbose
+    )
+    in_shape = [1] + list(inputs.shape[1:])
+    model = helper.load_model(model_path=model_path, in_shape=in_shape, config=config)
+    # The latent sampling of the scoring mode is traced into the exported model, and saved with
+    # it so that detect only uses the export for a matching scoring mode
+    helper.set_scoring_mode(model, config)
+
+    export.export_model(
+        model.eval(),
+        inputs,
+        export_path,
+        metadata={"scoring_mode": getattr(config, "scoring_mode", "sample")},
+        verbose=verbose,
+    )
+    print(f"Exported model saved to {export_path}")
+
+
+def run_server(paths, config, verbose: bool = False):
+    """
+    Main function of the serve mode. Loads the trained model once and serves per-event loss
+    components for batches of preprocessed events sent to `config.serve_address` (see
+    `serving.ScoringClient`), until it is interrupted.
+
+    Args:
+        paths (dictionary): Dictionary of common paths used in the pipeline
+        config (dataClass): Base class selecting user inputs
+        verbose (bool): If True, prints out more information
+    """
+    # The input shape follows from the config, so no data is loaded
+    event_shape = tuning.event_shape(config)
+    model_path = os.path.join(paths["output_path"], "models", "model.pt")
+    device = helper.get_device(config)
+    model = helper.load_model(
+        model_path=model_path, in_shape=[1] + list(event_shape), config=config
+    )
+    model = model.to(device).eval()
+    loss_fn = helper.get_loss(config.loss_function)(config=config)
+    if verbose:
+        print(f"Model loaded from {model_path}")
+        print(f"Device used for scoring: {device}")
+
+    serving.serve(
+        model,
+        loss_fn,
+        event_shape,
+        getattr(config, "serve_address", "127.0.0.1:7050"),
+        config=config,
+        device=device,
+        verbose=verbose,
+    )
+
+
+def update_config_file(config_path, values):
+    """
+    Overwrites option values in a project config file, keeping the rest of the file as is.
+    Options missing from the file are added at the end of `set_config`.
+
+    Args:
+        config_path (str): Path of the project config file.
+        values (dict): Option name -> new value.
+    """
+    with open(config_path) as f:
+        text = f.read()
+
+    missing = []
+    for name, value in values.items():
+        pattern = re.compile(rf"^([ \t]*c\.{name}[ \t]*=[ \t]*).*$", re.MULTILINE)
+        # The value is bound as a default, the lambda must not capture the loop variable
+        text, n_subs = pattern.subn(
+            lambda m, value=value: f"{m.group(1)}{value!r}", text
+        )
+        if n_subs == 0:
+            missing.append(f"    c.{name:<29}= {value!r}")
+
+    if missing:
+        # Append after the last single-line option assignment of set_config
+        last = list(
+            re.finditer(r"^[ \t]*c\.\w+[ \t]*=.*[^\s{\[(][ \t]*$", text, re.MULTILINE)
+        )[-1]
+        text = text[: last.end()] + "\n" + "\n".join(missing) + text[last.end() :]
+
+    with open(config_path, "w") as f:
+        f.write(text)
+
+
 def run_full_chain(
     workspace_name: str,
     project_name: str,
@@ -1,6 +1,10 @@
 # This file contains functions that help manipulate different artifacts as required
 # in the pipeline. The functions in this file are used to manipulate data, models, and # tensors.
+import functools
+import json
 import os
+import queue
+import socket
 
 import numpy as np
 import torch
@@ -17,13 +21,13 @@ from sklearn.preprocessing import (
 from torch.utils.data import Dataset
 
 from ..models import models
-from . import loss
+from . import export, loss
 
 
 def get_device(config=None):
     """
     Returns the appropriate processing device.
-    If DDP is active, uses the local_rank.
+    If DDP is active, uses the local_rank, unless DDP runs over the CPU-only gloo backend.
     Otherwise, uses cuda:0 if available, else cpu.
 
     Args:
@@ -33,18 +37,460 @@ def get_device(config=None):
         torch.device: The device to be used for processing.
 
     """
-    if (
-        config
-        and hasattr(config, "is_ddp_active")
-        and config.is_ddp_active
-        and torch.cuda.is_available()
-    ):
-        return torch.device(f"cuda:{config.local_rank}")
+    if config and hasattr(config, "is_ddp_active") and config.is_ddp_active:
+        if getattr(config, "ddp_backend", "nccl") == "gloo":
+            return torch.device("cpu")
+        if torch.cuda.is_available():
+            return torch.device(f"cuda:{config.local_rank}")
     if torch.cuda.is_available():
         return torch.device("cuda:0")
     return torch.device("cpu")
 
 
+def get_ddp_backend(config=None):
+    """
+    Resolves the torch.distributed backend to use for DDP.
+
+    `config.ddp_backend` can be set to "nccl", "gloo" or "auto" (default). In "auto" mode nccl is
+    used when there is at least one GPU per local process, and gloo (CPU data-parallel) otherwise.
+
+    Args:
+        config (dataClass): Base class selecting user inputs.
+
+    Returns:
+        str: Name of the backend, either "nccl" or "gloo".
+    """
+    backend = getattr(config, "ddp_backend", "auto") if config else "auto"
+    if backend in ("nccl", "gloo"):
+        return backend
+    if backend != "auto":
+        raise ValueError(
+            f"Unsupported DDP backend: {backend}. Choose from 'auto', 'nccl' or 'gloo'."
+        )
+    local_world_size = int(os.environ.get("LOCAL_WORLD_SIZE", 1))
+    if torch.cuda.is_available() and torch.cuda.device_count() >= local_world_size:
+        return "nccl"
+    return "gloo"
+
+
+def get_available_cores():
+    """
+    Returns the number of CPU cores this process is allowed to run on.
+    Respects the affinity mask set by job schedulers like SLURM where available.
+
+    Returns:
+        int: Number of usable CPU cores.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def set_cpu_threads_per_process(config, local_rank, local_world_size):
+    """
+    Pins the torch intra-op thread count (and optionally the CPU affinity) of a CPU DDP worker
+    so that the local processes split the available cores instead of oversubscribing them.
+
+    Args:
+        config (dataClass): Base class selecting user inputs. Uses `ddp_cpu_threads`
+            (0 means an even split of the available cores).
+        local_rank (int): Rank of the process on this node.
+        local_world_size (int): Number of DDP processes on this node.
+
+    Returns:
+        int: Number of intra-op threads set for this process.
+    """
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+    n_cores = len(cores) if cores else get_available_cores()
+    threads = getattr(config, "ddp_cpu_threads", 0) or max(
+        1, n_cores // max(1, local_world_size)
+    )
+
+    # Give every local process its own contiguous block of cores when there are enough to go around
+    if cores and threads * local_world_size <= len(cores):
+        os.sched_setaffinity(
+            0, cores[local_rank * threads : (local_rank + 1) * threads]
+        )
+
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    torch.set_num_threads(threads)
+    return threads
+
+
+def apply_cpu_settings(config, cores=None):
+    """
+    Applies the torch thread counts and CPU affinity of a single (non-DDP) process.
+
+    With `cpu_affinity`, the main process (and its intra-op threads) is pinned to the first
+    `torch_threads` allowed cores and the remaining cores are kept for the DataLoader workers
+    (see `pin_worker`), so that workers and torch threads do not oversubscribe the cores.
+
+    Args:
+        config (dataClass): Base class selecting user inputs. Uses `torch_threads`,
+            `torch_interop_threads` (0 keeps the torch defaults) and `cpu_affinity`.
+        cores (list): Cores to split between the main process and the workers. Defaults to the
+            current affinity of the process.
+
+    Returns:
+        list: Cores reserved for DataLoader workers, or None if the affinity is not pinned.
+    """
+    # The affinity before pinning, split by process pools such as sharded inference
+    config.allowed_cores = (
+        sorted(cores or os.sched_getaffinity(0))
+        if hasattr(os, "sched_getaffinity")
+        else None
+    )
+    threads = getattr(config, "torch_threads", 0)
+    if threads > 0:
+        os.environ["OMP_NUM_THREADS"] = str(threads)
+        torch.set_num_threads(threads)
+    interop_threads = getattr(config, "torch_interop_threads", 0)
+    if interop_threads > 0:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # Can only be set once, before any inter-op parallel work has started
+            pass
+
+    worker_cores = None
+    if getattr(config, "cpu_affinity", False) and hasattr(os, "sched_setaffinity"):
+        cores = config.allowed_cores
+        n_main = min(torch.get_num_threads(), len(cores))
+        os.sched_setaffinity(0, cores[:n_main])
+        worker_cores = cores[n_main:] or cores[:n_main]
+    config.dataloader_worker_cores = worker_cores
+    return worker_cores
+
+
+def pin_worker(worker_id, cores, worker_init_fn=None):
+    """
+    DataLoader `worker_init_fn` pinning a worker process to the given cores.
+
+    Used through `functools.partial`, so it stays picklable for spawned workers.
+
+    Args:
+        worker_id (int): Id of the DataLoader worker.
+        cores (list): Cores the workers may run on.
+        worker_init_fn (callable): Another `worker_init_fn` to call afterwards, or None.
+    """
+    os.sched_setaffinity(0, cores)
+    torch.set_num_threads(1)
+    if worker_init_fn is not None:
+        worker_init_fn(worker_id)
+
+
+def get_dataloader_kwargs(config, device, worker_init_fn=None):
+    """
+    Builds the DataLoader arguments for worker processes, prefetching and memory pinning.
+
+    Args:
+        config (dataClass): Base class selecting user inputs. Uses `dataloader_workers` (-1 falls
+            back to `parallel_workers`), `persistent_workers` and `prefetch_factor`.
+        device (torch.device): The device the batches are moved to.
+        worker_init_fn (callable): `worker_init_fn` of the DataLoader, or None.
+
+    Returns:
+        dict: Keyword arguments for `torch.utils.data.DataLoader`.
+    """
+    num_workers = getattr(config, "dataloader_workers", -1)
+    if num_workers < 0:
+        num_workers = config.parallel_workers
+    worker_cores = getattr(config, "dataloader_worker_cores", None)
+    if num_workers > 0 and worker_cores:
+        worker_init_fn = functools.partial(
+            pin_worker, cores=worker_cores, worker_init_fn=worker_init_fn
+        )
+
+    kwargs = {
+        "num_workers": num_workers,
+        "pin_memory": device.type == "cuda",
+        "worker_init_fn": worker_init_fn,
+    }
+    if num_workers > 0:
+        kwargs["persistent_workers"] = getattr(config, "persistent_workers", False)
+        kwargs["prefetch_factor"] = getattr(config, "prefetch_factor", 2)
+    return kwargs
+
+
+def get_core_blocks(n_workers, cores_per_worker=0, cores=None):
+    """
+    Splits the allowed cores into disjoint blocks, one per worker process of a process pool.
+
+    Args:
+        n_workers (int): Number of worker processes.
+        cores_per_worker (int): Cores per worker (0 splits the cores evenly).
+        cores (list): Cores to split. Defaults to the current affinity of the process.
+
+    Returns:
+        tuple: (blocks, cores_per_worker). The blocks are None if the workers would oversubscribe
+            the cores, in which case they are not pinned.
+    """
+    if cores is None:
+        cores = (
+            sorted(os.sched_getaffinity(0))
+            if hasattr(os, "sched_getaffinity")
+            else list(range(get_available_cores()))
+        )
+    cores_per_worker = cores_per_worker or max(1, len(cores) // max(1, n_workers))
+    if n_workers * cores_per_worker > len(cores):
+        return [None] * n_workers, cores_per_worker
+    blocks = [
+        cores[i * cores_per_worker : (i + 1) * cores_per_worker]
+        for i in range(n_workers)
+    ]
+    return blocks, cores_per_worker
+
+
+def init_pinned_worker(core_blocks):
+    """
+    Process pool initializer pinning a worker to its own block of cores.
+
+    Every worker takes one `(cores, threads)` entry from the queue, restricts its affinity to the
+    cores (if given) and sets its intra-op threads.
+
+    Args:
+        core_blocks (multiprocessing.Queue): Queue with one `(cores, threads)` entry per worker.
+    """
+    try:
+        cores, threads = core_blocks.get(timeout=10)
+    except queue.Empty:
+        cores, threads = None, 1
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    torch.set_num_threads(threads)
+
+
+# Attributes set on the config at runtime, which must not be passed on to worker processes
+RUNTIME_ATTRIBUTES = (
+    "loss_weights",
+    "dataloader_worker_cores",
+    "allowed_cores",
+    "is_ddp_active",
+    "rank",
+    "local_rank",
+    "world_size",
+)
+
+
+def config_to_dict(config):
+    """
+    Collects the option values of a config (the `Config` class or any namespace), without the
+    attributes that are only set at runtime, e.g. to rebuild the config in a worker process.
+
+    Args:
+        config (dataClass): Base class selecting user inputs.
+
+    Returns:
+        dict: Option name -> value.
+    """
+    return {
+        name: value
+        for name, value in vars(config).items()
+        if not name.startswith("_")
+        and not callable(value)
+        and name not in RUNTIME_ATTRIBUTES
+    }
+
+
+def find_free_port():
+    """
+    Asks the OS for a free TCP port on localhost, used as MASTER_PORT for spawned DDP workers.
+
+    Returns:
+        int: A currently unused port number.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get_amp_dtype(config, device):
+    """
+    Resolves the autocast dtype for mixed precision on a given device.
+
+    `config.amp_dtype` can be "float16", "bfloat16" or "auto" (default), which picks float16 on
+    CUDA and bfloat16 on CPU, where recent CPUs have native bf16 matmul support.
+
+    Args:
+        config (dataClass): Base class selecting user inputs.
+        device (torch.device): The device the model runs on.
+
+    Returns:
+        torch.dtype or None: The autocast dtype, or None if mixed precision is disabled.
+    """
+    if not getattr(config, "use_amp", False):
+        return None
+    amp_dtype = getattr(config, "amp_dtype", "auto")
+    if amp_dtype == "auto":
+        return torch.float16 if device.type == "cuda" else torch.bfloat16
+    if amp_dtype not in ("float16", "bfloat16"):
+        raise ValueError(
+            f"Unsupported amp_dtype: {amp_dtype}. Choose from 'auto', 'float16' or 'bfloat16'."
+        )
+    return getattr(torch, amp_dtype)
+
+
+def autocast(config, device):
+    """
+    Returns the autocast context for the model forward pass.
+
+    Args:
+        config (dataClass): Base class selecting user inputs.
+        device (torch.device): The device the model runs on.
+
+    Returns:
+        torch.amp.autocast: Autocast context, disabled if mixed precision is off.
+    """
+    dtype = get_amp_dtype(config, device)
+    return torch.amp.autocast(
+        device_type=device.type, dtype=dtype, enabled=dtype is not None
+    )
+
+
+def get_grad_scaler(config, device):
+    """
+    Creates the gradient scaler for mixed precision training.
+
+    Loss scaling is only needed for float16, whose narrow exponent range underflows small
+    gradients. bfloat16 has the exponent range of float32, so the scaler is disabled for it.
+
+    Args:
+        config (dataClass): Base class selecting user inputs.
+        device (torch.device): The device the model runs on.
+
+    Returns:
+        torch.amp.GradScaler: The (possibly disabled) gradient scaler.
+    """
+    return torch.amp.GradScaler(
+        device.type, enabled=get_amp_dtype(config, device) == torch.float16
+    )
+
+
+def outputs_to_float(outputs):
+    """
+    Casts the floating point tensors of a model output tuple to float32.
+
+    Applied between the autocast forward pass and the loss, so that KL divergence, log-det-jacobian
+    terms and reductions over the batch are computed in full precision.
+
+    Args:
+        outputs (tuple): Model outputs; non-tensor entries (e.g. a scalar ldj) are kept as is.
+
+    Returns:
+        tuple: The outputs with floating point tensors in float32.
+    """
+    return tuple(
+        out.float()
+        if isinstance(out, torch.Tensor) and out.is_floating_point()
+        else out
+        for out in outputs
+    )
+
+
+# Latent sampling of the models when scoring events, see `set_scoring_mode`
+SCORING_MODES = ("sample", "mean", "average")
+
+
+def set_scoring_mode(model, config):
+    """
+    Configures how a VAE draws its latents when scoring events.
+
+    `config.scoring_mode` is "sample" (one random posterior sample per event, as in training),
+    "mean" (the posterior mean, deterministic scores) or "average" (scores averaged over
+    `config.scoring_samples` posterior samples, see `sample_forward`). Exported TorchScript models
+    keep the sampling they were exported with, see `exported_scoring_matches`.
+
+    Args:
+        model (nn.Module): The model to score with.
+        config (dataClass): Base class selecting user inputs.
+
+    Returns:
+        int: Number of posterior samples per event.
+    """
+    mode = getattr(config, "scoring_mode", "sample")
+    if mode not in SCORING_MODES:
+        raise ValueError(
+            f"Unsupported scoring_mode: {mode}. Choose from {', '.join(SCORING_MODES)}."
+        )
+    if not isinstance(model, torch.jit.ScriptModule):
+        for module in model.modules():
+            if hasattr(module, "sample_latents"):
+                module.sample_latents = mode != "mean"
+    if mode == "average":
+        return max(1, getattr(config, "scoring_samples", 1))
+    return 1
+
+
+def exported_scoring_matches(metadata, config):
+    """
+    Checks whether an exported model draws its latents as `config.scoring_mode` requires.
+
+    The posterior mean or the sampling of the latents is traced into the exported model.
+    "sample" and "average" both sample, the number of samples is applied when scoring.
+
+    Args:
+        metadata (dict): Settings saved with the exported model (see `load_exported_model`).
+        config (dataClass): Base class selecting user inputs.
+
+    Returns:
+        bool: False if the modes differ or the export does not record its scoring mode.
+    """
+    exported_mode = metadata.get("scoring_mode")
+    if exported_mode is None:
+        return False
+    return (exported_mode == "mean") == (getattr(config, "scoring_mode", "sample") == "mean")
+
+
+def sample_forward(model, inputs, num_samples=1):
+    """
+    Runs the forward pass with `num_samples` posterior samples per event in one vectorized pass.
+
+    The events are expanded along a leading sample dimension that is folded into the batch, so
+    every event appears `num_samples` times in the same forward pass. Per-event values computed
+    from the outputs are reduced with `average_samples`.
+
+    Args:
+        model (nn.Module): The model, in eval mode.
+        inputs (torch.Tensor): Events with the batch as first dimension.
+        num_samples (int): Number of posterior samples per event.
+
+    Returns:
+        tuple: (model outputs cast to float32, the expanded inputs to use as loss targets)
+    """
+    if num_samples > 1:
+        inputs = (
+            inputs.unsqueeze(0)
+            .expand(num_samples, *inputs.shape)
+            .reshape(-1, *inputs.shape[1:])
+        )
+    return outputs_to_float(call_forward(model, inputs)), inputs
+
+
+def average_samples(values, num_samples):
+    """
+    Averages per-event values of a `sample_forward` pass over the posterior samples.
+
+    Args:
+        values (tuple): Tensors with `num_samples` times the events as first dimension; other
+            entries (e.g. a scalar ldj or one value per batch) are kept as is.
+        num_samples (int): Number of posterior samples per event.
+
+    Returns:
+        tuple: The values with one entry per event.
+    """
+    if num_samples <= 1:
+        return tuple(values)
+    return tuple(
+        value.view(num_samples, -1, *value.shape[1:]).mean(0)
+        if isinstance(value, torch.Tensor)
+        and value.dim() > 0
+        and value.shape[0] % num_samples == 0
+        else value
+        for value in values
+    )
+
+
 def detach_device(tensor):
     """
     Detaches a given tensor to ndarray
@@ -99,9 +545,199 @@ def save_model(model, model_path: str, config=None) -> None:
     """
     if config and hasattr(config, "is_ddp_active") and config.is_ddp_active:
         if config.local_rank == 0:  # Only save from rank 0
-            torch.save(model.module.state_dict(), model_path)
+            torch.save(unwrap_model(model).state_dict(), model_path)
     else:
-        torch.save(model.state_dict(), model_path)
+        torch.save(unwrap_model(model).state_dict(), model_path)
+
+
+def unwrap_model(model):
+    """
+    Returns the plain model inside DDP and/or `torch.compile` wrappers, so that state dicts
+    are saved without the `module.` and `_orig_mod.` prefixes.
+
+    Args:
+        model (nn.Module): The (possibly wrapped) model.
+
+    Returns:
+        nn.Module: The underlying model.
+    """
+    if isinstance(model, nn.parallel.DistributedDataParallel):
+        model = model.module
+    return getattr(model, "_orig_mod", model)
+
+
+def enable_compile_cache(cache_dir):
+    """
+    Points the inductor caches to a persistent directory so compiled artefacts are reused across
+    runs instead of being recompiled every time.
+
+    Args:
+        cache_dir (str): Directory for the compilation caches.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", cache_dir)
+    try:
+        import torch._inductor.config as inductor_config
+
+        inductor_config.fx_graph_cache = True
+    except (ImportError, AttributeError):
+        pass
+
+
+def _enable_eager_fallback():
+    """
+    Makes graphs that fail to compile run eagerly instead of raising.
+
+    This sets `torch._dynamo.config.suppress_errors`, which is process-wide: from the first
+    `compile_model` or `compile_loss` call on, compilation failures of every compiled model and
+    loss in the process (including recompilations for new input shapes) are only logged by torch
+    and the affected graphs run eagerly. It is only set when `use_compile` is enabled.
+    """
+    import torch._dynamo
+
+    torch._dynamo.config.suppress_errors = True
+
+
+def compile_model(model, config, example_input=None, verbose=False):
+    """
+    Compiles a model with `torch.compile`, falling back to eager execution if it fails.
+
+    If `example_input` is given, a warm-up forward pass triggers the compilation right away (in
+    the current train/eval mode) so that failures are caught here. The warm-up leaves the model
+    untouched: BatchNorm buffers and the RNG state are restored afterwards. Graphs that fail to
+    compile later on (e.g. for a new input shape) run eagerly, see `_enable_eager_fallback`.
+
+    Args:
+        model (nn.Module): The model to compile.
+        config (dataClass): Base class selecting user inputs. Uses `compile_mode`.
+        example_input (torch.Tensor): A batch of inputs on the model's device, or None.
+        verbose (bool): If True, prints the outcome.
+
+    Returns:
+        nn.Module: The compiled model, or the eager model if compilation failed.
+    """
+    try:
+        # Fall back to eager per graph instead of raising when a later compilation fails
+        _enable_eager_fallback()
+        compiled = torch.compile(model, mode=getattr(config, "compile_mode", "default"))
+
+        if example_input is not None:
+            buffers = {name: buf.clone() for name, buf in model.named_buffers()}
+            devices = [example_input.device] if example_input.is_cuda else []
+            with torch.random.fork_rng(devices=devices):
+                with torch.set_grad_enabled(model.training):
+                    compiled(example_input)
+            with torch.no_grad():
+                for name, buf in model.named_buffers():
+                    buf.copy_(buffers[name])
+    except Exception as e:
+        print(
+            f"torch.compile failed for {type(model).__name__}, falling back to eager mode: {e}"
+        )
+        return model
+
+    if verbose:
+        print(f"Model compiled with torch.compile (mode: {getattr(config, 'compile_mode', 'default')})")
+    return compiled
+
+
+def compile_loss(loss_fn, config, verbose=False):
+    """
+    Compiles the `calculate` method of a loss object in place.
+
+    `torch.compile` is lazy, the loss is compiled at its first call. Graphs that fail to compile
+    then run eagerly, see `_enable_eager_fallback`. Only used for training: the per-event
+    inference losses run `calculate` under `torch.func.vmap`, which is not compiled.
+
+    Args:
+        loss_fn (loss.BaseLoss): The loss object.
+        config (dataClass): Base class selecting user inputs. Uses `compile_mode`.
+        verbose (bool): If True, prints the outcome.
+
+    Returns:
+        loss.BaseLoss: The same loss object.
+    """
+    _enable_eager_fallback()
+    loss_fn.calculate = torch.compile(
+        loss_fn.calculate, mode=getattr(config, "compile_mode", "default")
+    )
+    if verbose:
+        print(f"Loss {type(loss_fn).__name__} compiled with torch.compile")
+    return loss_fn
+
+
+def find_unused_parameters(model, loss_fn, inputs, labels=None):
+    """
+    Finds the trainable parameters that receive no gradient from the training loss.
+
+    Runs one dry forward and backward pass on a small batch. Like the warm-up in `compile_model`,
+    the probe leaves the model untouched: gradients are cleared and BatchNorm buffers and the RNG
+    state are restored afterwards.
+
+    Args:
+        model (nn.Module): The (unwrapped) model.
+        loss_fn (loss.BaseLoss): The training loss.
+        inputs (torch.Tensor): A batch of inputs on the model's device.
+        labels (torch.Tensor): Generator labels of the batch, or None.
+
+    Returns:
+        list: Names of the parameters without gradient.
+    """
+    buffers = {name: buf.clone() for name, buf in model.named_buffers()}
+    model.zero_grad(set_to_none=True)
+    devices = [inputs.device] if inputs.is_cuda else []
+    with torch.random.fork_rng(devices=devices):
+        recon, mu, logvar, ldj, z0, zk = outputs_to_float(call_forward(model, inputs))
+        loss, *_ = loss_fn.calculate(
+            recon=recon,
+            target=inputs,
+            mu=mu,
+            logvar=logvar,
+            zk=zk,
+            parameters=model.parameters(),
+            log_det_jacobian=ldj
+            if hasattr(ldj, "item")
+            else torch.tensor(0.0, device=inputs.device),
+            generator_labels=labels,
+        )
+        loss.backward()
+
+    unused = [
+        name
+        for name, param in model.named_parameters()
+        if param.requires_grad and param.grad is None
+    ]
+    model.zero_grad(set_to_none=True)
+    with torch.no_grad():
+        for name, buf in model.named_buffers():
+            buf.copy_(buffers[name])
+    return unused
+
+
+def get_ddp_kwargs(config, has_unused_parameters):
+    """
+    Builds the DistributedDataParallel options from the config and the unused-parameter probe.
+
+    With a static graph DDP records the used parameters in the first iteration and reuses that
+    set afterwards, so neither case needs the per-iteration graph traversal of
+    `find_unused_parameters=True`. Without a static graph that traversal is only enabled if the
+    probe found parameters without gradient.
+
+    Args:
+        config (dataClass): Base class selecting user inputs. Uses `ddp_static_graph`,
+            `ddp_bucket_cap_mb` and `ddp_gradient_as_bucket_view`.
+        has_unused_parameters (bool): Whether the probe found parameters without gradient.
+
+    Returns:
+        dict: Keyword arguments for `DistributedDataParallel`.
+    """
+    static_graph = getattr(config, "ddp_static_graph", True)
+    return {
+        "static_graph": static_graph,
+        "find_unused_parameters": has_unused_parameters and not static_graph,
+        "bucket_cap_mb": getattr(config, "ddp_bucket_cap_mb", 25),
+        "gradient_as_bucket_view": getattr(config, "ddp_gradient_as_bucket_view", True),
+    }
 
 
 class Log1pScaler(BaseEstimator, TransformerMixin):
@@ -961,6 +1597,20 @@ class EarlyStopping:
                 print("Early Stopping")
                 self.early_stop = True
 
+    def state_dict(self):
+        """Returns the early stopping progress for checkpointing."""
+        return {
+            "counter": self.counter,
+            "best_loss": self.best_loss,
+            "early_stop": self.early_stop,
+        }
+
+    def load_state_dict(self, state):
+        """Restores the early stopping progress saved by `state_dict`."""
+        self.counter = state["counter"]
+        self.best_loss = state["best_loss"]
+        self.early_stop = state["early_stop"]
+
 
 class LRScheduler:
     """
@@ -1002,6 +1652,14 @@ class LRScheduler:
     def __call__(self, loss):
         self.lr_scheduler.step(loss)
 
+    def state_dict(self):
+        """Returns the state of the wrapped scheduler for checkpointing."""
+        return self.lr_scheduler.state_dict()
+
+    def load_state_dict(self, state):
+        """Restores the state of the wrapped scheduler saved by `state_dict`."""
+        self.lr_scheduler.load_state_dict(state)
+
 
 def load_model(model_path: str, in_shape, config):
     """
@@ -1029,11 +1687,16 @@ def load_model(model_path: str, in_shape, config):
     state_dict = torch.load(str(model_path), map_location="cpu")
 
     new_state_dict = {}
-    is_ddp_checkpoint = any(key.startswith("module.") for key in state_dict.keys())
+    is_wrapped_checkpoint = any(
+        key.startswith(("module.", "_orig_mod.")) for key in state_dict.keys()
+    )
 
-    if is_ddp_checkpoint:
+    if is_wrapped_checkpoint:
         for k, v in state_dict.items():
-            name = k[7:] if k.startswith("module.") else k  # remove `module.`
+            # remove the `module.` (DDP) and `_orig_mod.` (torch.compile) prefixes
+            name = k
+            while name.startswith(("module.", "_orig_mod.")):
+                name = name.split(".", 1)[1]
             new_state_dict[name] = v
         model.load_state_dict(
             new_state_dict, strict=True
@@ -1044,6 +1707,32 @@ def load_model(model_path: str, in_shape, config):
     return model
 
 
+def load_exported_model(model_path: str, device=None, return_metadata=False):
+    """
+    Loads a frozen TorchScript model written by the export mode (see `export.export_model`).
+
+    Args:
+        model_path (str): Path to the exported model
+        device (torch.device): Device to load the model onto, default is CPU
+        return_metadata (bool): If True, also returns the settings saved with the model
+
+    Returns: torch.jit.ScriptModule: The exported model in eval mode, and with
+        `return_metadata` the saved settings as a dict (empty for older exports).
+    """
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(
+            f"Exported model not found at {model_path}. Run the export mode first."
+        )
+    extra_files = {export.METADATA_FILE: ""}
+    model = torch.jit.load(
+        str(model_path), map_location=device or "cpu", _extra_files=extra_files
+    ).eval()
+    if not return_metadata:
+        return model
+    metadata = extra_files[export.METADATA_FILE]
+    return model, json.loads(metadata) if metadata else {}
+
+
 def save_loss_components(loss_data, component_names, suffix, save_dir="loss_outputs"):
     """
     This function unpacks loss_data into separate components, converts each into a NumPy array,
@@ -6,6 +6,7 @@ including basic reconstruction losses, KL divergence, regularization terms, and
 for specialized models like those with normalizing flows.
 
 Classes:
+    LossWeights: Registry of device-resident loss weights shared with the annealing manager.
     BaseLoss: Base class for all loss functions.
     ReconstructionLoss: Standard reconstruction loss (MSE or L1).
     KLDivergenceLoss: Kullback-Leibler divergence for VAE training.
@@ -26,7 +27,97 @@ Classes:
 
 import torch
 import torch.distributed as dist
+import torch.distributed.nn.functional as dist_fn
 from torch.nn import functional as F
+from torch.utils.checkpoint import checkpoint
+
+
+class LossWeights:
+    """
+    Registry of loss weights shared by all loss functions of a run.
+
+    The weights are held as 0-dim tensors on the training device and keyed by the config
+    attribute that defines them (e.g. "reg_param", "contrastive_weight"). Losses keep a reference
+    to the tensor, and updates (e.g. from the AnnealingManager) are written into it in place with
+    `fill_`. Every loss therefore sees the current value without a host-to-device copy per step.
+
+    Args:
+        config (dataClass): Base class selecting user inputs.
+        device (torch.device): Device the weights live on (default: cpu).
+    """
+
+    def __init__(self, config, device=None):
+        self.config = config
+        self.device = device if device is not None else torch.device("cpu")
+        self._weights = {}
+
+    def get(self, name, default=None):
+        """
+        Returns the weight tensor for a config attribute, registering it on first use.
+
+        Args:
+            name (str): Name of the config attribute holding the weight.
+            default (float): Value used if the config does not define the attribute.
+
+        Returns:
+            torch.Tensor: 0-dim float32 tensor on the registry device.
+        """
+        if name not in self._weights:
+            value = getattr(self.config, name, default)
+            self._weights[name] = torch.tensor(
+                float(value), dtype=torch.float32, device=self.device
+            )
+        return self._weights[name]
+
+    def __contains__(self, name):
+        return name in self._weights
+
+    def names(self):
+        """Returns the names of the registered weights."""
+        return list(self._weights)
+
+    def set(self, name, value):
+        """
+        Updates a registered weight in place, so every loss holding it sees the new value.
+
+        Args:
+            name (str): Name of the config attribute holding the weight.
+            value (float): The new value.
+        """
+        if name in self._weights:
+            self._weights[name].fill_(float(value))
+
+    def broadcast(self, src=0):
+        """
+        Broadcasts all weights from `src` to every DDP rank with a single collective.
+
+        Args:
+            src (int): Rank holding the authoritative values.
+        """
+        if not self._weights or not (dist.is_available() and dist.is_initialized()):
+            return
+        names = sorted(self._weights)
+        packed = torch.stack([self._weights[name] for name in names])
+        dist.broadcast(packed, src=src)
+        for name, value in zip(names, packed, strict=True):
+            self._weights[name].copy_(value)
+
+
+def get_loss_weights(config):
+    """
+    Returns the LossWeights registry attached to the config, attaching a CPU one if missing.
+
+    Args:
+        config (dataClass): Base class selecting user inputs.
+
+    Returns:
+        LossWeights: The shared registry.
+    """
+    loss_weights = getattr(config, "loss_weights", None)
+    if loss_weights is None:
+        loss_weights = LossWeights(config)
+        config.loss_weights = loss_weights
+    return loss_weights
 
 
 class BaseLoss:
@@ -41,6 +132,52 @@ class BaseLoss:
     def calculate(self, *args, **kwargs):
         raise NotImplementedError("Subclasses must implement the calculate() method.")
 
+    def calculate_per_event(self, **kwargs):
+        """
+        Computes the loss components separately for every event of a batch.
+
+        Gives the same values as calling `calculate` once per event with a batch size of 1 (the
+        per-event anomaly scores of inference), vectorised over the batch with
+        `torch.func.vmap`. Losses that vmap cannot trace fall back to a python loop.
+
+        Args:
+            **kwargs: The arguments of `calculate`. Tensors with the batch as first dimension
+                are split per event, everything else (e.g. the model parameters) is shared.
+
+        Returns:
+            tuple: One tensor of shape (batch_size,) per loss component.
+        """
+        batch_size = kwargs["target"].shape[0]
+        batched = [
+            name
+            for name, value in kwargs.items()
+            if isinstance(value, torch.Tensor)
+            and value.dim() > 0
+            and value.shape[0] == batch_size
+        ]
+        shared = {
+            name: list(value) if name == "parameters" else value
+            for name, value in kwargs.items()
+            if name not in batched
+        }
+
+        def single_event(*values):
+            event = {
+                name: value.unsqueeze(0)
+                for name, value in zip(batched, values, strict=True)
+            }
+            components = self.calculate(**event, **shared)
+            return tuple(torch.as_tensor(c).reshape(()) for c in components)
+
+        values = [kwargs[name] for name in batched]
+        try:
+            return torch.func.vmap(single_event)(*values)
+        except Exception:
+            per_event = [
+                single_event(*(value[i] for value in values)) for i in range(batch_size)
+            ]
+            return tuple(torch.stack(c) for c in zip(*per_event, strict=True))
+
 
 # ---------------------------
 # Standard AE reco loss
@@ -97,10 +234,55 @@ class KLDivergenceLoss(BaseLoss):
 # ---------------------------
 # SupCon Loss
 # ---------------------------
+def _supcon_anchor_losses(
+    anchors, keys, anchor_labels, key_labels, anchor_idx, temperature
+):
+    """
+    Per-anchor SupCon loss of a block of anchors against all keys.
+
+    Only `[n_anchors, n_keys]` intermediates are created, so the memory of one call is bounded by
+    the block size instead of the full (global) batch.
+
+    Args:
+        anchors (torch.Tensor): Anchor features, shape [n_anchors, feature_dim].
+        keys (torch.Tensor): Features of all samples, shape [n_keys, feature_dim].
+        anchor_labels (torch.Tensor): Labels of the anchors, shape [n_anchors].
+        key_labels (torch.Tensor): Labels of the keys, shape [n_keys].
+        anchor_idx (torch.Tensor): Positions of the anchors within the keys, shape [n_anchors].
+        temperature (float): Softmax temperature.
+
+    Returns:
+        torch.Tensor: Negative mean log-likelihood of the positives of every anchor, shape [n_anchors].
+    """
+    logits = torch.matmul(anchors, keys.T) / temperature
+    # For numerical stability
+    logits_max, _ = torch.max(logits, dim=1, keepdim=True)
+    logits = logits - logits_max.detach()
+
+    key_idx = torch.arange(keys.shape[0], device=keys.device)
+    not_self = anchor_idx.view(-1, 1) != key_idx.view(1, -1)
+    positives = (anchor_labels.view(-1, 1) == key_labels.view(1, -1)) & not_self
+
+    exp_logits = torch.exp(logits) * not_self
+    log_prob = logits - torch.log(exp_logits.sum(1, keepdim=True) + 1e-9)
+
+    num_pos_per_anchor = positives.sum(1)
+    mean_log_prob_pos = (positives * log_prob).sum(1) / (num_pos_per_anchor + 1e-9)
+    return -mean_log_prob_pos
+
+
 class SupervisedContrastiveLoss(BaseLoss):
     """
     Supervised Contrastive Learning loss function.
     Based on: https://arxiv.org/abs/2004.11362
+
+    Config parameters:
+      - contrastive_temperature: softmax temperature (default: 0.07)
+      - supcon_block_size: number of anchors per block for the memory-efficient path. With a
+        block size > 0 each rank only computes the loss of its local anchors against the gathered
+        keys, one row block at a time, and recomputes the blocks in the backward pass. Memory then
+        grows linearly instead of quadratically with the global batch size. 0 (default) uses the
+        dense path that builds the full global similarity matrix on every rank.
     """
 
     def __init__(self, config):
@@ -110,6 +292,7 @@ class SupervisedContrastiveLoss(BaseLoss):
             if hasattr(config, "contrastive_temperature")
             else 0.07
         )
+        self.block_size = getattr(config, "supcon_block_size", 0)
         self.component_names = ["supcon"]
         # DDP related attributes
         self.is_ddp_active = (
@@ -125,56 +308,50 @@ class SupervisedContrastiveLoss(BaseLoss):
         Returns:
             torch.Tensor: Supervised contrastive loss.
         """
-        device = features.device
+        local_batch_size = features.shape[0]
+        offset = 0
+        local_labels = labels.contiguous().view(-1)
 
         if self.is_ddp_active and self.world_size > 1:
-            # Gather features and labels from all GPUs
-            gathered_features_list = [
-                torch.zeros_like(features) for _ in range(self.world_size)
-            ]
+            # Gather features from all ranks with an autograd-aware all_gather, so the gradients
+            # of the other ranks' losses flow back to the local features
+            features = torch.cat(dist_fn.all_gather(features), dim=0)
             gathered_labels_list = [
-                torch.zeros_like(labels) for _ in range(self.world_size)
+                torch.zeros_like(local_labels) for _ in range(self.world_size)
             ]
-
-            dist.all_gather(gathered_features_list, features)
-            dist.all_gather(gathered_labels_list, labels)
-
-            features = torch.cat(gathered_features_list, dim=0)
+            dist.all_gather(gathered_labels_list, local_labels)
             labels = torch.cat(gathered_labels_list, dim=0)
-
-        batch_size = features.shape[0]
-        labels = labels.contiguous().view(-1, 1)
-
-        # Mask to identify positive pairs
-        mask = torch.eq(labels, labels.T).float().to(device)
-
-        # Similarity definition
-        anchor_dot_contrast = torch.div(
-            torch.matmul(features, features.T), self.temperature
-        )
-        # For numerical stability
-        logits_max, _ = torch.max(anchor_dot_contrast, dim=1, keepdim=True)
-        logits = (
-            anchor_dot_contrast - logits_max.detach()
-        )  # Detach to avoid gradients through max
-
-        # Mask-out self-contrast cases
-        logits_mask = torch.scatter(
-            torch.ones_like(mask), 1, torch.arange(batch_size).view(-1, 1).to(device), 0
-        )
-        mask = mask * logits_mask  # Positive pairs, excluding self
-
-        # Compute log_prob
-        exp_logits = torch.exp(logits) * logits_mask
-        log_prob = logits - torch.log(exp_logits.sum(1, keepdim=True) + 1e-9)
-
-        # Compute mean of log-likelihood over positive pairs
-        num_pos_per_anchor = mask.sum(1)
-        mean_log_prob_pos = (mask * log_prob).sum(1) / (num_pos_per_anchor + 1e-9)
-
-        # NLL
-        loss = -mean_log_prob_pos
-        loss = loss.view(1, batch_size).mean()  # Average over the batch
+            offset = dist.get_rank() * local_batch_size
+
+        labels = labels.contiguous().view(-1)
+
+        if self.block_size <= 0:
+            # Dense path: every rank computes the loss of all (global) anchors
+            anchor_idx = torch.arange(features.shape[0], device=features.device)
+            loss = _supcon_anchor_losses(
+                features, features, labels, labels, anchor_idx, self.temperature
+            ).mean()
+            return (loss,)
+
+        # Block-wise path: local anchors only, in row blocks recomputed during backward.
+        # DDP averages the gradients over ranks, which gives the gradient of the global mean.
+        anchor_idx = offset + torch.arange(local_batch_size, device=features.device)
+        block_losses = []
+        for start in range(0, local_batch_size, self.block_size):
+            end = min(start + self.block_size, local_batch_size)
+            block_losses.append(
+                checkpoint(
+                    _supcon_anchor_losses,
+                    features[offset + start : offset + end],
+                    features,
+                    local_labels[start:end],
+                    labels,
+                    anchor_idx[start:end],
+                    self.temperature,
+                    use_reentrant=False,
+                )
+            )
+        loss = torch.cat(block_losses).mean()
 
         return (loss,)
 
@@ -221,7 +398,7 @@ class L1Regularization(BaseLoss):
 
     def __init__(self, config):
         super(L1Regularization, self).__init__(config)
-        self.weight = self.config.reg_param
+        self.weight = get_loss_weights(config).get("reg_param")
         self.component_names = ["l1"]
 
     def calculate(self, parameters):
@@ -241,7 +418,7 @@ class L2Regularization(BaseLoss):
 
     def __init__(self, config):
         super(L2Regularization, self).__init__(config)
-        self.weight = self.config.reg_param
+        self.weight = get_loss_weights(config).get("reg_param")
         self.component_names = ["l2"]
 
     def calculate(self, parameters):
@@ -317,7 +494,7 @@ class VAELoss(BaseLoss):
         self.loss_type = "mse"
         self.reduction = "mean"
         self.kl_loss_fn = KLDivergenceLoss(config)
-        self.kl_weight = torch.tensor(self.config.reg_param)
+        self.kl_weight = get_loss_weights(config).get("reg_param")
         self.component_names = ["loss", "reco", "kl"]
 
     def calculate(
@@ -362,8 +539,8 @@ class VAEFlowLoss(BaseLoss):
         self.loss_type = "mse"
         self.reduction = "mean"
         self.kl_loss_fn = KLDivergenceLoss(config)
-        self.kl_weight = torch.tensor(self.config.reg_param)
-        self.flow_weight = torch.tensor(self.config.reg_param)
+        self.kl_weight = get_loss_weights(config).get("reg_param")
+        self.flow_weight = get_loss_weights(config).get("reg_param")
         self.component_names = ["loss", "reco", "kl"]
 
     def calculate(
@@ -394,14 +571,10 @@ class VAEFlowLoss(BaseLoss):
         # Calculate mean log determinant of the Jacobian
         mean_log_det_jacobian = log_det_jacobian_tensor.mean()
 
-        # Ensure weights are on the same device; not necessary
-        kl_weight_device = self.kl_weight.to(recon_loss.device)
-        flow_weight_device = self.flow_weight.to(recon_loss.device)
-
         total_loss = (
             recon_loss
-            + kl_weight_device * kl_loss
-            - flow_weight_device * mean_log_det_jacobian
+            + self.kl_weight * kl_loss
+            - self.flow_weight * mean_log_det_jacobian
         )
 
         return total_loss, recon_loss, kl_loss
@@ -424,8 +597,8 @@ class VAESupConLoss(BaseLoss):
         super(VAESupConLoss, self).__init__(config)
         self.vae_loss_fn = VAELoss(config)
         self.supcon_loss_fn = SupervisedContrastiveLoss(config)
-        self.reg_param = torch.tensor(config.reg_param)
-        self.contrastive_weight = torch.tensor(config.contrastive_weight)
+        self.reg_param = get_loss_weights(config).get("reg_param")
+        self.contrastive_weight = get_loss_weights(config).get("contrastive_weight")
         self.component_names = [
             "loss",
             "vae_loss",
@@ -460,11 +633,8 @@ class VAESupConLoss(BaseLoss):
             supcon_loss = self.supcon_loss_fn.calculate(
                 zk_normalized, generator_labels
             )[0]
-            # Ensure weights are on the same device
-            contrastive_weight_device = self.contrastive_weight.to(vae_loss.device)
-
             # Combine losses
-            loss = vae_loss + contrastive_weight_device * supcon_loss
+            loss = vae_loss + self.contrastive_weight * supcon_loss
 
             return loss, vae_loss, reco_loss, kl_loss, supcon_loss
 
@@ -486,7 +656,7 @@ class VAEFlowSupConLoss(BaseLoss):
         super(VAEFlowSupConLoss, self).__init__(config)
         self.vaeflow_loss_fn = VAEFlowLoss(config)
         self.supcon_loss_fn = SupervisedContrastiveLoss(config)
-        self.contrastive_weight = torch.tensor(config.contrastive_weight)
+        self.contrastive_weight = get_loss_weights(config).get("contrastive_weight")
         self.component_names = [
             "loss",
             "vaeflow_loss",
@@ -521,11 +691,8 @@ class VAEFlowSupConLoss(BaseLoss):
             supcon_loss = self.supcon_loss_fn.calculate(
                 zk_normalized, generator_labels
             )[0]
-            # Ensure weights are on the same device
-            contrastive_weight_device = self.contrastive_weight.to(vaeflow_loss.device)
-
             # Combine losses
-            loss = vaeflow_loss + contrastive_weight_device * supcon_loss
+            loss = vaeflow_loss + self.contrastive_weight * supcon_loss
 
             return loss, vaeflow_loss, reco_loss, kl_loss, supcon_loss
 
@@ -544,7 +711,7 @@ class VAELossEMD(VAELoss):
 
     def __init__(self, config):
         super(VAELossEMD, self).__init__(config)
-        self.emd_weight = self.config.reg_param
+        self.emd_weight = get_loss_weights(config).get("reg_param")
         self.emd_loss_fn = WassersteinLoss(config)
         self.component_names = ["loss", "vae_loss", "reco", "kl", "emd"]
 
@@ -587,7 +754,7 @@ class VAELossL1(VAELoss):
 
     def __init__(self, config):
         super(VAELossL1, self).__init__(config)
-        self.l1_weight = self.config.reg_param
+        self.l1_weight = get_loss_weights(config).get("reg_param")
         self.l1_reg_fn = L1Regularization(config)
         self.component_names = ["loss", "vae_loss", "reco", "kl", "l1"]
 
@@ -624,7 +791,7 @@ class VAELossL2(VAELoss):
 
     def __init__(self, config):
         super(VAELossL2, self).__init__(config)
-        self.l2_weight = self.config.reg_param
+        self.l2_weight = get_loss_weights(config).get("reg_param")
         self.l2_reg_fn = L2Regularization(config)
         self.component_names = ["loss", "vae_loss", "reco", "kl", "l2"]
 
@@ -665,7 +832,7 @@ class VAEFlowLossEMD(VAEFlowLoss):
 
     def __init__(self, config):
         super(VAEFlowLossEMD, self).__init__(config)
-        self.emd_weight = self.config.reg_param
+        self.emd_weight = get_loss_weights(config).get("reg_param")
         self.emd_loss_fn = WassersteinLoss(config)
         self.component_names = ["loss", "vae_flow_loss", "reco", "kl", "emd"]
 
@@ -708,7 +875,7 @@ class VAEFlowLossL1(VAEFlowLoss):
 
     def __init__(self, config):
         super(VAEFlowLossL1, self).__init__(config)
-        self.l1_weight = self.config.reg_param
+        self.l1_weight = get_loss_weights(config).get("reg_param")
         self.l1_reg_fn = L1Regularization(config)
         self.component_names = ["loss", "vae_flow_loss", "reco", "kl", "l1"]
 
@@ -745,7 +912,7 @@ class VAEFlowLossL2(VAEFlowLoss):
 
     def __init__(self, config):
         super(VAEFlowLossL2, self).__init__(config)
-        self.l2_weight = self.config.reg_param
+        self.l2_weight = get_loss_weights(config).get("reg_param")
         self.l2_reg_fn = L2Regularization(config)
         self.component_names = ["loss", "vae_flow_loss", "reco", "kl", "l2"]
 
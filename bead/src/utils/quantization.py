@@ -0,0 +1,118 @@
+"""
+Dynamic int8 quantization of models for CPU inference, with accuracy guardrails.
+
+The Linear layers (encoder and decoder MLPs, amortised flow heads) are quantized dynamically:
+their weights are stored as int8 and the activations are quantized on the fly, so no calibration
+is needed. BatchNorm layers are folded into the preceding layers first. Before the quantized model
+is used, it is compared with the fp32 model on a labelled background/signal subset, and it is
+rejected when the AUC drops or the anomaly scores shift by more than the configured tolerances.
+
+Functions:
+    quantize_model: Returns a dynamically quantized int8 copy of a model.
+    check_quantization: Compares the quantized and fp32 models and decides whether to use it.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+import torch.nn as nn
+from scipy.stats import ks_2samp
+
+from . import evaluation, export
+
+
+def quantize_model(model):
+    """
+    Returns a copy of a model with BatchNorm folded and its Linear layers dynamically quantized
+    to int8. Quantized models run on CPU only.
+
+    Args:
+        model (nn.Module): The fp32 model.
+
+    Returns:
+        nn.Module: The quantized model in eval mode.
+    """
+    prepared, _ = export.prepare_for_inference(model.cpu())
+    return torch.ao.quantization.quantize_dynamic(
+        prepared, {nn.Linear}, dtype=torch.qint8
+    ).eval()
+
+
+def check_quantization(
+    model,
+    quantized,
+    loss_fn,
+    inputs,
+    labels,
+    max_auc_drop=0.005,
+    max_score_shift=0.05,
+    batch_size=1024,
+    config=None,
+    verbose=False,
+):
+    """
+    Scores the same events with the fp32 and the quantized model and decides whether the
+    quantized model may be used.
+
+    The score shift is the Kolmogorov-Smirnov statistic between the two distributions of the
+    total loss. Both models see the same latent samples.
+
+    Args:
+        model (nn.Module): The fp32 model, on CPU.
+        quantized (nn.Module): The quantized model.
+        loss_fn (loss.BaseLoss): The loss defining the anomaly scores.
+        inputs (torch.Tensor): Background and signal events.
+        labels (torch.Tensor): 0 for background, 1 for signal.
+        max_auc_drop (float): Largest allowed AUC drop of the total loss.
+        max_score_shift (float): Largest allowed KS statistic of the total loss.
+        batch_size (int): Number of events per forward pass.
+        config (dataClass): Base class selecting user inputs, used for the scoring mode.
+        verbose (bool): If True, prints the comparison.
+
+    Returns:
+        dict: AUCs of both models, the AUC drop, the score shift and `accepted`.
+    """
+    device = torch.device("cpu")
+    # The regularization terms of the loss read the fp32 parameters for both models
+    parameters = list(model.parameters())
+    # Both models are scored with the scoring mode of the config, but without autocast
+    scoring_config = SimpleNamespace(
+        scoring_mode=getattr(config, "scoring_mode", "sample"),
+        scoring_samples=getattr(config, "scoring_samples", 1),
+    )
+    results = {}
+    for name, candidate in (("fp32", model), ("int8", quantized)):
+        torch.manual_seed(0)
+        results[name] = evaluation.score_events(
+            candidate,
+            loss_fn,
+            inputs,
+            batch_size,
+            device,
+            config=scoring_config,
+            parameters=parameters,
+        )
+
+    total_name = loss_fn.component_names[0]
+    fp32_scores = results["fp32"][total_name]
+    int8_scores = results["int8"][total_name]
+    fp32_auc = evaluation.score_auc(fp32_scores, labels)
+    int8_auc = evaluation.score_auc(int8_scores, labels)
+    report = {
+        "auc_fp32": fp32_auc,
+        "auc_int8": int8_auc,
+        "auc_drop": fp32_auc - int8_auc,
+        "score_shift": float(ks_2samp(fp32_scores, int8_scores).statistic),
+    }
+    report["accepted"] = bool(
+        np.isfinite(int8_scores).all()
+        and report["auc_drop"] <= max_auc_drop
+        and report["score_shift"] <= max_score_shift
+    )
+    if verbose:
+        print(
+            f"Quantization check: AUC {fp32_auc:.4f} (fp32) -> {int8_auc:.4f} (int8), "
+            f"score shift (KS) {report['score_shift']:.4f}"
+        )
+    return report
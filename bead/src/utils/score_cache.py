@@ -0,0 +1,173 @@
+"""
+Cache of per-event background scores for incremental re-scoring.
+
+When only the signal hypothesis changes between `detect` runs, the background test set is
+scored again with the same model. The cache stores the background rows of the inference outputs
+under a key derived from the model weights, the preprocessing and scoring options, and the
+background inputs themselves, so any change to one of them is a cache miss. Entries are written
+atomically (temporary directory + rename) and the least recently used entries are evicted.
+
+Functions:
+    hash_file: Computes the SHA-256 digest of a file.
+    hash_tensor: Computes the SHA-256 digest of a tensor's shape, dtype and values.
+    cache_key: Builds the cache key of a background input shard.
+
+Classes:
+    ScoreCache: Stores and retrieves per-event background outputs by key.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+# Config options that change the preprocessed inputs or the scores computed from them
+CACHE_KEY_OPTIONS = (
+    "file_type",
+    "input_level",
+    "input_features",
+    "num_jets",
+    "num_constits",
+    "normalizations",
+    "model_name",
+    "latent_space_size",
+    "loss_function",
+    "reg_param",
+    "scoring_mode",
+    "scoring_samples",
+    "use_amp",
+    "amp_dtype",
+    "ensemble_aggregation",
+)
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """
+    Computes the SHA-256 digest of a file.
+
+    Args:
+        path (str): Path of the file.
+        chunk_size (int): Bytes read at a time.
+
+    Returns:
+        str: The hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_tensor(tensor):
+    """
+    Computes the SHA-256 digest of a tensor's shape, dtype and values.
+
+    Args:
+        tensor (torch.Tensor): The tensor.
+
+    Returns:
+        str: The hex digest.
+    """
+    array = np.ascontiguousarray(tensor.detach().cpu().numpy())
+    digest = hashlib.sha256(f"{array.shape}{array.dtype}".encode())
+    digest.update(memoryview(array).cast("B"))
+    return digest.hexdigest()
+
+
+def cache_key(model_paths, config, inputs, extra=None):
+    """
+    Builds the cache key of a background input shard.
+
+    Args:
+        model_paths (list): Files holding the model weights used for scoring.
+        config (dataClass): Base class selecting user inputs, see `CACHE_KEY_OPTIONS`.
+        inputs (torch.Tensor): The background events as passed to the model.
+        extra (dict): Further values that change the scores (e.g. quantization).
+
+    Returns:
+        str: The hex digest identifying the cached scores.
+    """
+    description = {
+        "models": [hash_file(path) for path in model_paths],
+        "options": {name: getattr(config, name, None) for name in CACHE_KEY_OPTIONS},
+        "inputs": hash_tensor(inputs),
+        "extra": extra or {},
+    }
+    return hashlib.sha256(
+        json.dumps(description, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+class ScoreCache:
+    """
+    Stores and retrieves per-event background outputs by key, one directory per entry.
+
+    Args:
+        cache_dir (str): Directory of the cache entries.
+        max_entries (int): Most recently used entries kept (0 keeps all).
+    """
+
+    def __init__(self, cache_dir, max_entries=4):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key, names):
+        """
+        Returns the cached outputs of a key, if every requested output is cached.
+
+        Args:
+            key (str): The cache key.
+            names (iterable): Output names needed.
+
+        Returns:
+            dict: Output name -> memory-mapped array, or None on a cache miss.
+        """
+        entry_dir = self._entry_dir(key)
+        paths = {name: os.path.join(entry_dir, f"{name}.npy") for name in names}
+        if not all(os.path.exists(path) for path in paths.values()):
+            return None
+        # Marks the entry as recently used
+        os.utime(entry_dir)
+        return {name: np.load(path, mmap_mode="r") for name, path in paths.items()}
+
+    def save(self, key, arrays):
+        """
+        Stores the outputs of a key, replacing an older entry, and evicts the least recently
+        used entries.
+
+        Args:
+            key (str): The cache key.
+            arrays (dict): Output name -> array with one row per event.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, prefix=".tmp_")
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+        entry_dir = self._entry_dir(key)
+        if os.path.exists(entry_dir):
+            shutil.rmtree(entry_dir)
+        os.rename(tmp_dir, entry_dir)
+        self.evict()
+
+    def evict(self):
+        """Removes all but the `max_entries` most recently used entries."""
+        if self.max_entries <= 0:
+            return
+        entries = sorted(
+            (
+                os.path.join(self.cache_dir, name)
+                for name in os.listdir(self.cache_dir)
+                if not name.startswith(".")
+            ),
+            key=os.path.getmtime,
+            reverse=True,
+        )
+        for entry_dir in entries[self.max_entries :]:
+            shutil.rmtree(entry_dir, ignore_errors=True)
@@ -0,0 +1,430 @@
+"""
+Long-lived scoring server for trained models.
+
+The serve mode loads the model once and listens on a local Unix socket or TCP port. Clients send
+preprocessed events in a compact binary framing and receive the per-event loss components (the
+anomaly scores). Requests arriving concurrently are coalesced into micro-batches: a batch is
+scored as soon as it holds `max_batch_size` events or `max_delay_ms` after its first request
+arrived, whichever comes first.
+
+Framing (little endian):
+    Request: uint32 number of events, uint32 values per event, then the events as float32.
+    Response: int32 number of events, uint32 number of loss components, then the scores as
+        float32 with shape (events, components). On errors the number of events is -1, and the
+        second field is the length of a UTF-8 error message that follows.
+
+Functions:
+    parse_address: Parses a server address into a socket family and address.
+    recv_exact: Reads an exact number of bytes from a socket.
+    send_events: Sends a request with a batch of events.
+    recv_events: Reads a request.
+    send_scores: Sends the scores of a request.
+    send_error: Sends an error response.
+    recv_scores: Reads a response.
+    make_server: Creates a threaded scoring server bound to an address.
+    serve: Runs the scoring server until it is interrupted.
+
+Classes:
+    MicroBatcher: Coalesces concurrent scoring requests into micro-batches.
+    ScoringClient: Client connection to a scoring server.
+"""
+
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import torch
+
+from . import evaluation
+
+REQUEST_HEADER = struct.Struct("<II")
+RESPONSE_HEADER = struct.Struct("<iI")
+
+
+def parse_address(address):
+    """
+    Parses a server address. "unix:<path>" or a path containing "/" selects a Unix socket,
+    "<host>:<port>" a TCP socket.
+
+    Args:
+        address (str): The server address.
+
+    Returns:
+        tuple: (socket family, address as expected by `socket.bind`/`socket.connect`)
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:") :]
+    if "/" in address:
+        return socket.AF_UNIX, address
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def recv_exact(sock, num_bytes):
+    """
+    Reads exactly `num_bytes` bytes from a socket.
+
+    Args:
+        sock (socket.socket): The connected socket.
+        num_bytes (int): Number of bytes to read.
+
+    Returns:
+        bytes: The data, or None if the connection was closed before the first byte.
+
+    Raises:
+        ConnectionError: If the connection was closed in the middle of the data.
+    """
+    buffer = bytearray(num_bytes)
+    view = memoryview(buffer)
+    received = 0
+    while received < num_bytes:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            if received == 0:
+                return None
+            raise ConnectionError("Connection closed in the middle of a message")
+        received += n
+    return bytes(buffer)
+
+
+def send_events(sock, events):
+    """
+    Sends a request with a batch of events.
+
+    Args:
+        sock (socket.socket): The connected socket.
+        events (np.ndarray or torch.Tensor): Events with the batch as first dimension.
+    """
+    if isinstance(events, torch.Tensor):
+        events = events.detach().cpu().numpy()
+    events = np.ascontiguousarray(events, dtype=np.float32)
+    num_events = events.shape[0]
+    values_per_event = events.size // num_events if num_events else 0
+    sock.sendall(REQUEST_HEADER.pack(num_events, values_per_event) + events.tobytes())
+
+
+def recv_events(sock):
+    """
+    Reads a request.
+
+    Args:
+        sock (socket.socket): The connected socket.
+
+    Returns:
+        tuple: (number of events, values per event, float32 array of all values), or None if the
+            client closed the connection.
+    """
+    header = recv_exact(sock, REQUEST_HEADER.size)
+    if header is None:
+        return None
+    num_events, values_per_event = REQUEST_HEADER.unpack(header)
+    payload = recv_exact(sock, 4 * num_events * values_per_event) or b""
+    return num_events, values_per_event, np.frombuffer(payload, dtype=np.float32)
+
+
+def send_scores(sock, scores):
+    """
+    Sends the scores of a request.
+
+    Args:
+        sock (socket.socket): The connected socket.
+        scores (np.ndarray): Scores with shape (events, components).
+    """
+    scores = np.ascontiguousarray(scores, dtype=np.float32)
+    sock.sendall(RESPONSE_HEADER.pack(*scores.shape) + scores.tobytes())
+
+
+def send_error(sock, message):
+    """
+    Sends an error response.
+
+    Args:
+        sock (socket.socket): The connected socket.
+        message (str): The error message.
+    """
+    data = message.encode()
+    sock.sendall(RESPONSE_HEADER.pack(-1, len(data)) + data)
+
+
+def recv_scores(sock):
+    """
+    Reads a response.
+
+    Args:
+        sock (socket.socket): The connected socket.
+
+    Returns:
+        np.ndarray: Scores with shape (events, components).
+
+    Raises:
+        RuntimeError: If the server answered with an error.
+        ConnectionError: If the server closed the connection.
+    """
+    header = recv_exact(sock, RESPONSE_HEADER.size)
+    if header is None:
+        raise ConnectionError("Server closed the connection")
+    num_events, size = RESPONSE_HEADER.unpack(header)
+    if num_events < 0:
+        raise RuntimeError(recv_exact(sock, size).decode())
+    payload = recv_exact(sock, 4 * num_events * size) or b""
+    return np.frombuffer(payload, dtype=np.float32).reshape(num_events, size)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent scoring requests into micro-batches scored by one background thread.
+
+    Args:
+        model (nn.Module): The model, in eval mode.
+        loss_fn (loss.BaseLoss): The loss defining the anomaly scores.
+        device (torch.device): Device to run on.
+        config (dataClass): Base class selecting user inputs, used for the autocast settings.
+        max_batch_size (int): Events after which a micro-batch is scored without waiting.
+        max_delay_ms (float): Longest wait for more requests after the first one of a batch.
+        parameters (list): Parameters for the regularization terms of the loss, default is the
+            parameters of `model`.
+    """
+
+    def __init__(
+        self,
+        model,
+        loss_fn,
+        device,
+        config=None,
+        max_batch_size=4096,
+        max_delay_ms=2.0,
+        parameters=None,
+    ):
+        self.model = model
+        self.loss_fn = loss_fn
+        self.device = device
+        self.config = config
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000
+        self.parameters = (
+            list(model.parameters()) if parameters is None else parameters
+        )
+        self.requests = queue.Queue()
+        self.batch_sizes = []
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, events):
+        """
+        Queues events for scoring.
+
+        Args:
+            events (torch.Tensor): Events with the batch as first dimension.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the scores with shape (events, components).
+        """
+        future = Future()
+        self.requests.put((events, future))
+        return future
+
+    def close(self):
+        """Stops the scoring thread after the queued requests."""
+        self.requests.put(None)
+        self._thread.join()
+
+    def _collect(self, first):
+        """Collects requests until the batch is full or the deadline of the first has passed."""
+        batch, num_events = [first], len(first[0])
+        deadline = time.perf_counter() + self.max_delay
+        stop = False
+        while num_events < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self.requests.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+            num_events += len(item[0])
+        return batch, stop
+
+    def _run(self):
+        stop = False
+        while not stop:
+            first = self.requests.get()
+            if first is None:
+                break
+            batch, stop = self._collect(first)
+            events = torch.cat([events for events, _ in batch])
+            self.batch_sizes.append(len(events))
+            try:
+                scores = evaluation.score_events(
+                    self.model,
+                    self.loss_fn,
+                    events,
+                    batch_size=max(len(events), 1),
+                    device=self.device,
+                    config=self.config,
+                    parameters=self.parameters,
+                )
+                scores = np.stack(
+                    [scores[name] for name in self.loss_fn.component_names], axis=1
+                )
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            row = 0
+            for request_events, future in batch:
+                future.set_result(scores[row : row + len(request_events)])
+                row += len(request_events)
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """Serves the requests of one client connection until it is closed."""
+
+    def handle(self):
+        server = self.server
+        while True:
+            request = recv_events(self.request)
+            if request is None:
+                return
+            num_events, values_per_event, values = request
+            if values_per_event != server.values_per_event or num_events == 0:
+                send_error(
+                    self.request,
+                    f"Expected events of {server.values_per_event} values, "
+                    f"got {num_events} events of {values_per_event}",
+                )
+                continue
+            events = torch.from_numpy(values.copy()).view(
+                num_events, *server.event_shape
+            )
+            try:
+                send_scores(self.request, server.batcher.submit(events).result())
+            except Exception as e:
+                send_error(self.request, f"{type(e).__name__}: {e}")
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def make_server(address, batcher, event_shape):
+    """
+    Creates a threaded scoring server bound to an address. Every client connection is handled
+    by its own thread, and all connections share one micro-batcher.
+
+    Args:
+        address (str): Server address, see `parse_address`.
+        batcher (MicroBatcher): The micro-batcher scoring the events.
+        event_shape (tuple): Shape of one event as passed to the model.
+
+    Returns:
+        socketserver.BaseServer: The bound server, not yet serving.
+    """
+    family, bind_address = parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(bind_address):
+            os.remove(bind_address)
+        server = _UnixServer(bind_address, _RequestHandler)
+    else:
+        server = _TCPServer(bind_address, _RequestHandler)
+    server.batcher = batcher
+    server.event_shape = tuple(event_shape)
+    server.values_per_event = int(np.prod(event_shape))
+    return server
+
+
+def serve(model, loss_fn, event_shape, address, config=None, device=None, verbose=False):
+    """
+    Runs the scoring server until it is interrupted.
+
+    Args:
+        model (nn.Module): The model, in eval mode.
+        loss_fn (loss.BaseLoss): The loss defining the anomaly scores.
+        event_shape (tuple): Shape of one event as passed to the model.
+        address (str): Server address, see `parse_address`.
+        config (dataClass): Base class selecting user inputs. Uses `serve_max_batch_size`,
+            `serve_max_delay_ms` and the autocast settings.
+        device (torch.device): Device to run on, default is CPU.
+        verbose (bool): If True, prints the micro-batch sizes on shutdown.
+    """
+    batcher = MicroBatcher(
+        model,
+        loss_fn,
+        device or torch.device("cpu"),
+        config,
+        max_batch_size=getattr(config, "serve_max_batch_size", 4096),
+        max_delay_ms=getattr(config, "serve_max_delay_ms", 2.0),
+    )
+    server = make_server(address, batcher, event_shape)
+    print(
+        f"Serving {', '.join(loss_fn.component_names)} for events of shape "
+        f"{tuple(event_shape)} on {address} (Ctrl+C to stop)"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+        if isinstance(server, _UnixServer):
+            os.remove(server.server_address)
+    if verbose and batcher.batch_sizes:
+        print(
+            f"Scored {sum(batcher.batch_sizes)} events in {len(batcher.batch_sizes)} "
+            f"micro-batches (mean {np.mean(batcher.batch_sizes):.1f} events)"
+        )
+
+
+class ScoringClient:
+    """
+    Client connection to a scoring server. Can be used as a context manager.
+
+    Args:
+        address (str): Server address, see `parse_address`.
+    """
+
+    def __init__(self, address):
+        family, connect_address = parse_address(address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.connect(connect_address)
+        if family == socket.AF_INET:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def score(self, events):
+        """
+        Scores a batch of events.
+
+        Args:
+            events (np.ndarray or torch.Tensor): Preprocessed events with the batch as first
+                dimension.
+
+        Returns:
+            np.ndarray: Scores with shape (events, loss components), total loss first.
+        """
+        send_events(self.sock, events)
+        return recv_scores(self.sock)
+
+    def close(self):
+        """Closes the connection."""
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,191 @@
+"""
+Streaming output sinks for per-event model outputs.
+
+Instead of collecting batches in python lists and concatenating them at the end (which holds
+every output twice in memory), the sinks preallocate memory-mapped `.npy` files and write each
+batch into its rows. Under DDP every rank writes its own rows of the same files.
+
+Functions:
+    latents_to_numpy: Moves the latent outputs of one batch to host memory as numpy arrays.
+
+Classes:
+    MemmapSink: Writes per-event arrays into preallocated memory-mapped `.npy` files.
+    RecordingSampler: Sampler wrapper that records the indices it yields.
+    EpochLatentRecorder: Writes latents from the training forward passes into a MemmapSink.
+"""
+
+import numpy as np
+import torch
+import torch.distributed as dist
+from torch.utils.data import Sampler
+
+LATENT_NAMES = ("mu", "logvar", "z0", "zk", "log_det_jacobian")
+
+# Per-event outputs written by inference for every `inference_outputs` setting, on top of the
+# per-event loss components (the anomaly scores)
+INFERENCE_OUTPUTS = {
+    "scores": (),
+    "latents": LATENT_NAMES,
+    "all": ("reconstructed",) + LATENT_NAMES,
+}
+
+
+def latents_to_numpy(mu, logvar, ldj, z0, zk):
+    """
+    Moves the latent outputs of one batch to host memory as float32 numpy arrays.
+
+    Models without flows return a python scalar as log-det-jacobian, and some flows return one
+    value per batch. These are broadcast to one value per event so that every output is
+    row-aligned with the dataset.
+
+    Args:
+        mu (torch.Tensor): Posterior means.
+        logvar (torch.Tensor): Posterior log-variances.
+        ldj: Log-det-jacobian of the flow, a tensor or a python scalar.
+        z0 (torch.Tensor): Latent samples before the flow.
+        zk (torch.Tensor): Latent samples after the flow.
+
+    Returns:
+        dict: Output name -> numpy array with the batch as first dimension.
+    """
+    batch_size = mu.shape[0]
+    if isinstance(ldj, torch.Tensor) and ldj.dim() > 0 and ldj.shape[0] == batch_size:
+        ldj_np = ldj.detach().float().cpu().numpy()
+    else:
+        ldj_value = ldj.item() if isinstance(ldj, torch.Tensor) else float(ldj)
+        ldj_np = np.full(batch_size, ldj_value, dtype=np.float32)
+    return {
+        "mu": mu.detach().float().cpu().numpy(),
+        "logvar": logvar.detach().float().cpu().numpy(),
+        "z0": z0.detach().float().cpu().numpy(),
+        "zk": zk.detach().float().cpu().numpy(),
+        "log_det_jacobian": ldj_np,
+    }
+
+
+class MemmapSink:
+    """
+    Writes per-event arrays into preallocated memory-mapped `.npy` files.
+
+    The files are allocated lazily on the first write, when the per-event shapes and dtypes are
+    known. Under DDP rank 0 allocates the files and the other ranks open them after a barrier, so
+    every rank has to write at least once or call `close`, in the same order. Worker processes
+    writing into files allocated by their parent use `create=False`.
+
+    Args:
+        paths (dict): Output name -> path of the `.npy` file.
+        num_rows (int): Total number of events (rows) in every output.
+        rank (int): Global rank of this process.
+        is_ddp_active (bool): Whether DDP is active.
+        create (bool): If False, the files already exist and are only opened for writing.
+    """
+
+    def __init__(self, paths, num_rows, rank=0, is_ddp_active=False, create=True):
+        self.paths = paths
+        self.num_rows = num_rows
+        self.rank = rank
+        self.is_ddp_active = is_ddp_active
+        self.create = create
+        self._maps = None
+
+    def _open(self, arrays):
+        """Allocates (rank 0) or opens (other ranks) the memory-mapped outputs."""
+        if self.create and self.rank == 0 and arrays is not None:
+            for name, path in self.paths.items():
+                np.lib.format.open_memmap(
+                    path,
+                    mode="w+",
+                    dtype=arrays[name].dtype,
+                    shape=(self.num_rows,) + arrays[name].shape[1:],
+                ).flush()
+        if self.is_ddp_active:
+            dist.barrier()
+        self._maps = {
+            name: np.lib.format.open_memmap(path, mode="r+")
+            for name, path in self.paths.items()
+        }
+
+    def write(self, rows, arrays):
+        """
+        Writes one batch into the given rows of every output.
+
+        Args:
+            rows (slice or np.ndarray): Rows (event indices) the batch belongs to.
+            arrays (dict): Output name -> numpy array with the batch as first dimension.
+        """
+        if self._maps is None:
+            self._open(arrays)
+        for name, array in arrays.items():
+            self._maps[name][rows] = array
+
+    @property
+    def is_open(self):
+        """Whether the outputs have been allocated."""
+        return self._maps is not None
+
+    def close(self):
+        """
+        Flushes the outputs to disk. Under DDP this waits until every rank has written its rows.
+        """
+        if self._maps is None and self.is_ddp_active:
+            # Ranks without any rows still take part in the allocation barrier
+            self._open(None)
+        if self._maps is not None:
+            for array in self._maps.values():
+                array.flush()
+        if self.is_ddp_active:
+            dist.barrier()
+        self._maps = None
+
+
+class RecordingSampler(Sampler):
+    """
+    Wraps a sampler and records the indices it yields in the current epoch, so that outputs of
+    shuffled batches can be mapped back to dataset rows.
+
+    Args:
+        sampler (torch.utils.data.Sampler): The sampler to wrap.
+    """
+
+    def __init__(self, sampler):
+        self.sampler = sampler
+        self.indices = []
+
+    def __iter__(self):
+        self.indices = []
+        for idx in self.sampler:
+            self.indices.append(idx)
+            yield idx
+
+    def __len__(self):
+        return len(self.sampler)
+
+
+class EpochLatentRecorder:
+    """
+    Writes the latents produced by the training forward passes of an epoch into a MemmapSink.
+
+    Batches are mapped back to dataset rows through the RecordingSampler of the training
+    DataLoader. Rows that were not seen (e.g. dropped by `drop_last`) are tracked in `consumed`.
+
+    Args:
+        sink (MemmapSink): The sink to write into.
+        sampler (RecordingSampler): The sampler of the training DataLoader.
+        batch_size (int): Batch size of the training DataLoader.
+        num_rows (int): Number of events in the training dataset.
+    """
+
+    def __init__(self, sink, sampler, batch_size, num_rows):
+        self.sink = sink
+        self.sampler = sampler
+        self.batch_size = batch_size
+        self.consumed = np.zeros(num_rows, dtype=bool)
+
+    def __call__(self, batch_idx, mu, logvar, ldj, z0, zk):
+        rows = np.asarray(
+            self.sampler.indices[
+                batch_idx * self.batch_size : (batch_idx + 1) * self.batch_size
+            ]
+        )
+        self.sink.write(rows, latents_to_numpy(mu, logvar, ldj, z0, zk))
+        self.consumed[rows] = True
@@ -0,0 +1,441 @@
+"""
+Parallel hyperparameter sweeps over one shared, preprocessed dataset.
+
+The training and evaluation tensors are loaded once and moved to shared memory. Trials run
+concurrently in a pool of worker processes, each pinned to its own block of cores, and train with
+`training.train` on a copy of the project config with the trial's overrides applied. The final
+losses and the AUC on a held-out background/signal sample are collected into one summary table.
+
+With the asynchronous successive-halving scheduler, trials report their validation loss at fixed
+epoch rungs and the worst fraction is stopped early. The cores of finished trials are handed on to
+the surviving ones.
+
+Classes:
+    SuccessiveHalving: Asynchronous successive-halving (ASHA) scheduler shared by all trials.
+
+Functions:
+    grid_search: Expands a parameter space into all combinations.
+    random_search: Draws random configurations from a parameter space.
+    share_tensors: Moves tensors into shared memory.
+    run_trial: Trains and evaluates one configuration (runs in a worker process).
+    run_sweep: Runs all trials of a sweep in a process pool.
+    write_summary: Writes the sweep results as CSV and prints a summary table.
+"""
+
+import csv
+import itertools
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+
+from ..trainers import training
+from . import evaluation, helper
+
+
+def grid_search(space):
+    """
+    Expands a parameter space into all combinations of its values.
+
+    Args:
+        space (dict): Config field -> list of values.
+
+    Returns:
+        list: One dict of overrides per trial.
+
+    Raises:
+        ValueError: If a field is given as a range instead of a list of values.
+    """
+    for name, values in space.items():
+        if not isinstance(values, (list, tuple)):
+            raise ValueError(
+                f"Grid search needs a list of values for '{name}', got {values}."
+            )
+    names = list(space)
+    return [
+        dict(zip(names, combination, strict=True))
+        for combination in itertools.product(*space.values())
+    ]
+
+
+def random_search(space, n_trials, seed=0):
+    """
+    Draws random configurations from a parameter space.
+
+    Args:
+        space (dict): Config field -> list of values (drawn uniformly) or a range
+            `{"low": ..., "high": ..., "log": bool}`. Integer bounds draw integers.
+        n_trials (int): Number of configurations to draw.
+        seed (int): Seed of the draws.
+
+    Returns:
+        list: One dict of overrides per trial.
+    """
+    rng = random.Random(seed)
+    trials = []
+    for _ in range(n_trials):
+        params = {}
+        for name, values in space.items():
+            if isinstance(values, (list, tuple)):
+                params[name] = rng.choice(values)
+            elif isinstance(values["low"], int) and isinstance(values["high"], int):
+                params[name] = rng.randint(values["low"], values["high"])
+            elif values.get("log", False):
+                params[name] = math.exp(
+                    rng.uniform(math.log(values["low"]), math.log(values["high"]))
+                )
+            else:
+                params[name] = rng.uniform(values["low"], values["high"])
+        trials.append(params)
+    return trials
+
+
+def share_tensors(tensors):
+    """
+    Moves the storage of tensors into shared memory, so worker processes can read them without
+    copies. Entries that are not tensors (e.g. None) are kept as they are.
+
+    Args:
+        tensors (list): Tensors to share.
+
+    Returns:
+        list: The same tensors, now backed by shared memory.
+    """
+    return [t.share_memory_() if isinstance(t, torch.Tensor) else t for t in tensors]
+
+
+class SuccessiveHalving:
+    """
+    Asynchronous successive-halving (ASHA) scheduler, used as the `epoch_callback` of the trials.
+
+    Rungs are placed at `min_epochs * reduction_factor**k` epochs. A trial reaching a rung records
+    its validation loss there and continues only if the loss is within the best
+    `1 / reduction_factor` of all losses recorded at that rung so far. Decisions never wait for
+    other trials, so no worker idles at a rung.
+
+    The rung losses and the pool of released cores live in a `multiprocessing.Manager`, so the
+    scheduler can be pickled into every worker. After every epoch a trial takes released cores
+    (at most doubling its own) and raises its intra-op threads accordingly.
+
+    Args:
+        manager (multiprocessing.managers.SyncManager): Manager holding the shared state.
+        max_epochs (int): Epochs of a full trial; no rung is placed at or after it.
+        min_epochs (int): Epochs before the first rung.
+        reduction_factor (int): Only the best 1/reduction_factor of the trials pass a rung.
+    """
+
+    def __init__(self, manager, max_epochs, min_epochs=1, reduction_factor=3):
+        if reduction_factor < 2:
+            raise ValueError(
+                f"reduction_factor must be at least 2, got {reduction_factor}."
+            )
+        self.rungs = []
+        rung = max(1, min_epochs)
+        while rung < max_epochs:
+            self.rungs.append(rung)
+            rung *= reduction_factor
+        self.reduction_factor = reduction_factor
+        self.rung_losses = manager.dict({rung: [] for rung in self.rungs})
+        self.free_cores = manager.list()
+        self.lock = manager.Lock()
+        self.stopped_at = None
+
+    def __call__(self, epoch, validation_loss):
+        """
+        Reports the validation loss of a trial after an epoch.
+
+        Args:
+            epoch (int): The 1-based epoch that just finished.
+            validation_loss (float): Validation loss of the epoch.
+
+        Returns:
+            bool: False if the trial should stop.
+        """
+        self.acquire_cores()
+        if epoch not in self.rungs:
+            return True
+        with self.lock:
+            losses = self.rung_losses[epoch] + [validation_loss]
+            self.rung_losses[epoch] = losses
+        keep = math.isfinite(validation_loss) and validation_loss <= np.nanpercentile(
+            losses, 100 / self.reduction_factor
+        )
+        if not keep:
+            self.stopped_at = epoch
+        return keep
+
+    def release_cores(self, cores):
+        """
+        Hands the cores of a finished worker on to the running trials.
+
+        Args:
+            cores (list): Core ids that are no longer used.
+        """
+        with self.lock:
+            self.free_cores.extend(cores)
+
+    def acquire_cores(self):
+        """Extends the affinity and the intra-op threads of the calling trial by released cores."""
+        if not hasattr(os, "sched_setaffinity") or len(self.free_cores) == 0:
+            return
+        cores = sorted(os.sched_getaffinity(0))
+        with self.lock:
+            extra = [
+                self.free_cores.pop()
+                for _ in range(min(len(self.free_cores), len(cores)))
+            ]
+        if extra:
+            os.sched_setaffinity(0, cores + extra)
+            torch.set_num_threads(len(cores) + len(extra))
+
+
+def run_trial(
+    trial_id,
+    params,
+    base_values,
+    data,
+    labels,
+    eval_inputs,
+    eval_labels,
+    output_path,
+    scheduler=None,
+):
+    """
+    Trains and evaluates one configuration. Runs in a worker process of `run_sweep`.
+
+    Args:
+        trial_id (int): Index of the trial, used for its output directory.
+        params (dict): Config overrides of the trial.
+        base_values (dict): Option values of the project config.
+        data (list): Shared training and validation tensors.
+        labels (list): Shared generator labels of the training and validation tensors.
+        eval_inputs (torch.Tensor): Shared held-out background and signal events, or None.
+        eval_labels (torch.Tensor): 0 for background, 1 for signal, or None.
+        output_path (str): Output directory of the sweep.
+        scheduler (SuccessiveHalving): Scheduler that may stop the trial early, or None.
+
+    Returns:
+        dict: The trial's overrides, status, final losses, AUC, runtime and the cores it ended on.
+    """
+    config = SimpleNamespace(**base_values)
+    for name, value in params.items():
+        setattr(config, name, value)
+    config.is_ddp_active, config.rank, config.local_rank, config.world_size = (
+        False,
+        0,
+        0,
+        1,
+    )
+
+    trial_path = os.path.join(output_path, f"trial_{trial_id:03d}")
+    for directory in ("models", "results"):
+        os.makedirs(os.path.join(trial_path, directory), exist_ok=True)
+
+    result = {"trial": trial_id, **params}
+    start = time.time()
+    try:
+        model = training.train(
+            list(data), list(labels), trial_path, config, epoch_callback=scheduler
+        )
+
+        results_dir = os.path.join(trial_path, "results")
+        train_losses = np.load(os.path.join(results_dir, "train_epoch_loss_data.npy"))
+        result.update(
+            status="pruned" if scheduler and scheduler.stopped_at else "completed",
+            epochs=len(train_losses),
+            train_loss=float(train_losses[-1]),
+        )
+        val_path = os.path.join(results_dir, "val_epoch_loss_data.npy")
+        if os.path.exists(val_path):
+            result["val_loss"] = float(np.load(val_path)[-1])
+
+        if eval_inputs is not None:
+            model = helper.unwrap_model(model).eval()
+            loss_fn = helper.get_loss(config.loss_function)(config=config)
+            result.update(
+                evaluation.evaluate_model(
+                    model, loss_fn, eval_inputs, eval_labels, config=config
+                )
+            )
+    except Exception as e:
+        result.update(status="failed", error=f"{type(e).__name__}: {e}")
+    result["seconds"] = time.time() - start
+    if hasattr(os, "sched_getaffinity"):
+        result["cores"] = sorted(os.sched_getaffinity(0))
+    return result
+
+
+def run_sweep(
+    config,
+    trials,
+    data,
+    labels,
+    eval_inputs,
+    eval_labels,
+    output_path,
+    n_workers=0,
+    cores_per_trial=0,
+    scheduler=None,
+    verbose=False,
+):
+    """
+    Runs all trials of a sweep concurrently in a pool of worker processes.
+
+    Every worker gets its own block of `cores_per_trial` cores. With both `n_workers` and
+    `cores_per_trial` at 0, the cores are split evenly between as many workers as there are
+    trials (at most one worker per core). With `scheduler="successive_halving"`, poor trials are
+    stopped at the epoch rungs, and once no queued trials are left, the cores of idle workers are
+    handed on to the running trials.
+
+    Args:
+        config (dataClass): Base class selecting user inputs.
+        trials (list): One dict of config overrides per trial.
+        data (list): Training and validation tensors.
+        labels (list): Generator labels of the training and validation tensors.
+        eval_inputs (torch.Tensor): Held-out background and signal events, or None.
+        eval_labels (torch.Tensor): 0 for background, 1 for signal, or None.
+        output_path (str): Output directory of the sweep; every trial writes into a subdirectory.
+        n_workers (int): Number of concurrent trials (0 derives it from the cores).
+        cores_per_trial (int): Cores (intra-op threads) per trial (0 splits the cores evenly).
+        scheduler (str): "successive_halving" to stop poor trials early, or None to train all
+            trials for `config.epochs`. The rungs are set by `config.sweep_min_epochs` and
+            `config.sweep_reduction_factor`.
+        verbose (bool): If True, prints every finished trial.
+
+    Returns:
+        list: The results of all trials, in trial order.
+    """
+    n_cores = helper.get_available_cores()
+    if not n_workers:
+        n_workers = (
+            n_cores // cores_per_trial if cores_per_trial else min(len(trials), n_cores)
+        )
+    n_workers = max(1, min(n_workers, len(trials)))
+
+    # Pin the workers to disjoint core blocks, unless that would oversubscribe the cores
+    blocks, cores_per_trial = helper.get_core_blocks(n_workers, cores_per_trial)
+    pin = blocks[0] is not None
+    ctx = mp.get_context("spawn")
+    core_blocks = ctx.Queue()
+    for block in blocks:
+        core_blocks.put((block, cores_per_trial))
+
+    data, labels = share_tensors(data), share_tensors(labels)
+    if eval_inputs is not None:
+        eval_inputs, eval_labels = share_tensors([eval_inputs, eval_labels])
+    base_values = helper.config_to_dict(config)
+    os.makedirs(output_path, exist_ok=True)
+
+    manager = None
+    if scheduler == "successive_halving":
+        manager = ctx.Manager()
+        scheduler = SuccessiveHalving(
+            manager,
+            config.epochs,
+            min_epochs=getattr(config, "sweep_min_epochs", 1),
+            reduction_factor=getattr(config, "sweep_reduction_factor", 3),
+        )
+        if verbose:
+            print(f"Successive halving with rungs at epochs {scheduler.rungs}")
+    elif scheduler is not None:
+        raise ValueError(
+            f"Unsupported sweep scheduler: {scheduler}. Choose 'successive_halving' or None."
+        )
+
+    if verbose:
+        print(
+            f"Running {len(trials)} trials on {n_workers} workers "
+            f"with {cores_per_trial} cores each"
+        )
+
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=ctx,
+        initializer=helper.init_pinned_worker,
+        initargs=(core_blocks,),
+    ) as pool:
+        futures = [
+            pool.submit(
+                run_trial,
+                trial_id,
+                params,
+                base_values,
+                data,
+                labels,
+                eval_inputs,
+                eval_labels,
+                output_path,
+                scheduler,
+            )
+            for trial_id, params in enumerate(trials)
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            # Once fewer trials are left than workers, the finished worker stays idle
+            if scheduler is not None and pin and len(trials) - len(results) < n_workers:
+                scheduler.release_cores(result.get("cores", []))
+            if verbose:
+                print(
+                    f"Trial {result['trial']} {result['status']} after "
+                    f"{result['seconds']:.0f} s: "
+                    + ", ".join(f"{k}={result[k]}" for k in trials[result["trial"]])
+                )
+
+    if manager is not None:
+        manager.shutdown()
+    return sorted(results, key=lambda result: result["trial"])
+
+
+def write_summary(results, summary_path, sort_by="auc"):
+    """
+    Writes the sweep results as CSV and prints a summary table.
+
+    Args:
+        results (list): Results of `run_trial`.
+        summary_path (str): Path of the CSV file.
+        sort_by (str): Column to sort the table by, descending for AUCs and ascending for losses.
+            Trials without the column are listed last.
+
+    Returns:
+        list: The results in table order.
+    """
+    descending = sort_by.startswith("auc")
+
+    def sort_key(result):
+        value = result.get(sort_by)
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return (1, 0.0)
+        return (0, -value if descending else value)
+
+    results = sorted(results, key=sort_key)
+    columns = []
+    for result in results:
+        columns.extend(name for name in result if name not in columns)
+
+    with open(summary_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(results)
+
+    shown = [name for name in columns if name not in ("error", "cores")]
+    print(" | ".join(f"{name:>12}" for name in shown))
+    for result in results:
+        print(
+            " | ".join(
+                (
+                    f"{result[name]:>12.5g}"
+                    if isinstance(result.get(name), float)
+                    else f"{str(result.get(name, '')):>12}"
+                )
+                for name in shown
+            )
+        )
+    return results
@@ -0,0 +1,440 @@
+"""
+Automatic tuning of throughput-related training settings.
+
+Functions:
+    is_out_of_memory: Checks whether an exception was raised by running out of device memory.
+    time_train_steps: Measures the training throughput of a model at a given batch size.
+    find_batch_size: Finds the largest useful batch size by doubling it until memory runs out or
+        the throughput stops improving.
+    recommend_batch_settings: Splits an effective batch size into batch size and accumulation.
+    event_shape: Returns the per-event input shape of the configured model.
+    synthetic_dataset: Builds a random dataset with the input shape of the configured model.
+    cpu_settings_grid: Lists the CPU thread, worker and affinity combinations to try.
+    time_cpu_trial: Measures training and inference throughput for one combination.
+    tune_cpu_settings: Runs the trials of all combinations and picks the fastest.
+"""
+
+import copy
+import itertools
+import math
+import os
+import time
+from types import SimpleNamespace
+
+import torch
+from torch.utils.data import DataLoader
+
+from . import helper
+
+# Number of input features per object after the feature selection and label split
+N_FEATURES = {"all": 8, "4momentum": 4, "4momentum_btag": 5, "pj_custom": 5}
+
+# Settings written to the project config by the tune mode
+CPU_SETTINGS = (
+    "torch_threads",
+    "dataloader_workers",
+    "persistent_workers",
+    "prefetch_factor",
+    "cpu_affinity",
+)
+
+
+def is_out_of_memory(error):
+    """
+    Checks whether an exception was raised by running out of (device or host) memory.
+
+    Args:
+        error (Exception): The exception to check.
+
+    Returns:
+        bool: True for out-of-memory errors.
+    """
+    if isinstance(error, (torch.cuda.OutOfMemoryError, MemoryError)):
+        return True
+    return isinstance(error, RuntimeError) and "out of memory" in str(error).lower()
+
+
+def time_train_steps(model, loss_fn, config, inputs, labels, device, steps=5):
+    """
+    Measures the training throughput of a model on one batch.
+
+    Runs a warm-up step followed by `steps` timed training steps (forward, loss, backward and an
+    optimizer update) with the autocast settings of the config.
+
+    Args:
+        model (nn.Module): The model to train. Its weights are updated.
+        loss_fn (loss.BaseLoss): The training loss.
+        config (dataClass): Base class selecting user inputs.
+        inputs (torch.Tensor): The batch of inputs on `device`.
+        labels (torch.Tensor): Generator labels of the batch on `device`.
+        device (torch.device): The device the model runs on.
+        steps (int): Number of timed steps.
+
+    Returns:
+        float: Throughput in events per second.
+    """
+    optimizer = torch.optim.AdamW(model.parameters(), lr=1e-4)
+    scaler = helper.get_grad_scaler(config, device)
+    model.train()
+
+    def step():
+        optimizer.zero_grad(set_to_none=True)
+        with helper.autocast(config, device):
+            out = helper.call_forward(model, inputs)
+        recon, mu, logvar, ldj, z0, zk = helper.outputs_to_float(out)
+        loss, *_ = loss_fn.calculate(
+            recon=recon,
+            target=inputs,
+            mu=mu,
+            logvar=logvar,
+            zk=zk,
+            parameters=model.parameters(),
+            log_det_jacobian=ldj
+            if hasattr(ldj, "item")
+            else torch.tensor(0.0, device=device),
+            generator_labels=labels,
+        )
+        scaler.scale(loss).backward()
+        scaler.step(optimizer)
+        scaler.update()
+
+    step()
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+    start = time.perf_counter()
+    for _ in range(steps):
+        step()
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+    return steps * inputs.shape[0] / (time.perf_counter() - start)
+
+
+def find_batch_size(
+    model,
+    loss_fn,
+    config,
+    dataset,
+    device,
+    start_batch_size=None,
+    max_batch_size=None,
+    steps=5,
+    min_gain=0.05,
+    verbose=False,
+):
+    """
+    Finds the largest useful batch size on the current device.
+
+    The batch size is doubled, starting at `start_batch_size`, and a few training steps are timed
+    for each. The search stops when the device runs out of memory (the memory knee) or when
+    doubling the batch improves the throughput by less than `min_gain` (the throughput knee);
+    the last batch size before the knee is recommended. Trials run on a copy of the model and
+    leave the RNG state untouched.
+
+    Args:
+        model (nn.Module): The (unwrapped) model.
+        loss_fn (loss.BaseLoss): The training loss, without cross-rank communication.
+        config (dataClass): Base class selecting user inputs.
+        dataset (torch.utils.data.Dataset): Training dataset; indexed with a tensor of rows.
+        device (torch.device): The device the model runs on.
+        start_batch_size (int): First batch size to try. Defaults to `config.batch_size`.
+        max_batch_size (int): Upper bound of the search. Defaults to the dataset size.
+        steps (int): Number of timed training steps per batch size.
+        min_gain (float): Minimal relative throughput gain for a doubling to count.
+        verbose (bool): If True, prints every trial.
+
+    Returns:
+        dict: The recommended `batch_size`, the `stop_reason` and the list of `trials`
+            (batch size and events per second).
+    """
+    batch_size = max(1, start_batch_size or config.batch_size)
+    max_batch_size = min(max_batch_size or len(dataset), len(dataset))
+    trials = []
+    best = None
+    stop_reason = "max_batch_size"
+
+    devices = [device] if device.type == "cuda" else []
+    with torch.random.fork_rng(devices=devices):
+        while batch_size <= max_batch_size:
+            rows = torch.randint(0, len(dataset), (batch_size,))
+            inputs, labels = dataset[rows]
+            inputs, labels = inputs.to(device), labels.to(device)
+            trial_model = copy.deepcopy(model)
+            try:
+                throughput = time_train_steps(
+                    trial_model, loss_fn, config, inputs, labels, device, steps
+                )
+            except Exception as e:
+                if not is_out_of_memory(e):
+                    raise
+                stop_reason = "out_of_memory"
+                throughput = None
+            finally:
+                del trial_model, inputs, labels
+                if device.type == "cuda":
+                    torch.cuda.empty_cache()
+
+            trials.append({"batch_size": batch_size, "events_per_second": throughput})
+            if verbose:
+                print(
+                    f"Batch size {batch_size}: "
+                    + (f"{throughput:.0f} events/s" if throughput else "out of memory")
+                )
+            if throughput is None:
+                break
+            if best is not None and throughput < best["events_per_second"] * (
+                1 + min_gain
+            ):
+                stop_reason = "throughput_knee"
+                break
+            best = trials[-1]
+            batch_size *= 2
+
+    return {
+        "batch_size": best["batch_size"] if best else None,
+        "stop_reason": stop_reason,
+        "trials": trials,
+    }
+
+
+def recommend_batch_settings(max_batch_size, effective_batch_size):
+    """
+    Splits an effective batch size into a per-step batch size and gradient accumulation steps.
+
+    Args:
+        max_batch_size (int): Largest useful batch size found by `find_batch_size`.
+        effective_batch_size (int): Number of events wanted per optimizer step.
+
+    Returns:
+        tuple: (batch_size, gradient_accumulation_steps)
+    """
+    accumulation_steps = max(1, math.ceil(effective_batch_size / max_batch_size))
+    batch_size = math.ceil(effective_batch_size / accumulation_steps)
+    return batch_size, accumulation_steps
+
+
+def event_shape(config):
+    """
+    Returns the per-event input shape of the configured model, without loading any data.
+
+    Args:
+        config (dataClass): Base class selecting user inputs. Uses `input_level`,
+            `input_features`, `num_jets`, `num_constits` and `model_name`.
+
+    Returns:
+        tuple: Shape of one event as passed to the model.
+
+    Raises:
+        ValueError: For input levels without a fixed per-event shape.
+    """
+    n_features = N_FEATURES[config.input_features]
+    if config.input_level == "constituent":
+        shape = (config.num_jets * config.num_constits, n_features)
+    elif config.input_level == "jet":
+        shape = (config.num_jets, n_features)
+    else:
+        raise ValueError(
+            f"No fixed per-event shape for input_level {config.input_level}."
+        )
+    if "ConvVAE" in config.model_name or "ConvAE" in config.model_name:
+        shape = (1,) + shape
+    return shape
+
+
+def synthetic_dataset(config, num_events):
+    """
+    Builds a random dataset with the input shape of the configured model.
+
+    Args:
+        config (dataClass): Base class selecting user inputs, see `event_shape`.
+        num_events (int): Number of events in the dataset.
+
+    Returns:
+        helper.CustomDataset: Random inputs with all-zero generator labels.
+
+    Raises:
+        ValueError: For input levels without a fixed per-event shape.
+    """
+    shape = event_shape(config)
+    return helper.CustomDataset(
+        torch.randn(num_events, *shape), torch.zeros(num_events)
+    )
+
+
+def cpu_settings_grid(n_cores):
+    """
+    Lists the combinations of CPU settings to try.
+
+    Intra-op thread counts of all, half and a quarter of the cores are combined with a few
+    DataLoader worker counts, persistent workers and prefetch factors. Affinity pinning is only
+    tried when cores are left over for the DataLoader workers.
+
+    Args:
+        n_cores (int): Number of usable CPU cores.
+
+    Returns:
+        list: Dicts with one value for each of `CPU_SETTINGS`.
+    """
+    thread_counts = sorted({n_cores, max(1, n_cores // 2), max(1, n_cores // 4)})
+    worker_counts = sorted({0, 1, 2, max(1, n_cores // 4)})
+    grid = []
+    for threads, workers in itertools.product(thread_counts, worker_counts):
+        loader_options = (
+            itertools.product((False, True), (2, 4)) if workers > 0 else [(False, 2)]
+        )
+        for persistent, prefetch in loader_options:
+            for affinity in (False, True) if threads < n_cores else (False,):
+                grid.append(
+                    {
+                        "torch_threads": threads,
+                        "dataloader_workers": workers,
+                        "persistent_workers": persistent,
+                        "prefetch_factor": prefetch,
+                        "cpu_affinity": affinity,
+                    }
+                )
+    return grid
+
+
+def time_cpu_trial(
+    model, loss_fn, config, dataset, settings, batch_size, epochs=2, cores=None
+):
+    """
+    Measures training and inference throughput for one combination of CPU settings.
+
+    The settings are applied to the current process, then the model is trained for `epochs`
+    passes over the dataset (so that persistent workers pay off as they would in a real run) and
+    runs one inference pass.
+
+    Args:
+        model (nn.Module): The model, trained in place.
+        loss_fn (loss.BaseLoss): The training loss.
+        config (dataClass): Base class selecting user inputs.
+        dataset (torch.utils.data.Dataset): The (synthetic) dataset.
+        settings (dict): One combination from `cpu_settings_grid`.
+        batch_size (int): Batch size of the trial.
+        epochs (int): Number of training passes over the dataset.
+        cores (list): Cores of the process before any trial pinned it, split by `cpu_affinity`
+            trials. Defaults to the current affinity.
+
+    Returns:
+        dict: The settings with the measured training and inference events per second.
+    """
+    # The trial settings must not leak into the (class-level) project config
+    trial_config = SimpleNamespace(
+        use_amp=getattr(config, "use_amp", False),
+        amp_dtype=getattr(config, "amp_dtype", "auto"),
+        parallel_workers=config.parallel_workers,
+        **settings,
+    )
+    helper.apply_cpu_settings(trial_config, cores=cores)
+    device = torch.device("cpu")
+    loader_kwargs = helper.get_dataloader_kwargs(trial_config, device)
+    optimizer = torch.optim.AdamW(model.parameters(), lr=1e-4)
+
+    train_loader = DataLoader(
+        dataset, batch_size=batch_size, shuffle=True, drop_last=True, **loader_kwargs
+    )
+    model.train()
+    start = time.perf_counter()
+    for _ in range(epochs):
+        for inputs, labels in train_loader:
+            optimizer.zero_grad(set_to_none=True)
+            with helper.autocast(trial_config, device):
+                out = helper.call_forward(model, inputs)
+            recon, mu, logvar, ldj, z0, zk = helper.outputs_to_float(out)
+            loss, *_ = loss_fn.calculate(
+                recon=recon,
+                target=inputs,
+                mu=mu,
+                logvar=logvar,
+                zk=zk,
+                parameters=model.parameters(),
+                log_det_jacobian=ldj
+                if hasattr(ldj, "item")
+                else torch.tensor(0.0, device=device),
+                generator_labels=labels,
+            )
+            loss.backward()
+            optimizer.step()
+    train_time = time.perf_counter() - start
+    del train_loader
+
+    infer_loader = DataLoader(
+        dataset, batch_size=batch_size, shuffle=False, **loader_kwargs
+    )
+    model.eval()
+    start = time.perf_counter()
+    with torch.no_grad():
+        for inputs, _ in infer_loader:
+            with helper.autocast(trial_config, device):
+                helper.call_forward(model, inputs)
+    infer_time = time.perf_counter() - start
+
+    n_train = epochs * (len(dataset) // batch_size) * batch_size
+    return dict(
+        settings,
+        train_events_per_second=n_train / train_time,
+        inference_events_per_second=len(dataset) / infer_time,
+        total_seconds=train_time + infer_time,
+    )
+
+
+def tune_cpu_settings(config, batch_size=None, num_batches=20, verbose=False):
+    """
+    Runs short synthetic training and inference trials over the CPU settings grid.
+
+    The process-wide thread count and affinity are restored before every trial, so that a
+    `cpu_affinity` trial does not narrow the cores of the following ones, and after the last
+    trial. The inter-op thread
+    count can only be set once per process, so it is not part of the search.
+
+    Args:
+        config (dataClass): Base class selecting user inputs.
+        batch_size (int): Batch size of the trials. Defaults to `config.batch_size`.
+        num_batches (int): Number of batches in the synthetic dataset.
+        verbose (bool): If True, prints every trial.
+
+    Returns:
+        dict: The `best` combination (with its timings) and all `trials`, fastest first.
+    """
+    batch_size = batch_size or config.batch_size
+    dataset = synthetic_dataset(config, batch_size * num_batches)
+    in_shape = [batch_size] + list(dataset.data.shape[1:])
+    torch.manual_seed(0)
+    base_model = helper.model_init(in_shape, config)
+    loss_fn = helper.get_loss(config.loss_function)(config=config)
+
+    n_threads = torch.get_num_threads()
+    has_affinity = hasattr(os, "sched_getaffinity")
+    cores = sorted(os.sched_getaffinity(0)) if has_affinity else None
+    n_cores = len(cores) if cores else helper.get_available_cores()
+
+    trials = []
+    try:
+        for settings in cpu_settings_grid(n_cores):
+            torch.set_num_threads(n_threads)
+            if cores:
+                os.sched_setaffinity(0, cores)
+            result = time_cpu_trial(
+                copy.deepcopy(base_model),
+                loss_fn,
+                config,
+                dataset,
+                settings,
+                batch_size,
+                cores=cores,
+            )
+            trials.append(result)
+            if verbose:
+                print(
+                    ", ".join(f"{name}={settings[name]}" for name in CPU_SETTINGS)
+                    + f": train {result['train_events_per_second']:.0f} ev/s, "
+                    f"inference {result['inference_events_per_second']:.0f} ev/s"
+                )
+    finally:
+        torch.set_num_threads(n_threads)
+        if cores:
+            os.sched_setaffinity(0, cores)
+
+    trials.sort(key=lambda trial: trial["total_seconds"])
+    return {"best": trials[0], "trials": trials}
@@ -0,0 +1,143 @@
+"""
+float32 vs bfloat16 autocast: training throughput and anomaly-score AUC drift on CPU.
+
+Every model is trained for a few steps on synthetic background events, once in float32 and once
+with `use_amp=True` (bfloat16 autocast on CPU, flows and losses kept in float32). Both models
+then score a held-out mix of background and shifted "signal" events by per-event reconstruction
+error. Reported are the training throughput, the AUC of each model, and the AUC obtained when
+the float32-trained model is scored with bfloat16 inference (pure inference drift).
+
+Usage:
+    python -m benchmarks.bench_bf16 --batch-size 512 --steps 100
+"""
+
+import argparse
+import copy
+import time
+from types import SimpleNamespace
+
+import torch
+from sklearn.metrics import roc_auc_score
+
+from bead.src.utils import helper
+
+MODELS = [
+    "ConvVAE",
+    "Planar_ConvVAE",
+    "IAF_ConvVAE",
+    "NSFAR_ConvVAE",
+]
+
+
+def make_config(model_name, args, use_amp):
+    """Builds the minimal config needed to build the model and its loss."""
+    return SimpleNamespace(
+        model_name=model_name,
+        model_init="xavier",
+        latent_space_size=args.latent,
+        loss_function="VAELoss" if model_name == "ConvVAE" else "VAEFlowLoss",
+        reg_param=0.001,
+        use_amp=use_amp,
+        amp_dtype=args.dtype,
+    )
+
+
+def train(model, loss_fn, config, data, args, device):
+    """Trains the model for `args.steps` steps and returns the throughput (events/s)."""
+    optimizer = torch.optim.AdamW(model.parameters(), lr=1e-3)
+    scaler = helper.get_grad_scaler(config, device)
+    model.train()
+    start = time.perf_counter()
+    for step in range(args.steps):
+        rows = torch.randint(0, data.shape[0], (args.batch_size,))
+        inputs = data[rows].to(device)
+        optimizer.zero_grad(set_to_none=True)
+        with helper.autocast(config, device):
+            out = model(inputs)
+        recon, mu, logvar, ldj, z0, zk = helper.outputs_to_float(out)
+        loss, *_ = loss_fn.calculate(
+            recon=recon,
+            target=inputs,
+            mu=mu,
+            logvar=logvar,
+            zk=zk,
+            parameters=model.parameters(),
+            log_det_jacobian=ldj,
+        )
+        scaler.scale(loss).backward()
+        scaler.step(optimizer)
+        scaler.update()
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+    return args.steps * args.batch_size / (time.perf_counter() - start)
+
+
+def score(model, config, data, batch_size, device):
+    """Returns the per-event reconstruction error of the model."""
+    model.eval()
+    scores = []
+    with torch.no_grad():
+        for inputs in data.split(batch_size):
+            inputs = inputs.to(device)
+            with helper.autocast(config, device):
+                out = model(inputs)
+            recon = out[0].float()
+            scores.append((recon - inputs).pow(2).flatten(1).mean(1).cpu())
+    return torch.cat(scores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--models", nargs="+", default=MODELS)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--constits", type=int, default=15)
+    parser.add_argument("--latent", type=int, default=15)
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--dtype", default="bfloat16", help="amp_dtype for the mixed run")
+    parser.add_argument("--device", default="cpu")
+    args = parser.parse_args()
+    device = torch.device(args.device)
+
+    torch.manual_seed(0)
+    in_shape = [args.batch_size, 1, args.constits, 4]
+    background = torch.randn(args.events, 1, args.constits, 4)
+    test_bkg = torch.randn(args.events // 4, 1, args.constits, 4)
+    test_sig = torch.randn(args.events // 4, 1, args.constits, 4) * 1.5 + 0.5
+    test_data = torch.cat([test_bkg, test_sig])
+    labels = torch.cat([torch.zeros(len(test_bkg)), torch.ones(len(test_sig))])
+
+    print(f"Device: {device}, batch size: {args.batch_size}, mixed dtype: {args.dtype}")
+    print(
+        f"{'model':<20} {'fp32 ev/s':>10} {'amp ev/s':>10} {'speedup':>8} "
+        f"{'AUC fp32':>9} {'AUC amp':>9} {'AUC amp-inf':>11}"
+    )
+    for model_name in args.models:
+        fp32_config = make_config(model_name, args, use_amp=False)
+        amp_config = make_config(model_name, args, use_amp=True)
+        torch.manual_seed(0)
+        fp32_model = helper.model_init(in_shape, fp32_config).to(device)
+        amp_model = copy.deepcopy(fp32_model)
+        loss_fn = helper.get_loss(fp32_config.loss_function)(config=fp32_config)
+
+        torch.manual_seed(1)
+        fp32_rate = train(fp32_model, loss_fn, fp32_config, background, args, device)
+        torch.manual_seed(1)
+        amp_rate = train(amp_model, loss_fn, amp_config, background, args, device)
+
+        aucs = [
+            roc_auc_score(labels, score(model, config, test_data, args.batch_size, device))
+            for model, config in (
+                (fp32_model, fp32_config),
+                (amp_model, amp_config),
+                (fp32_model, amp_config),
+            )
+        ]
+        print(
+            f"{model_name:<20} {fp32_rate:>10.0f} {amp_rate:>10.0f} "
+            f"{amp_rate / fp32_rate:>8.2f} {aucs[0]:>9.4f} {aucs[1]:>9.4f} {aucs[2]:>11.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Eager vs torch.compile training step time for the models in `bead/src/models/models.py`.
+
+Every ConvVAE-family model is trained for a few steps (forward + loss + backward + optimizer) on
+synthetic constituent-level data, once eagerly and once with the model and loss compiled via
+`helper.compile_model` / `helper.compile_loss`. Compilation time is reported separately from
+the steady-state step time. Models that fail to compile are reported as falling back to eager.
+
+Usage:
+    python -m benchmarks.bench_compile --batch-size 512 --steps 50 --mode default
+"""
+
+import argparse
+import copy
+import time
+from types import SimpleNamespace
+
+import torch
+
+from bead.src.utils import helper
+
+MODELS = [
+    "ConvAE",
+    "ConvVAE",
+    "Planar_ConvVAE",
+    "OrthogonalSylvester_ConvVAE",
+    "HouseholderSylvester_ConvVAE",
+    "TriangularSylvester_ConvVAE",
+    "IAF_ConvVAE",
+    "ConvFlow_ConvVAE",
+    "NSFAR_ConvVAE",
+]
+
+
+def make_config(model_name, args):
+    """Builds the minimal config needed to build the model and its loss."""
+    return SimpleNamespace(
+        model_name=model_name,
+        model_init="xavier",
+        latent_space_size=args.latent,
+        loss_function="VAELoss" if model_name in ("ConvAE", "ConvVAE") else "VAEFlowLoss",
+        reg_param=0.001,
+        compile_mode=args.mode,
+    )
+
+
+def time_steps(model, loss_fn, inputs, steps, device):
+    """Returns the mean time (ms) of a training step."""
+    optimizer = torch.optim.AdamW(model.parameters(), lr=1e-3)
+
+    def step():
+        optimizer.zero_grad(set_to_none=True)
+        recon, mu, logvar, ldj, z0, zk = model(inputs)
+        loss, *_ = loss_fn.calculate(
+            recon=recon,
+            target=inputs,
+            mu=mu,
+            logvar=logvar,
+            zk=zk,
+            parameters=model.parameters(),
+            log_det_jacobian=ldj,
+        )
+        loss.backward()
+        optimizer.step()
+
+    # Warm-up steps, excluded from the timing
+    for _ in range(3):
+        step()
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    for _ in range(steps):
+        step()
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+    return (time.perf_counter() - start) / steps * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--models", nargs="+", default=MODELS)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--constits", type=int, default=15)
+    parser.add_argument("--latent", type=int, default=15)
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--mode", default="default", help="torch.compile mode")
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+    device = torch.device(args.device)
+
+    in_shape = [args.batch_size, 1, args.constits, 4]
+    inputs = torch.randn(*in_shape, device=device)
+
+    print(f"Device: {device}, batch size: {args.batch_size}, compile mode: {args.mode}")
+    print(
+        f"{'model':<30} {'eager ms':>10} {'compiled ms':>12} {'speedup':>8} {'compile s':>10}"
+    )
+    for model_name in args.models:
+        config = make_config(model_name, args)
+        torch.manual_seed(0)
+        eager_model = helper.model_init(in_shape, config).to(device).train()
+        compiled_model = copy.deepcopy(eager_model)
+        eager_loss = helper.get_loss(config.loss_function)(config=config)
+        compiled_loss = helper.get_loss(config.loss_function)(config=config)
+
+        eager_ms = time_steps(eager_model, eager_loss, inputs, args.steps, device)
+
+        start = time.perf_counter()
+        compiled_model = helper.compile_model(compiled_model, config, inputs)
+        compiled_loss = helper.compile_loss(compiled_loss, config)
+        compile_s = time.perf_counter() - start
+        if compiled_model is getattr(compiled_model, "_orig_mod", compiled_model):
+            print(f"{model_name:<30} {eager_ms:>10.2f} {'eager fallback':>12}")
+            continue
+
+        compiled_ms = time_steps(compiled_model, compiled_loss, inputs, args.steps, device)
+        print(
+            f"{model_name:<30} {eager_ms:>10.2f} {compiled_ms:>12.2f} "
+            f"{eager_ms / compiled_ms:>8.2f} {compile_s:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Scaling benchmark for CPU data-parallel training (DDP over gloo).
+
+Trains a small ConvVAE on synthetic constituent-level data with 1, 2, 4 and 8 worker
+processes on a CPU-only node and reports epoch time, throughput and speedup over a single
+process using all cores.
+The global dataset is fixed (strong scaling) while the per-process batch size stays constant,
+mirroring how `bead -m train` shards the training set with a `DistributedSampler`.
+
+Usage:
+    python -m benchmarks.bench_cpu_ddp_scaling --events 20000 --epochs 3 --procs 1 2 4 8
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.nn.parallel import DistributedDataParallel as DDP
+from torch.utils.data import DataLoader, TensorDataset
+from torch.utils.data.distributed import DistributedSampler
+
+from bead.src.trainers import training
+from bead.src.utils import helper
+
+
+def make_config(args, world_size, rank):
+    """Builds the minimal config needed by `helper.model_init` and `training.fit`."""
+    return SimpleNamespace(
+        model_name="ConvVAE",
+        model_init="xavier",
+        latent_space_size=args.latent,
+        loss_function="VAELoss",
+        optimizer="adamw",
+        lr=1e-3,
+        batch_size=args.batch_size,
+        reg_param=0.001,
+        use_amp=False,
+        use_ddp=world_size > 1,
+        ddp_backend="gloo",
+        ddp_cpu_threads=args.threads,
+        is_ddp_active=world_size > 1,
+        rank=rank,
+        local_rank=rank,
+        world_size=world_size,
+    )
+
+
+def worker(rank, world_size, args, result_file):
+    """Runs the timed training epochs on one DDP rank."""
+    config = make_config(args, world_size, rank)
+    threads = helper.set_cpu_threads_per_process(config, rank, world_size)
+    if world_size > 1:
+        dist.init_process_group(backend="gloo", rank=rank, world_size=world_size)
+
+    torch.manual_seed(0)
+    device = torch.device("cpu")
+    data = torch.randn(args.events, 1, args.constits, 4)
+    labels = torch.zeros(args.events)
+    dataset = TensorDataset(data, labels)
+
+    model = helper.model_init([args.batch_size, 1, args.constits, 4], config)
+    if world_size > 1:
+        model = DDP(model, find_unused_parameters=True)
+    sampler = (
+        DistributedSampler(
+            dataset, num_replicas=world_size, rank=rank, shuffle=True, drop_last=True
+        )
+        if world_size > 1
+        else None
+    )
+    loader = DataLoader(
+        dataset,
+        batch_size=args.batch_size,
+        sampler=sampler,
+        shuffle=sampler is None,
+        drop_last=True,
+    )
+    loss_fn = helper.get_loss(config.loss_function)(config=config)
+    optimizer = helper.get_optimizer(config.optimizer, model.parameters(), config.lr)
+    scaler = torch.amp.GradScaler(device="cpu", enabled=False)
+
+    epoch_times = []
+    for epoch in range(args.warmup + args.epochs):
+        if sampler is not None:
+            sampler.set_epoch(epoch)
+        if world_size > 1:
+            dist.barrier()
+        start = time.perf_counter()
+        training.fit(
+            config,
+            model,
+            loader,
+            loss_fn,
+            optimizer,
+            device,
+            scaler,
+            world_size > 1,
+            rank,
+            epoch,
+            verbose=False,
+        )
+        if epoch >= args.warmup:
+            epoch_times.append(time.perf_counter() - start)
+
+    if rank == 0:
+        epoch_time = sum(epoch_times) / len(epoch_times)
+        samples = len(loader) * args.batch_size * world_size
+        with open(result_file, "w") as f:
+            json.dump(
+                {
+                    "processes": world_size,
+                    "threads_per_process": threads,
+                    "epoch_time_s": epoch_time,
+                    "samples_per_s": samples / epoch_time,
+                },
+                f,
+            )
+
+    if world_size > 1:
+        dist.destroy_process_group()
+
+
+def run(world_size, args):
+    """Launches `world_size` workers and returns the rank 0 measurements."""
+    with tempfile.TemporaryDirectory() as tmp:
+        result_file = os.path.join(tmp, "result.json")
+        if world_size == 1:
+            worker(0, 1, args, result_file)
+        else:
+            os.environ["MASTER_ADDR"] = "127.0.0.1"
+            os.environ["MASTER_PORT"] = str(helper.find_free_port())
+            mp.spawn(
+                worker, args=(world_size, args, result_file), nprocs=world_size, join=True
+            )
+        with open(result_file) as f:
+            return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--constits", type=int, default=15)
+    parser.add_argument("--latent", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=0,
+        help="Intra-op threads per process (0 splits the cores evenly)",
+    )
+    parser.add_argument("--procs", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    print(f"Available cores: {helper.get_available_cores()}")
+    print(
+        f"{'procs':>5} {'threads':>7} {'epoch [s]':>10} {'samples/s':>10} {'speedup':>8}"
+    )
+    baseline = None
+    for n in args.procs:
+        res = run(n, args)
+        baseline = baseline or res["samples_per_s"]
+        speedup = res["samples_per_s"] / baseline
+        print(
+            f"{n:>5} {res['threads_per_process']:>7} {res['epoch_time_s']:>10.3f} "
+            f"{res['samples_per_s']:>10.1f} {speedup:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Vectorized ensemble inference: one stacked forward pass against independent member passes.
+
+Freshly initialised members of the same architecture score the same synthetic events, once with
+`ensemble.ModelEnsemble` (all members in one vectorized forward pass per batch) and once member
+by member. The per-member scores of both runs are compared in posterior-mean scoring mode.
+
+Usage:
+    python -m benchmarks.bench_ensemble --members 2 4 8 --events 20000
+"""
+
+import argparse
+import time
+from types import SimpleNamespace
+
+import torch
+
+from bead.src.utils import ensemble, helper
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--model", default="Planar_ConvVAE")
+    parser.add_argument("--members", nargs="+", type=int, default=[2, 4, 8])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--constits", type=int, default=15)
+    parser.add_argument("--latent", type=int, default=15)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    config = SimpleNamespace(
+        model_name=args.model,
+        model_init="xavier",
+        latent_space_size=args.latent,
+        loss_function="VAELoss" if args.model == "ConvVAE" else "VAEFlowLoss",
+        reg_param=0.001,
+        scoring_mode="mean",
+    )
+    loss_fn = helper.get_loss(config.loss_function)(config=config)
+    batches = torch.randn(args.events, 1, args.constits, 4).split(args.batch_size)
+
+    print(f"Model: {args.model}, events: {args.events}, batch size: {args.batch_size}")
+    print(
+        f"{'members':>8} {'stacked s':>10} {'separate s':>11} {'speedup':>8} {'match':>6}"
+    )
+    for n_members in args.members:
+        models = []
+        for seed in range(n_members):
+            torch.manual_seed(seed)
+            model = helper.model_init([1, 1, args.constits, 4], config).eval()
+            helper.set_scoring_mode(model, config)
+            models.append(model)
+        model_ensemble = ensemble.ModelEnsemble(models)
+        helper.set_scoring_mode(model_ensemble.base, config)
+
+        with torch.no_grad():
+            start = time.perf_counter()
+            stacked = torch.cat(
+                [model_ensemble.score(loss_fn, batch)[0] for batch in batches], dim=1
+            )
+            stacked_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            separate = []
+            for model in models:
+                member_scores = []
+                for batch in batches:
+                    recon, mu, logvar, ldj, z0, zk = helper.call_forward(model, batch)
+                    member_scores.append(
+                        loss_fn.calculate_per_event(
+                            recon=recon,
+                            target=batch,
+                            mu=mu,
+                            logvar=logvar,
+                            zk=zk,
+                            parameters=list(model.parameters()),
+                            log_det_jacobian=0,
+                            generator_labels=None,
+                        )[0]
+                    )
+                separate.append(torch.cat(member_scores))
+            separate_time = time.perf_counter() - start
+
+        match = torch.allclose(stacked, torch.stack(separate), rtol=1e-4, atol=1e-5)
+        print(
+            f"{n_members:>8} {stacked_time:>10.2f} {separate_time:>11.2f} "
+            f"{separate_time / stacked_time:>8.2f} {str(match):>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
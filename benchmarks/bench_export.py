@@ -0,0 +1,72 @@
+"""
+Frozen TorchScript export: inference latency of the eager model against the exported model.
+
+A freshly initialised model is exported with `export.export_model` (BatchNorm folded into the
+preceding layers, traced and frozen) and both models score the same synthetic events in batches.
+The parity check of the export guarantees that both produce the same outputs.
+
+Usage:
+    python -m benchmarks.bench_export --model Planar_ConvVAE --events 100000 --batch-size 1024
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+import torch
+
+from bead.src.utils import export, helper
+
+
+def time_model(model, batches, repeats):
+    """Returns the best time over `repeats` passes through all batches."""
+    best = float("inf")
+    with torch.no_grad():
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for inputs in batches:
+                model(inputs)
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--model", default="Planar_ConvVAE")
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--constits", type=int, default=15)
+    parser.add_argument("--latent", type=int, default=15)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    config = SimpleNamespace(
+        model_name=args.model, model_init="xavier", latent_space_size=args.latent
+    )
+    torch.manual_seed(0)
+    model = helper.model_init([1, 1, args.constits, 4], config).eval()
+    inputs = torch.randn(args.events, 1, args.constits, 4)
+    batches = inputs.split(args.batch_size)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        export_path = os.path.join(tmpdir, "model_frozen.pt")
+        export.export_model(model, batches[0], export_path, verbose=True)
+        exported = helper.load_exported_model(export_path)
+        # Warm-up passes let the TorchScript executor specialise the graph
+        time_model(exported, batches[:2], 2)
+
+        print(f"Model: {args.model}, events: {args.events}, batch size: {args.batch_size}")
+        print(f"{'model':>9} {'us/event':>9} {'speedup':>8}")
+        eager_time = time_model(model, batches, args.repeats)
+        exported_time = time_model(exported, batches, args.repeats)
+        for name, elapsed in (("eager", eager_time), ("exported", exported_time)):
+            print(
+                f"{name:>9} {1e6 * elapsed / args.events:>9.2f} "
+                f"{eager_time / elapsed:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Scoring server: request latency and throughput of the serve mode against concurrent clients.
+
+Every client thread keeps one connection open and sends requests of random events back to back.
+Without --address, a server with a freshly initialised model is started in a separate process on
+a temporary Unix socket; otherwise the running `bead -m serve` server at that address is used
+(pass the event shape of its model with --event-shape).
+
+Usage:
+    python -m benchmarks.bench_serve --clients 1 4 16 --events-per-request 1 16 --requests 500
+    python -m benchmarks.bench_serve --address 127.0.0.1:7050 --event-shape 1 45 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+
+from bead.src.utils import helper, serving
+
+
+def run_server(address, args):
+    """Serves a freshly initialised model (runs in a separate process)."""
+    config = SimpleNamespace(
+        model_name=args.model,
+        model_init="xavier",
+        latent_space_size=args.latent,
+        loss_function="VAELoss" if args.model == "ConvVAE" else "VAEFlowLoss",
+        reg_param=0.001,
+        use_amp=False,
+        serve_max_batch_size=args.max_batch_size,
+        serve_max_delay_ms=args.max_delay_ms,
+    )
+    torch.manual_seed(0)
+    model = helper.model_init([1] + args.event_shape, config).eval()
+    loss_fn = helper.get_loss(config.loss_function)(config=config)
+    serving.serve(model, loss_fn, args.event_shape, address, config=config)
+
+
+def wait_for_server(address, timeout=60):
+    """Waits until the server accepts connections."""
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            serving.ScoringClient(address).close()
+            return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def run_client(address, event_shape, events_per_request, num_requests, seed):
+    """Sends requests back to back and returns their latencies in seconds."""
+    events = np.random.default_rng(seed).standard_normal(
+        (events_per_request, *event_shape), dtype=np.float32
+    )
+    latencies = []
+    with serving.ScoringClient(address) as client:
+        for _ in range(num_requests):
+            start = time.perf_counter()
+            client.score(events)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--address", default=None)
+    parser.add_argument("--model", default="Planar_ConvVAE")
+    parser.add_argument("--event-shape", nargs="+", type=int, default=[1, 15, 4])
+    parser.add_argument("--latent", type=int, default=15)
+    parser.add_argument("--clients", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--events-per-request", nargs="+", type=int, default=[1, 16])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--max-batch-size", type=int, default=4096)
+    parser.add_argument("--max-delay-ms", type=float, default=2.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        server = None
+        address = args.address
+        if address is None:
+            address = "unix:" + os.path.join(tmpdir, "serve.sock")
+            server = multiprocessing.get_context("spawn").Process(
+                target=run_server, args=(address, args), daemon=True
+            )
+            server.start()
+        wait_for_server(address)
+
+        print(f"Server: {address}, event shape: {tuple(args.event_shape)}")
+        print(
+            f"{'clients':>8} {'events':>7} {'p50 ms':>8} {'p99 ms':>8} "
+            f"{'requests/s':>11} {'events/s':>10}"
+        )
+        for n_clients in args.clients:
+            for events_per_request in args.events_per_request:
+                start = time.perf_counter()
+                with ThreadPoolExecutor(n_clients) as pool:
+                    results = pool.map(
+                        run_client,
+                        [address] * n_clients,
+                        [args.event_shape] * n_clients,
+                        [events_per_request] * n_clients,
+                        [args.requests] * n_clients,
+                        range(n_clients),
+                    )
+                    latencies = np.concatenate([np.asarray(r) for r in results])
+                elapsed = time.perf_counter() - start
+                p50, p99 = 1e3 * np.percentile(latencies, [50, 99])
+                rate = len(latencies) / elapsed
+                print(
+                    f"{n_clients:>8} {events_per_request:>7} {p50:>8.2f} {p99:>8.2f} "
+                    f"{rate:>11.0f} {rate * events_per_request:>10.0f}"
+                )
+
+        if server is not None:
+            server.terminate()
+            server.join()
+
+
+if __name__ == "__main__":
+    main()
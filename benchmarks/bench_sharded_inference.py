@@ -0,0 +1,92 @@
+"""
+Sharded multi-process CPU inference: throughput against the number of worker processes.
+
+A freshly initialised model is saved to a temporary directory and scores synthetic events with
+`inference.infer_sharded`, which splits the events into contiguous shards scored by pinned worker
+processes writing into shared memory-mapped outputs. One worker process is the baseline. The
+outputs of every run are checked against the baseline, so the ordering is verified as well.
+
+Usage:
+    python -m benchmarks.bench_sharded_inference --workers 1 2 4 8 --events 100000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+
+from bead.src.trainers import inference
+from bead.src.utils import helper, sinks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--model", default="Planar_ConvVAE")
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--constits", type=int, default=15)
+    parser.add_argument("--latent", type=int, default=15)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument(
+        "--outputs", default="scores", choices=list(sinks.INFERENCE_OUTPUTS)
+    )
+    args = parser.parse_args()
+
+    config = SimpleNamespace(
+        model_name=args.model,
+        model_init="xavier",
+        latent_space_size=args.latent,
+        loss_function="VAELoss" if args.model == "ConvVAE" else "VAEFlowLoss",
+        reg_param=0.001,
+        use_amp=False,
+        inference_batch_size=args.batch_size,
+    )
+    torch.manual_seed(0)
+    in_shape = [1, 1, args.constits, 4]
+    model = helper.model_init(in_shape, config).eval()
+    loss_fn = helper.get_loss(config.loss_function)(config=config)
+    inputs = torch.randn(args.events, 1, args.constits, 4)
+
+    print(f"Model: {args.model}, events: {args.events}, outputs: {args.outputs}")
+    print(f"{'workers':>8} {'events/s':>10} {'speedup':>8} {'match':>6}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        model_path = os.path.join(tmpdir, "model.pt")
+        helper.save_model(model, model_path)
+        baseline_rate, baseline_scores = None, None
+        for n_workers in args.workers:
+            output_paths = {
+                name: os.path.join(tmpdir, f"test_{name}_data.npy")
+                for name in sinks.INFERENCE_OUTPUTS[args.outputs]
+            }
+            loss_paths = {
+                name: os.path.join(tmpdir, f"{name}_test.npy")
+                for name in loss_fn.component_names
+            }
+            start = time.perf_counter()
+            inference.infer_sharded(
+                model,
+                loss_fn,
+                model_path,
+                in_shape,
+                inputs,
+                config,
+                output_paths,
+                loss_paths,
+                n_workers,
+            )
+            rate = args.events / (time.perf_counter() - start)
+            scores = np.load(loss_paths[loss_fn.component_names[0]])
+            if baseline_rate is None:
+                baseline_rate, baseline_scores = rate, scores
+            match = np.allclose(scores, baseline_scores, rtol=1e-5, atol=1e-6)
+            print(
+                f"{n_workers:>8} {rate:>10.0f} {rate / baseline_rate:>8.2f} {str(match):>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
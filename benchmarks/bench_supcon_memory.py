@@ -0,0 +1,112 @@
+"""
+Peak memory and step time of the dense vs block-wise SupCon loss.
+
+For every batch size the forward + backward of `SupervisedContrastiveLoss` is timed with the
+dense path (`supcon_block_size = 0`) and the block-wise path. Peak memory is read from the CUDA
+allocator on GPUs. On CPU every measurement runs in a fresh process and reports the growth of
+its peak resident set size.
+
+Usage:
+    python -m benchmarks.bench_supcon_memory --batch-sizes 1024 4096 16384 --block-size 512
+"""
+
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+from types import SimpleNamespace
+
+import torch
+from torch.nn import functional as F
+
+from bead.src.utils.loss import SupervisedContrastiveLoss
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+
+def measure(batch_size, block_size, dim, repeats, device):
+    """Returns (peak memory in MB, mean step time in ms) for one configuration."""
+    config = SimpleNamespace(contrastive_temperature=0.07, supcon_block_size=block_size)
+    loss_fn = SupervisedContrastiveLoss(config)
+    raw = torch.randn(batch_size, dim, device=device, requires_grad=True)
+    labels = torch.randint(0, 4, (batch_size,), device=device)
+
+    def step():
+        features = F.normalize(raw, p=2, dim=1)
+        (loss,) = loss_fn.calculate(features, labels)
+        loss.backward()
+        raw.grad = None
+
+    # Warm-up, excluded from the timing but included in the peak memory
+    step()
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+        baseline = torch.cuda.memory_allocated() / 2**20
+    else:
+        baseline = None
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        step()
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+        peak = torch.cuda.max_memory_allocated() / 2**20 - baseline
+    else:
+        peak = peak_rss_mb()
+    return peak, (time.perf_counter() - start) / repeats * 1e3
+
+
+def _cpu_worker(queue, batch_size, block_size, dim, repeats):
+    baseline = peak_rss_mb()
+    peak, step_ms = measure(batch_size, block_size, dim, repeats, torch.device("cpu"))
+    queue.put((peak - baseline, step_ms))
+
+
+def run(batch_size, block_size, dim, repeats, device):
+    """Runs one measurement, in a fresh process on CPU so peak RSS is not shared."""
+    if device.type == "cuda":
+        return measure(batch_size, block_size, dim, repeats, device)
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(
+        target=_cpu_worker, args=(queue, batch_size, block_size, dim, repeats)
+    )
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[1024, 2048, 4096, 8192, 16384]
+    )
+    parser.add_argument("--block-size", type=int, default=512)
+    parser.add_argument("--dim", type=int, default=15, help="Latent space size")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+    device = torch.device(args.device)
+
+    print(f"Device: {device}, block size: {args.block_size}, latent dim: {args.dim}")
+    print(
+        f"{'batch':>7} {'dense MB':>10} {'dense ms':>10} {'block MB':>10} {'block ms':>10}"
+    )
+    for batch_size in args.batch_sizes:
+        dense = run(batch_size, 0, args.dim, args.repeats, device)
+        block = run(batch_size, args.block_size, args.dim, args.repeats, device)
+        print(
+            f"{batch_size:>7} {dense[0]:>10.1f} {dense[1]:>10.2f} {block[0]:>10.1f} {block[1]:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
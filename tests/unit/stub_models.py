@@ -0,0 +1,27 @@
+"""
+Small stand-in models shared by the unit tests.
+
+Classes:
+    TinyVAE: A minimal deterministic model with the VAE output signature.
+"""
+
+import torch.nn as nn
+
+
+class TinyVAE(nn.Module):
+    """
+    A minimal VAE-shaped model without sampling noise, for 4-feature events.
+
+    It returns `(recon, mu, logvar, ldj, z0, zk)` like the BEAD models, with the posterior mean
+    as latent and a log-det-jacobian of 0.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.encoder = nn.Linear(4, 4)
+        self.decoder = nn.Linear(2, 4)
+
+    def forward(self, x):
+        h = self.encoder(x)
+        mu, logvar = h[:, :2], h[:, 2:]
+        return self.decoder(mu), mu, logvar, 0, mu, mu
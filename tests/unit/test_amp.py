@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Unit tests for mixed precision settings.
+
+These tests verify that the autocast dtype resolves to bfloat16 on CPU, that
+loss scaling is only enabled for float16, and that normalizing flows keep
+their log-det-jacobians in float32 inside a bfloat16 autocast region.
+"""
+
+import unittest
+from types import SimpleNamespace
+
+import torch
+
+from bead.src.models import flows
+from bead.src.utils import helper
+
+
+class TestMixedPrecision(unittest.TestCase):
+    """Test the autocast helpers and the float32 flow forward pass."""
+
+    def setUp(self):
+        """Set up a CPU device."""
+        self.device = torch.device("cpu")
+
+    def test_amp_dtype_resolution(self):
+        """Test the autocast dtype for the different amp settings."""
+        self.assertIsNone(helper.get_amp_dtype(SimpleNamespace(use_amp=False), self.device))
+        self.assertEqual(
+            helper.get_amp_dtype(SimpleNamespace(use_amp=True), self.device),
+            torch.bfloat16,
+        )
+        self.assertEqual(
+            helper.get_amp_dtype(
+                SimpleNamespace(use_amp=True, amp_dtype="auto"), torch.device("cuda")
+            ),
+            torch.float16,
+        )
+        with self.assertRaises(ValueError):
+            helper.get_amp_dtype(
+                SimpleNamespace(use_amp=True, amp_dtype="float8"), self.device
+            )
+
+    def test_grad_scaler_only_for_float16(self):
+        """Test that bfloat16 training runs without loss scaling."""
+        scaler = helper.get_grad_scaler(SimpleNamespace(use_amp=True), self.device)
+        self.assertFalse(scaler.is_enabled())
+
+    def test_flow_runs_in_float32_under_autocast(self):
+        """Test that a flow returns float32 outputs inside a bfloat16 autocast region."""
+        config = SimpleNamespace(use_amp=True, amp_dtype="bfloat16")
+        flow = flows.Planar()
+        z = torch.randn(8, 4)
+        u, w, b = torch.randn(8, 4, 1), torch.randn(8, 1, 4), torch.randn(8, 1, 1)
+
+        with helper.autocast(config, self.device):
+            z_k, ldj = flow(z.bfloat16(), u.bfloat16(), w.bfloat16(), b.bfloat16())
+
+        self.assertEqual(z_k.dtype, torch.float32)
+        self.assertEqual(ldj.dtype, torch.float32)
+
+    def test_outputs_to_float_keeps_scalars(self):
+        """Test that non-tensor outputs are passed through unchanged."""
+        outputs = helper.outputs_to_float((torch.ones(2, dtype=torch.bfloat16), 0))
+        self.assertEqual(outputs[0].dtype, torch.float32)
+        self.assertEqual(outputs[1], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Unit tests for full training-state checkpointing.
+
+These tests verify that checkpoints are snapshotted independently of the live
+training state, rotated according to the retention policy, and that resuming
+restores optimizer, early stopping, annealing and RNG state.
+"""
+
+import os
+import random
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+
+from bead.src.trainers.training import get_training_state, load_training_state
+from bead.src.utils import helper
+from bead.src.utils.annealing import AnnealingManager
+from bead.src.utils.checkpointing import CheckpointManager
+
+
+class TestCheckpointManager(unittest.TestCase):
+    """Test writing, rotating and loading checkpoints."""
+
+    def setUp(self):
+        """Set up a temporary checkpoint directory."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.manager = CheckpointManager(self.tmp_dir.name, retention=2)
+
+    def tearDown(self):
+        """Flush pending writes and remove the temporary directory."""
+        self.manager.close()
+        self.tmp_dir.cleanup()
+
+    def test_snapshot_is_decoupled_from_live_state(self):
+        """Test that changing a tensor after save does not change the checkpoint."""
+        weights = torch.ones(3)
+        self.manager.save({"weights": weights}, epoch=0)
+        weights.add_(1.0)
+
+        state = self.manager.load()
+        self.assertTrue(torch.equal(state["weights"], torch.ones(3)))
+        self.assertEqual(state["epoch"], 0)
+
+    def test_retention_keeps_latest(self):
+        """Test that only the most recent checkpoints are kept."""
+        for epoch in range(5):
+            self.manager.save({"value": epoch}, epoch=epoch)
+        self.manager.wait()
+
+        checkpoints = self.manager.list_checkpoints()
+        self.assertEqual(len(checkpoints), 2)
+        self.assertTrue(checkpoints[-1].endswith("checkpoint_epoch_0005.pt"))
+        self.assertEqual(self.manager.load()["value"], 4)
+        self.assertFalse(
+            any(name.endswith(".tmp") for name in os.listdir(self.tmp_dir.name))
+        )
+
+    def test_load_without_checkpoint_raises(self):
+        """Test that resuming without a checkpoint fails loudly."""
+        with self.assertRaises(FileNotFoundError):
+            self.manager.load()
+
+
+class TestTrainingStateRoundTrip(unittest.TestCase):
+    """Test that the full training state survives a save/resume cycle."""
+
+    def _make_components(self, config):
+        torch.manual_seed(0)
+        model = torch.nn.Linear(4, 2)
+        optimizer = torch.optim.Adam(model.parameters(), lr=0.01)
+        scaler = torch.amp.GradScaler(enabled=False)
+        lr_scheduler = helper.LRScheduler(optimizer=optimizer, patience=1)
+        early_stopper = helper.EarlyStopping(patience=5, min_delta=0)
+        annealing_manager = AnnealingManager(config)
+        loss_history = {
+            "train_loss_components_per_epoch": [],
+            "validation_loss_components_per_epoch": [],
+            "train_avg_epoch_losses": [],
+            "validation_avg_epoch_losses": [],
+        }
+        return (
+            model,
+            optimizer,
+            scaler,
+            lr_scheduler,
+            early_stopper,
+            annealing_manager,
+            loss_history,
+        )
+
+    def _make_config(self):
+        return SimpleNamespace(
+            epochs=10,
+            reg_param=0.001,
+            annealing_params={
+                "reg_param": {
+                    "strategy": "TRIGGER_BASED",
+                    "values": [0.001, 0.005, 0.01],
+                    "trigger_source": "early_stopper_half_patience",
+                    "current_index": 0,
+                }
+            },
+        )
+
+    def test_resume_restores_state(self):
+        """Test that resuming restores weights, optimizer, counters, annealing and RNG."""
+        config = self._make_config()
+        components = self._make_components(config)
+        model, optimizer, _, _, early_stopper, annealing_manager, loss_history = (
+            components
+        )
+
+        # Simulate some training progress
+        loss = model(torch.randn(8, 4)).pow(2).mean()
+        loss.backward()
+        optimizer.step()
+        early_stopper(1.0)
+        early_stopper(2.0)
+        annealing_manager.step(epoch=0, metrics={"early_stopper_half_patience": True})
+        loss_history["train_avg_epoch_losses"].extend([1.0, 2.0])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            manager = CheckpointManager(tmp_dir)
+            manager.save(get_training_state(*components), epoch=1)
+            expected_random = (random.random(), np.random.rand(), torch.rand(1))
+            state = manager.load()
+            manager.close()
+
+        resumed_config = self._make_config()
+        resumed = self._make_components(resumed_config)
+        start_epoch = load_training_state(state, *resumed)
+
+        self.assertEqual(start_epoch, 2)
+        self.assertTrue(torch.equal(resumed[0].weight, model.weight))
+        self.assertEqual(
+            resumed[1].state_dict()["state"][0]["step"],
+            optimizer.state_dict()["state"][0]["step"],
+        )
+        self.assertEqual(resumed[4].counter, 1)
+        self.assertEqual(resumed[4].best_loss, 1.0)
+        self.assertEqual(resumed_config.reg_param, 0.005)
+        self.assertEqual(
+            resumed[5].param_maps["reg_param"]["settings"]["current_index"], 1
+        )
+        self.assertEqual(resumed[6]["train_avg_epoch_losses"], [1.0, 2.0])
+        self.assertEqual(random.random(), expected_random[0])
+        self.assertEqual(np.random.rand(), expected_random[1])
+        self.assertTrue(torch.equal(torch.rand(1), expected_random[2]))
+
+
+if __name__ == "__main__":
+    unittest.main()
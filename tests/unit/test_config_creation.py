@@ -17,7 +17,7 @@ from types import SimpleNamespace
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 # Import create_default_config directly
-from bead.src.utils.ggl import create_default_config
+from bead.src.utils.ggl import create_default_config, update_config_file
 
 
 class TestConfigCreation(unittest.TestCase):
@@ -116,6 +116,27 @@ class TestConfigCreation(unittest.TestCase):
             self.assertIn('reg_param', c.annealing_params)
             self.assertIn('contrastive_weight', c.annealing_params)
 
+    def test_update_config_file(self):
+        """Test that tuned values overwrite existing options and missing ones are appended."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            config_file_path = os.path.join(temp_dir, f"{self.project_name}_config.py")
+            with open(config_file_path, 'w') as f:
+                f.write(create_default_config(self.workspace_name, self.project_name))
+
+            update_config_file(
+                config_file_path, {'torch_threads': 4, 'new_option': 'value'}
+            )
+
+            spec = importlib.util.spec_from_file_location('updated_config_module', config_file_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            c = SimpleNamespace()
+            module.set_config(c)
+
+            self.assertEqual(c.torch_threads, 4)
+            self.assertEqual(c.new_option, 'value')
+            self.assertEqual(c.annealing_params['reg_param']['current_index'], 0)
+
 
 if __name__ == '__main__':
     unittest.main()
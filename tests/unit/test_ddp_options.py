@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the DDP configuration helpers.
+
+These tests verify that the unused-parameter probe finds parameters that get
+no gradient from the training loss without changing the model, and that the
+DDP options only fall back to the per-step unused-parameter search when needed.
+"""
+
+import unittest
+from types import SimpleNamespace
+
+import torch
+import torch.nn as nn
+
+from bead.src.utils import helper
+from bead.src.utils.loss import VAELoss
+from tests.unit.stub_models import TinyVAE
+
+
+class AuxHeadVAE(TinyVAE):
+    """A sampling VAE with an auxiliary head that does not feed into the loss."""
+
+    def __init__(self):
+        super().__init__()
+        self.norm = nn.BatchNorm1d(4)
+        self.unused_head = nn.Linear(4, 1)
+
+    def forward(self, x):
+        h = self.norm(self.encoder(x))
+        mu, logvar = h[:, :2], h[:, 2:]
+        z = mu + torch.randn_like(mu) * torch.exp(0.5 * logvar)
+        return self.decoder(z), mu, logvar, 0, z, z
+
+
+class TestDDPOptions(unittest.TestCase):
+    """Test the unused-parameter probe and the DDP options."""
+
+    def test_probe_finds_unused_parameters(self):
+        """Test that only the parameters outside the loss graph are reported."""
+        model = AuxHeadVAE()
+        loss_fn = VAELoss(SimpleNamespace(reg_param=0.001))
+        running_mean = model.norm.running_mean.clone()
+        rng_state = torch.get_rng_state()
+
+        unused = helper.find_unused_parameters(model, loss_fn, torch.randn(8, 4))
+
+        self.assertEqual(unused, ["unused_head.weight", "unused_head.bias"])
+        self.assertTrue(all(p.grad is None for p in model.parameters()))
+        self.assertTrue(torch.equal(model.norm.running_mean, running_mean))
+        self.assertTrue(torch.equal(torch.get_rng_state(), rng_state))
+
+    def test_ddp_kwargs(self):
+        """Test that the unused-parameter search is only enabled without a static graph."""
+        static = helper.get_ddp_kwargs(SimpleNamespace(), True)
+        self.assertTrue(static["static_graph"])
+        self.assertFalse(static["find_unused_parameters"])
+
+        config = SimpleNamespace(ddp_static_graph=False, ddp_bucket_cap_mb=50)
+        self.assertTrue(helper.get_ddp_kwargs(config, True)["find_unused_parameters"])
+        dynamic = helper.get_ddp_kwargs(config, False)
+        self.assertFalse(dynamic["find_unused_parameters"])
+        self.assertEqual(dynamic["bucket_cap_mb"], 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the streaming activation statistics.
+
+These tests verify that the running per-node statistics over many batches
+match the statistics of all activations at once, and that the recorder
+produces the neural activation pattern matrix of the whole dataset.
+"""
+
+import unittest
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from bead.src.models.models import AE
+from bead.src.utils import diagnostics
+
+
+class TestRunningNodeStats(unittest.TestCase):
+    """Test the merged batch statistics."""
+
+    def test_matches_full_data(self):
+        """Test the mean and variance over unevenly sized batches."""
+        torch.manual_seed(0)
+        values = torch.randn(1000, 7) * 3 + 5
+        stats = diagnostics.RunningNodeStats()
+        for batch in values.split([1, 300, 99, 600]):
+            stats.update(batch)
+
+        self.assertEqual(stats.count, 1000)
+        self.assertTrue(torch.allclose(stats.mean, values.mean(0), atol=1e-5))
+        self.assertTrue(
+            torch.allclose(stats.variance, values.var(0, unbiased=False), atol=1e-4)
+        )
+
+
+class TestActivationRecorder(unittest.TestCase):
+    """Test the hooks over a model's layers."""
+
+    def test_nap_matrix_covers_all_batches(self):
+        """Test that the NAP matrix averages over every batch, not only the last one."""
+        torch.manual_seed(0)
+        inputs = torch.randn(64, 1, 5, 4)
+        model = AE([16, 1, 5, 4], z_dim=3).eval()
+        recorder = diagnostics.ActivationRecorder(model.get_layers())
+        with torch.no_grad():
+            for batch in inputs.split(16):
+                model(batch)
+        recorder.remove()
+        self.assertEqual(len(model.en1._forward_hooks), 0)
+
+        with torch.no_grad():
+            h1 = F.leaky_relu(model.en1(model.flatten(inputs)))
+            h2 = F.leaky_relu(model.en2(h1))
+            h3 = F.leaky_relu(model.en3(h2))
+            h4 = F.leaky_relu(model.de1(model.en4(h3)))
+            h5 = F.leaky_relu(model.de2(h4))
+            h6 = F.leaky_relu(model.de3(h5))
+        layer_outputs = dict(zip("012345", (h1, h2, h3, h4, h5, h6), strict=True))
+        expected = diagnostics.dict_to_square_matrix(layer_outputs)
+
+        nap = recorder.nap_matrix()
+        self.assertEqual(nap.shape, (6, 200))
+        self.assertTrue(np.isnan(nap[2, 50:]).all())
+        np.testing.assert_allclose(nap, expected, atol=1e-5)
+
+
+if __name__ == "__main__":
+    unittest.main()
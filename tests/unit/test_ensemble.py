@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the vectorized model ensemble.
+
+These tests verify that the per-member scores of one vectorized forward pass
+match scoring every member on its own, and the aggregation over members.
+"""
+
+import unittest
+from types import SimpleNamespace
+
+import torch
+
+from bead.src.utils import ensemble, evaluation, helper
+from bead.src.utils.loss import VAEFlowLoss
+
+
+class TestModelEnsemble(unittest.TestCase):
+    """Test the stacked ensemble against its members."""
+
+    def setUp(self):
+        config = SimpleNamespace(
+            model_name="Planar_ConvVAE",
+            model_init="xavier",
+            latent_space_size=4,
+            reg_param=0.001,
+        )
+        self.members = []
+        for seed in range(3):
+            torch.manual_seed(seed)
+            self.members.append(helper.model_init([1, 1, 6, 4], config).eval())
+        self.loss_fn = VAEFlowLoss(config)
+        self.inputs = torch.randn(8, 1, 6, 4)
+        self.scoring = SimpleNamespace(scoring_mode="mean")
+
+    def test_members_match_individual_models(self):
+        """Test that every member scores like the model on its own."""
+        model_ensemble = ensemble.ModelEnsemble(self.members)
+        helper.set_scoring_mode(model_ensemble.base, self.scoring)
+        with torch.no_grad():
+            scores = model_ensemble.score(self.loss_fn, self.inputs)
+        self.assertEqual(scores[0].shape, (3, 8))
+
+        for member, model in enumerate(self.members):
+            expected = evaluation.score_events(
+                model,
+                self.loss_fn,
+                self.inputs,
+                device=torch.device("cpu"),
+                config=self.scoring,
+            )
+            for component, name in zip(
+                scores, self.loss_fn.component_names, strict=True
+            ):
+                self.assertTrue(
+                    torch.allclose(
+                        component[member], torch.tensor(expected[name]), atol=1e-5
+                    )
+                )
+
+    def test_aggregate(self):
+        """Test the aggregation of member scores."""
+        scores = torch.tensor([[1.0, 4.0], [3.0, 2.0], [2.0, 9.0]])
+        for aggregation, expected in (
+            ("mean", [2.0, 5.0]),
+            ("median", [2.0, 4.0]),
+            ("max", [3.0, 9.0]),
+        ):
+            self.assertTrue(
+                torch.equal(
+                    ensemble.aggregate(scores, aggregation), torch.tensor(expected)
+                )
+            )
+        with self.assertRaises(ValueError):
+            ensemble.aggregate(scores, "vote")
+
+
+if __name__ == "__main__":
+    unittest.main()
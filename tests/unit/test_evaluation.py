@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the checkpoint selection helpers.
+
+These tests verify that intermittent checkpoints are listed in epoch order
+with the final model last, and that promoting a checkpoint keeps the final
+model of the training run.
+"""
+
+import os
+import tempfile
+import unittest
+
+from bead.src.utils import evaluation
+
+
+class TestCheckpointSelection(unittest.TestCase):
+    """Test listing and promoting saved models."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.models_dir = self.tmpdir.name
+        for name in ("model_epoch_10.pt", "model_epoch_2.pt", "model.pt", "notes.txt"):
+            with open(os.path.join(self.models_dir, name), "w") as f:
+                f.write(name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _read(self, name):
+        with open(os.path.join(self.models_dir, name)) as f:
+            return f.read()
+
+    def test_find_checkpoints(self):
+        """Test that checkpoints are sorted by epoch and the final model comes last."""
+        checkpoints = evaluation.find_checkpoints(self.models_dir)
+        self.assertEqual([epoch for epoch, _ in checkpoints], [2, 10, None])
+        self.assertTrue(checkpoints[-1][1].endswith("model.pt"))
+
+    def test_promote_keeps_final_model(self):
+        """Test that promotion keeps the final model and is listed from then on."""
+        evaluation.promote_checkpoint(
+            os.path.join(self.models_dir, "model_epoch_2.pt"), self.models_dir
+        )
+        self.assertEqual(self._read("model.pt"), "model_epoch_2.pt")
+        self.assertEqual(self._read("model_final.pt"), "model.pt")
+
+        evaluation.promote_checkpoint(
+            os.path.join(self.models_dir, "model_epoch_10.pt"), self.models_dir
+        )
+        self.assertEqual(self._read("model_final.pt"), "model.pt")
+        checkpoints = evaluation.find_checkpoints(self.models_dir)
+        self.assertTrue(checkpoints[-1][1].endswith("model_final.pt"))
+
+
+if __name__ == "__main__":
+    unittest.main()
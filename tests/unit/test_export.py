@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the frozen TorchScript export.
+
+These tests verify that folding BatchNorm into the preceding layers keeps the
+outputs of a model in eval mode, and that an exported convolutional VAE
+matches the eager model after a save/load round trip.
+"""
+
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import torch
+import torch.nn as nn
+
+from bead.src.utils import export, helper
+
+
+def randomize_batch_norm(model):
+    """Gives every BatchNorm non-trivial running statistics and affine parameters."""
+    for module in model.modules():
+        if isinstance(module, (nn.BatchNorm1d, nn.BatchNorm2d)):
+            module.running_mean.uniform_(-1, 1)
+            module.running_var.uniform_(0.5, 2)
+            module.weight.data.uniform_(0.5, 1.5)
+            module.bias.data.uniform_(-0.5, 0.5)
+
+
+class TestBatchNormFolding(unittest.TestCase):
+    """Test the folding of BatchNorm layers."""
+
+    def test_fold_linear_and_conv(self):
+        """Test that folded Linear and Conv2d blocks keep their outputs."""
+        torch.manual_seed(0)
+        linear = nn.Sequential(nn.Linear(6, 5), nn.BatchNorm1d(5), nn.ReLU())
+        conv = nn.Sequential(nn.Conv2d(1, 3, 3), nn.BatchNorm2d(3), nn.ReLU())
+        for model, inputs in ((linear, torch.randn(8, 6)), (conv, torch.randn(8, 1, 6, 6))):
+            randomize_batch_norm(model)
+            model.eval()
+            expected = model(inputs)
+            prepared, folded = export.prepare_for_inference(model)
+            self.assertEqual(folded, 1)
+            self.assertIsInstance(prepared[1], nn.Identity)
+            self.assertTrue(torch.allclose(prepared(inputs), expected, atol=1e-5))
+
+
+class TestExportModel(unittest.TestCase):
+    """Test the export of a full model."""
+
+    def test_exported_conv_vae_matches_eager(self):
+        """Test that the saved, frozen model reproduces the eager outputs."""
+        torch.manual_seed(0)
+        config = SimpleNamespace(
+            model_name="ConvVAE", model_init="xavier", latent_space_size=4
+        )
+        model = helper.model_init([1, 1, 6, 4], config)
+        randomize_batch_norm(model)
+        model.eval()
+        inputs = torch.randn(16, 1, 6, 4)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            export_path = os.path.join(tmpdir, "model_frozen.pt")
+            export.export_model(
+                model, inputs, export_path, metadata={"scoring_mode": "sample"}
+            )
+            exported, metadata = helper.load_exported_model(
+                export_path, return_metadata=True
+            )
+            parity = export.check_parity(model, exported, inputs)
+
+        self.assertLess(max(parity.values()), 1e-4)
+        self.assertEqual(metadata, {"scoring_mode": "sample"})
+
+    def test_exported_scoring_mode(self):
+        """Test that an export is only used for the latent sampling it was traced with."""
+        sampled = {"scoring_mode": "sample"}
+        for mode, matches in (("sample", True), ("average", True), ("mean", False)):
+            config = SimpleNamespace(scoring_mode=mode)
+            self.assertEqual(helper.exported_scoring_matches(sampled, config), matches)
+        self.assertTrue(
+            helper.exported_scoring_matches(
+                {"scoring_mode": "mean"}, SimpleNamespace(scoring_mode="mean")
+            )
+        )
+        self.assertFalse(
+            helper.exported_scoring_matches({}, SimpleNamespace(scoring_mode="sample"))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
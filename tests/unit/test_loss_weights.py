@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the shared loss-weight registry.
+
+These tests verify that loss functions share the registry's weight tensors
+and that parameters annealed by the AnnealingManager reach the losses.
+"""
+
+import unittest
+from types import SimpleNamespace
+
+import torch
+
+from bead.src.utils.annealing import AnnealingManager
+from bead.src.utils.loss import LossWeights, VAEFlowSupConLoss, VAELoss
+
+
+class TestLossWeights(unittest.TestCase):
+    """Test the loss-weight registry and its integration with annealing."""
+
+    def setUp(self):
+        """Set up a config with an annealed reg_param."""
+        self.config = SimpleNamespace(
+            epochs=10,
+            reg_param=0.001,
+            contrastive_weight=0.005,
+            contrastive_temperature=0.07,
+            annealing_params={
+                "reg_param": {
+                    "strategy": "SCHEDULED",
+                    "schedule": {1: 0.01},
+                }
+            },
+        )
+        self.config.loss_weights = LossWeights(self.config)
+
+    def test_losses_share_weights(self):
+        """Test that every loss holds the same tensor for the same config attribute."""
+        vae_loss = VAELoss(self.config)
+        flow_loss = VAEFlowSupConLoss(self.config)
+        self.assertIs(vae_loss.kl_weight, flow_loss.vaeflow_loss_fn.kl_weight)
+        self.assertIs(
+            flow_loss.contrastive_weight, self.config.loss_weights.get("contrastive_weight")
+        )
+        self.assertAlmostEqual(vae_loss.kl_weight.item(), 0.001, places=6)
+
+    def test_annealing_reaches_loss(self):
+        """Test that an annealed reg_param changes the loss value without rebuilding the loss."""
+        vae_loss = VAELoss(self.config)
+        manager = AnnealingManager(self.config)
+
+        torch.manual_seed(0)
+        recon, target = torch.randn(4, 3), torch.randn(4, 3)
+        mu, logvar = torch.randn(4, 2), torch.randn(4, 2)
+        before, reco, kl = vae_loss.calculate(recon, target, mu, logvar, None, None)
+
+        manager.step(epoch=1)
+
+        self.assertEqual(self.config.reg_param, 0.01)
+        self.assertAlmostEqual(vae_loss.kl_weight.item(), 0.01, places=6)
+        after, _, _ = vae_loss.calculate(recon, target, mu, logvar, None, None)
+        torch.testing.assert_close(after, reco + 0.01 * kl)
+        self.assertNotAlmostEqual(before.item(), after.item())
+
+    def test_missing_registry_is_attached(self):
+        """Test that losses built without a registry share one attached to the config."""
+        config = SimpleNamespace(reg_param=0.002)
+        first, second = VAELoss(config), VAELoss(config)
+        self.assertIs(first.kl_weight, second.kl_weight)
+        self.assertIsInstance(config.loss_weights, LossWeights)
+
+
+if __name__ == "__main__":
+    unittest.main()
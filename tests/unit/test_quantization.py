@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the int8 dynamic quantization of CPU inference.
+
+These tests verify that the Linear layers are quantized and that the accuracy
+guardrail accepts or rejects the quantized model according to its tolerances.
+"""
+
+import unittest
+from types import SimpleNamespace
+
+import torch
+import torch.nn as nn
+
+from bead.src.utils import helper, quantization
+from bead.src.utils.loss import VAELoss
+
+
+class TestQuantization(unittest.TestCase):
+    """Test the quantized model and its accuracy checks."""
+
+    def setUp(self):
+        torch.manual_seed(0)
+        config = SimpleNamespace(
+            model_name="ConvVAE",
+            model_init="xavier",
+            latent_space_size=4,
+            reg_param=0.001,
+        )
+        self.model = helper.model_init([1, 1, 6, 4], config).eval()
+        self.loss_fn = VAELoss(config)
+        self.inputs = torch.cat([torch.randn(64, 1, 6, 4), 3 * torch.randn(64, 1, 6, 4)])
+        self.labels = torch.cat([torch.zeros(64), torch.ones(64)])
+
+    def test_linear_layers_are_quantized(self):
+        """Test that no fp32 Linear layer is left and the outputs keep their shapes."""
+        quantized = quantization.quantize_model(self.model)
+        self.assertFalse(any(type(m) is nn.Linear for m in quantized.modules()))
+        with torch.no_grad():
+            outputs = quantized(self.inputs)
+        self.assertEqual(outputs[0].shape, self.inputs.shape)
+
+    def test_guardrail(self):
+        """Test that the quantized model is rejected only beyond the tolerances."""
+        quantized = quantization.quantize_model(self.model)
+        report = quantization.check_quantization(
+            self.model,
+            quantized,
+            self.loss_fn,
+            self.inputs,
+            self.labels,
+            max_auc_drop=1.0,
+            max_score_shift=1.0,
+        )
+        self.assertTrue(report["accepted"])
+        self.assertLessEqual(report["score_shift"], 1.0)
+
+        report = quantization.check_quantization(
+            self.model,
+            quantized,
+            self.loss_fn,
+            self.inputs,
+            self.labels,
+            max_auc_drop=-1.0,
+        )
+        self.assertFalse(report["accepted"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the background score cache.
+
+These tests verify that the cache key changes with the model weights, the
+options and the inputs, and that entries round-trip and are evicted in least
+recently used order.
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+
+from bead.src.utils import score_cache
+
+
+class TestScoreCache(unittest.TestCase):
+    """Test the cache key and the cache entries."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.tmpdir.name, "model.pt")
+        with open(self.model_path, "wb") as f:
+            f.write(b"weights")
+        self.config = SimpleNamespace(model_name="ConvVAE", normalizations="pj_custom")
+        self.inputs = torch.arange(12.0).view(3, 4)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def key(self):
+        return score_cache.cache_key([self.model_path], self.config, self.inputs)
+
+    def test_key_changes_with_model_options_and_inputs(self):
+        """Test that every part of the key invalidates the cached scores."""
+        key = self.key()
+        self.assertEqual(key, self.key())
+
+        self.inputs[0, 0] = -1.0
+        inputs_key = self.key()
+        self.config.scoring_mode = "mean"
+        options_key = self.key()
+        with open(self.model_path, "wb") as f:
+            f.write(b"retrained")
+        model_key = self.key()
+        self.assertEqual(len({key, inputs_key, options_key, model_key}), 4)
+
+    def test_round_trip_and_eviction(self):
+        """Test that entries are loaded back and only the most recent ones are kept."""
+        cache = score_cache.ScoreCache(
+            os.path.join(self.tmpdir.name, "cache"), max_entries=2
+        )
+        scores = np.arange(3, dtype=np.float32)
+        cache.save("a", {"loss": scores})
+        self.assertIsNone(cache.load("a", ["loss", "mu"]))
+        np.testing.assert_array_equal(cache.load("a", ["loss"])["loss"], scores)
+
+        time.sleep(0.01)
+        cache.save("b", {"loss": scores})
+        time.sleep(0.01)
+        cache.load("a", ["loss"])
+        time.sleep(0.01)
+        cache.save("c", {"loss": scores})
+        self.assertIsNone(cache.load("b", ["loss"]))
+        self.assertIsNotNone(cache.load("a", ["loss"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
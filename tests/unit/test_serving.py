@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the scoring server of the serve mode.
+
+These tests verify that scores returned over the socket match direct scoring,
+that concurrent requests are coalesced into micro-batches, and that events of
+the wrong shape are answered with an error.
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+
+from bead.src.utils import evaluation, serving
+from bead.src.utils.loss import VAELoss
+from tests.unit.stub_models import TinyVAE
+
+
+class TestScoringServer(unittest.TestCase):
+    """Test the server, the micro-batching and the client."""
+
+    def setUp(self):
+        torch.manual_seed(0)
+        self.model = TinyVAE().eval()
+        self.loss_fn = VAELoss(SimpleNamespace(reg_param=0.001))
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.address = "unix:" + os.path.join(self.tmpdir.name, "serve.sock")
+        self.batcher = serving.MicroBatcher(
+            self.model,
+            self.loss_fn,
+            torch.device("cpu"),
+            max_batch_size=1000,
+            max_delay_ms=200,
+        )
+        self.server = serving.make_server(self.address, self.batcher, (4,))
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.batcher.close()
+        self.tmpdir.cleanup()
+
+    def test_concurrent_requests_are_batched(self):
+        """Test that concurrent requests share micro-batches and get their own scores."""
+        requests = [torch.randn(n, 4) for n in (3, 5, 7, 1)]
+
+        def score(events):
+            with serving.ScoringClient(self.address) as client:
+                return client.score(events)
+
+        with ThreadPoolExecutor(len(requests)) as pool:
+            responses = list(pool.map(score, requests))
+
+        self.assertLess(len(self.batcher.batch_sizes), len(requests))
+        for events, scores in zip(requests, responses, strict=True):
+            expected = evaluation.score_events(
+                self.model, self.loss_fn, events, device=torch.device("cpu")
+            )
+            self.assertEqual(scores.shape, (len(events), len(expected)))
+            for i, name in enumerate(self.loss_fn.component_names):
+                np.testing.assert_allclose(scores[:, i], expected[name], rtol=1e-5)
+
+    def test_wrong_event_shape(self):
+        """Test that a wrong event size is reported and the connection stays usable."""
+        with serving.ScoringClient(self.address) as client:
+            with self.assertRaises(RuntimeError):
+                client.score(np.zeros((2, 3)))
+            self.assertEqual(client.score(np.zeros((2, 4))).shape[0], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the streaming output sinks.
+
+These tests verify that batches are written into the right rows of the
+memory-mapped outputs, that shuffled training batches are mapped back to
+dataset rows, and that scalar log-det-jacobians are broadcast per event.
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, RandomSampler, TensorDataset
+
+from bead.src.utils.sinks import (
+    INFERENCE_OUTPUTS,
+    LATENT_NAMES,
+    EpochLatentRecorder,
+    MemmapSink,
+    RecordingSampler,
+    latents_to_numpy,
+)
+
+
+class TestSinks(unittest.TestCase):
+    """Test the memory-mapped sinks and the last-epoch recorder."""
+
+    def setUp(self):
+        """Set up a temporary output directory and a small dataset."""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.paths = {
+            name: os.path.join(self.tmp_dir.name, f"train_{name}_data.npy")
+            for name in LATENT_NAMES
+        }
+        self.num_rows = 10
+        self.latent_dim = 3
+        # Each event's latent is its own row index, so the row mapping can be checked
+        self.data = torch.arange(self.num_rows, dtype=torch.float32).unsqueeze(1)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.tmp_dir.cleanup()
+
+    def _latents(self, inputs):
+        mu = inputs.repeat(1, self.latent_dim)
+        return mu, -mu, 0, mu + 1, mu + 2
+
+    def test_latents_to_numpy_broadcasts_scalar_ldj(self):
+        """Test that a scalar log-det-jacobian becomes one value per event."""
+        arrays = latents_to_numpy(*self._latents(self.data[:4]))
+        self.assertEqual(arrays["log_det_jacobian"].shape, (4,))
+        self.assertEqual(arrays["mu"].shape, (4, self.latent_dim))
+        self.assertEqual(arrays["mu"].dtype, np.float32)
+
+    def test_inference_outputs_are_nested(self):
+        """Test that every inference output setting adds to the previous one."""
+        self.assertEqual(INFERENCE_OUTPUTS["scores"], ())
+        self.assertEqual(set(INFERENCE_OUTPUTS["latents"]), set(LATENT_NAMES))
+        self.assertEqual(
+            set(INFERENCE_OUTPUTS["all"]) - set(INFERENCE_OUTPUTS["latents"]),
+            {"reconstructed"},
+        )
+
+    def test_memmap_sink_writes_rows(self):
+        """Test that batches written out of order end up in the right rows."""
+        sink = MemmapSink(self.paths, self.num_rows)
+        sink.write(slice(5, 10), latents_to_numpy(*self._latents(self.data[5:])))
+        sink.write(slice(0, 5), latents_to_numpy(*self._latents(self.data[:5])))
+        sink.close()
+
+        mu = np.load(self.paths["mu"])
+        self.assertEqual(mu.shape, (self.num_rows, self.latent_dim))
+        np.testing.assert_array_equal(mu[:, 0], np.arange(self.num_rows))
+        np.testing.assert_array_equal(
+            np.load(self.paths["zk"]), mu + 2
+        )
+
+    def test_sinks_write_into_allocated_files(self):
+        """Test that sinks with create=False fill in the rows of allocated files."""
+        parent = MemmapSink(self.paths, self.num_rows)
+        parent.write(slice(0, 1), latents_to_numpy(*self._latents(self.data[:1])))
+        parent.close()
+
+        for start, stop in ((1, 6), (6, self.num_rows)):
+            shard = MemmapSink(self.paths, self.num_rows, create=False)
+            shard.write(
+                slice(start, stop),
+                latents_to_numpy(*self._latents(self.data[start:stop])),
+            )
+            shard.close()
+
+        np.testing.assert_array_equal(
+            np.load(self.paths["mu"])[:, 0], np.arange(self.num_rows)
+        )
+
+    def test_epoch_recorder_maps_shuffled_batches(self):
+        """Test that shuffled batches are written to their dataset rows and drops are tracked."""
+        dataset = TensorDataset(self.data, torch.zeros(self.num_rows))
+        sampler = RecordingSampler(RandomSampler(dataset))
+        loader = DataLoader(dataset, batch_size=3, sampler=sampler, drop_last=True)
+        sink = MemmapSink(self.paths, self.num_rows)
+        recorder = EpochLatentRecorder(sink, sampler, 3, self.num_rows)
+
+        for batch_idx, (inputs, _) in enumerate(loader):
+            recorder(batch_idx, *self._latents(inputs))
+
+        # 10 events with batch size 3 and drop_last leaves one event unseen
+        self.assertEqual(recorder.consumed.sum(), 9)
+        missing = np.flatnonzero(~recorder.consumed)
+        sink.write(missing, latents_to_numpy(*self._latents(self.data[missing])))
+        sink.close()
+
+        mu = np.load(self.paths["mu"])
+        np.testing.assert_array_equal(mu[:, 0], np.arange(self.num_rows))
+
+
+if __name__ == "__main__":
+    unittest.main()
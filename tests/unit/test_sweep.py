@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the hyperparameter sweep and the batched model evaluation.
+
+These tests verify the grid and random expansion of a sweep space, the
+collection of config values passed to the trials, the successive-halving
+decisions, and that batched per-event losses match the losses of one event at
+a time used by inference.
+"""
+
+import multiprocessing
+import unittest
+from types import SimpleNamespace
+
+import torch
+
+from bead.src.utils import helper, sweep
+from bead.src.utils.loss import VAELoss
+
+
+class TestSweepSpace(unittest.TestCase):
+    """Test the expansion of sweep spaces into trials."""
+
+    def test_grid_search(self):
+        """Test that the grid covers every combination once."""
+        trials = sweep.grid_search({"lr": [0.1, 0.01], "latent_space_size": [4, 8, 16]})
+        self.assertEqual(len(trials), 6)
+        self.assertIn({"lr": 0.01, "latent_space_size": 16}, trials)
+
+    def test_grid_search_rejects_ranges(self):
+        """Test that a continuous range cannot be used in a grid."""
+        with self.assertRaises(ValueError):
+            sweep.grid_search({"lr": {"low": 1e-4, "high": 1e-2}})
+
+    def test_random_search(self):
+        """Test that random draws respect choices, ranges and the seed."""
+        space = {
+            "model_name": ["ConvVAE", "Planar_ConvVAE"],
+            "lr": {"low": 1e-4, "high": 1e-2, "log": True},
+            "latent_space_size": {"low": 4, "high": 16},
+        }
+        trials = sweep.random_search(space, 20, seed=1)
+        self.assertEqual(len(trials), 20)
+        for trial in trials:
+            self.assertIn(trial["model_name"], space["model_name"])
+            self.assertTrue(1e-4 <= trial["lr"] <= 1e-2)
+            self.assertIsInstance(trial["latent_space_size"], int)
+        self.assertEqual(trials, sweep.random_search(space, 20, seed=1))
+
+    def test_config_to_dict_drops_runtime_attributes(self):
+        """Test that DDP ranks and loss weights are not passed on to the trials."""
+        config = SimpleNamespace(lr=0.1, is_ddp_active=True, rank=3, loss_weights=None)
+        self.assertEqual(helper.config_to_dict(config), {"lr": 0.1})
+
+
+class TestSuccessiveHalving(unittest.TestCase):
+    """Test the rungs and pruning decisions of the successive-halving scheduler."""
+
+    def setUp(self):
+        self.manager = multiprocessing.Manager()
+
+    def tearDown(self):
+        self.manager.shutdown()
+
+    def test_rungs(self):
+        """Test that rungs grow geometrically and stay below the full epochs."""
+        scheduler = sweep.SuccessiveHalving(
+            self.manager, max_epochs=30, min_epochs=1, reduction_factor=3
+        )
+        self.assertEqual(scheduler.rungs, [1, 3, 9, 27])
+
+    def test_prunes_worse_trials(self):
+        """Test that trials outside the best fraction of a rung are stopped."""
+        scheduler = sweep.SuccessiveHalving(
+            self.manager, max_epochs=10, min_epochs=2, reduction_factor=2
+        )
+        self.assertTrue(scheduler(1, 5.0))  # No rung
+        self.assertTrue(scheduler(2, 1.0))  # First trial at the rung
+        self.assertFalse(scheduler(2, 3.0))
+        self.assertEqual(scheduler.stopped_at, 2)
+        self.assertTrue(scheduler(2, 0.5))
+        self.assertFalse(scheduler(4, float("nan")))
+
+
+class TestPerEventLoss(unittest.TestCase):
+    """Test the batched per-event loss components."""
+
+    def test_matches_single_event_losses(self):
+        """Test that per-event components match a batch size of 1."""
+        torch.manual_seed(0)
+        loss_fn = VAELoss(SimpleNamespace(reg_param=0.001))
+        target, recon = torch.randn(5, 1, 6, 4), torch.randn(5, 1, 6, 4)
+        mu, logvar = torch.randn(5, 3), torch.randn(5, 3)
+        parameters = [torch.randn(2, 2)]
+
+        batched = loss_fn.calculate_per_event(
+            recon=recon,
+            target=target,
+            mu=mu,
+            logvar=logvar,
+            zk=mu,
+            parameters=parameters,
+            log_det_jacobian=0,
+            generator_labels=None,
+        )
+
+        for i in range(5):
+            single = loss_fn.calculate(
+                recon=recon[i : i + 1],
+                target=target[i : i + 1],
+                mu=mu[i : i + 1],
+                logvar=logvar[i : i + 1],
+                zk=mu[i : i + 1],
+                parameters=parameters,
+            )
+            for batched_component, component in zip(batched, single, strict=True):
+                self.assertTrue(
+                    torch.allclose(batched_component[i], component, atol=1e-6)
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
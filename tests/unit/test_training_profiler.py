@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the sampled training profiler.
+
+These tests verify that only sampled steps are recorded phase by phase and
+that the epoch summary is written to the JSONL output.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from bead.src.utils.diagnostics import TrainingProfiler
+
+
+class TestTrainingProfiler(unittest.TestCase):
+    """Test the step sampling and the JSONL records."""
+
+    def _run_epoch(self, profiler, steps, batch_size=8):
+        profiler.epoch_begin()
+        for step in range(steps):
+            profiler.step_begin(0, step)
+            for phase in TrainingProfiler.PHASES[1:]:
+                with profiler.phase(phase):
+                    pass
+            profiler.step_end(batch_size)
+        return profiler.epoch_end(0)
+
+    def test_sampled_records(self):
+        """Test that every n-th step and one epoch summary are written."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            profiler = TrainingProfiler(tmp_dir, sample_every=3, world_size=2)
+            epoch_record = self._run_epoch(profiler, steps=7)
+            profiler.close()
+
+            with open(os.path.join(tmp_dir, "results", "training_profile.jsonl")) as f:
+                records = [json.loads(line) for line in f]
+
+        steps = [r for r in records if r["type"] == "step"]
+        self.assertEqual([r["step"] for r in steps], [0, 3, 6])
+        for phase in TrainingProfiler.PHASES:
+            self.assertIn(f"{phase}_ms", steps[0])
+        self.assertEqual(records[-1], epoch_record)
+        self.assertEqual(epoch_record["samples"], 56)
+        self.assertEqual(epoch_record["sampled_steps"], 3)
+        # The CPU peak RSS covers the process lifetime, it is not reported as an epoch peak
+        self.assertIn("process_peak_rss_mb", epoch_record)
+        self.assertNotIn("peak_memory_mb", epoch_record)
+        self.assertAlmostEqual(
+            epoch_record["global_samples_per_s"], 2 * epoch_record["samples_per_s"]
+        )
+
+    def test_disabled_is_noop(self):
+        """Test that a disabled profiler writes nothing and returns no record."""
+        profiler = TrainingProfiler(enabled=False)
+        self.assertIsNone(self._run_epoch(profiler, steps=3))
+        profiler.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
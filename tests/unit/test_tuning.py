@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Unit tests for gradient accumulation and the batch size finder.
+
+These tests verify that accumulating micro-batches gives the same update as
+one large batch, that the batch size finder and the batch settings
+recommendation respect their bounds, and that the CPU tuning grid and
+DataLoader settings are consistent.
+"""
+
+import os
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import torch
+from torch.utils.data import DataLoader, TensorDataset
+
+from bead.src.trainers.training import fit
+from bead.src.utils import helper, tuning
+from bead.src.utils.loss import VAELoss
+from tests.unit.stub_models import TinyVAE
+
+
+class TestGradientAccumulation(unittest.TestCase):
+    """Test that accumulated micro-batches match one large batch."""
+
+    def _train_one_step(self, batch_size, accumulation_steps, data):
+        torch.manual_seed(0)
+        model = TinyVAE()
+        config = SimpleNamespace(
+            use_amp=False,
+            reg_param=0.001,
+            gradient_accumulation_steps=accumulation_steps,
+        )
+        loader = DataLoader(
+            TensorDataset(data, torch.zeros(len(data))), batch_size=batch_size
+        )
+        optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+        fit(
+            config,
+            model,
+            loader,
+            VAELoss(config),
+            optimizer,
+            torch.device("cpu"),
+            helper.get_grad_scaler(config, torch.device("cpu")),
+            is_ddp_active=False,
+            local_rank=0,
+            epoch_num=0,
+        )
+        return model
+
+    def test_accumulated_update_matches_large_batch(self):
+        """Test that 2 micro-batches of 4 give the update of one batch of 8."""
+        data = torch.randn(8, 4)
+        large = self._train_one_step(8, 1, data)
+        accumulated = self._train_one_step(4, 2, data)
+        for p_large, p_acc in zip(
+            large.parameters(), accumulated.parameters(), strict=True
+        ):
+            self.assertTrue(torch.allclose(p_large, p_acc, atol=1e-6))
+
+
+class TestBatchSizeFinder(unittest.TestCase):
+    """Test the batch size search and the recommended settings."""
+
+    def test_find_batch_size_is_bounded(self):
+        """Test that the search stays within the bounds and leaves the model untouched."""
+        model = TinyVAE()
+        weights = model.encoder.weight.clone()
+        config = SimpleNamespace(use_amp=False, reg_param=0.001, batch_size=2)
+        dataset = helper.CustomDataset(torch.randn(64, 4), torch.zeros(64))
+
+        search = tuning.find_batch_size(
+            model, VAELoss(config), config, dataset, torch.device("cpu"), steps=1
+        )
+
+        self.assertLessEqual(search["batch_size"], 64)
+        self.assertGreaterEqual(search["batch_size"], 2)
+        self.assertIn(search["stop_reason"], ("max_batch_size", "throughput_knee"))
+        self.assertTrue(torch.equal(model.encoder.weight, weights))
+
+    def test_recommend_batch_settings(self):
+        """Test splitting an effective batch into batch size and accumulation steps."""
+        self.assertEqual(tuning.recommend_batch_settings(256, 1000), (250, 4))
+        self.assertEqual(tuning.recommend_batch_settings(1024, 512), (512, 1))
+
+
+class TestCPUTuning(unittest.TestCase):
+    """Test the CPU settings grid, the synthetic data and the DataLoader arguments."""
+
+    def test_grid_only_pins_with_spare_cores(self):
+        """Test that affinity pinning is only tried when cores are left for the workers."""
+        grid = tuning.cpu_settings_grid(8)
+        self.assertTrue(all(set(tuning.CPU_SETTINGS) == set(s) for s in grid))
+        self.assertFalse(
+            any(s["cpu_affinity"] and s["torch_threads"] == 8 for s in grid)
+        )
+        self.assertFalse(
+            any(s["persistent_workers"] and s["dataloader_workers"] == 0 for s in grid)
+        )
+
+    @unittest.skipUnless(hasattr(os, "sched_setaffinity"), "needs CPU affinity support")
+    def test_affinity_splits_given_cores(self):
+        """Test that pinning splits the given cores, not the current (narrowed) affinity."""
+        config = SimpleNamespace(torch_threads=2, cpu_affinity=True)
+        threads = torch.get_num_threads()
+        try:
+            with mock.patch.object(helper.os, "sched_setaffinity") as set_affinity:
+                worker_cores = helper.apply_cpu_settings(config, cores=[4, 5, 6, 7])
+        finally:
+            torch.set_num_threads(threads)
+        set_affinity.assert_called_once_with(0, [4, 5])
+        self.assertEqual(worker_cores, [6, 7])
+        self.assertEqual(config.allowed_cores, [4, 5, 6, 7])
+
+    def test_core_blocks_of_given_cores(self):
+        """Test that process pools split the cores recorded before pinning."""
+        blocks, per_worker = helper.get_core_blocks(2, cores=[0, 1, 2, 3, 4])
+        self.assertEqual(blocks, [[0, 1], [2, 3]])
+        self.assertEqual(per_worker, 2)
+        blocks, _ = helper.get_core_blocks(3, cores=[0, 1])
+        self.assertEqual(blocks, [None, None, None])
+
+    def test_synthetic_dataset_shape(self):
+        """Test that the synthetic inputs have the shape of the configured model."""
+        config = SimpleNamespace(
+            input_level="constituent",
+            input_features="4momentum",
+            num_jets=3,
+            num_constits=15,
+            model_name="Planar_ConvVAE",
+        )
+        dataset = tuning.synthetic_dataset(config, 10)
+        self.assertEqual(tuple(dataset.data.shape), (10, 1, 45, 4))
+
+    def test_dataloader_kwargs(self):
+        """Test the worker settings and the parallel_workers fallback."""
+        config = SimpleNamespace(parallel_workers=0, dataloader_workers=-1)
+        kwargs = helper.get_dataloader_kwargs(config, torch.device("cpu"))
+        self.assertEqual(kwargs["num_workers"], 0)
+        self.assertNotIn("prefetch_factor", kwargs)
+
+        config = SimpleNamespace(
+            dataloader_workers=2,
+            persistent_workers=True,
+            prefetch_factor=4,
+            dataloader_worker_cores=[2, 3],
+        )
+        kwargs = helper.get_dataloader_kwargs(config, torch.device("cpu"))
+        self.assertEqual(kwargs["num_workers"], 2)
+        self.assertTrue(kwargs["persistent_workers"])
+        self.assertEqual(kwargs["worker_init_fn"].keywords["cores"], [2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the validation cadence of training.
+
+These tests verify which epochs end with a full validation and that the
+per-step callback of `fit` runs once per optimizer step.
+"""
+
+import unittest
+from types import SimpleNamespace
+
+import torch
+from torch.utils.data import DataLoader, TensorDataset
+
+from bead.src.trainers.training import fit, is_full_validation_epoch
+from bead.src.utils import helper
+from bead.src.utils.loss import VAELoss
+from tests.unit.stub_models import TinyVAE
+
+
+class TestValidationCadence(unittest.TestCase):
+    """Test the full-validation epochs and the step callback."""
+
+    def test_full_validation_epochs(self):
+        """Test that checkpoints, intermittent saves and the last epoch validate fully."""
+        config = SimpleNamespace(
+            epochs=10,
+            checkpointing=True,
+            checkpoint_patience=4,
+            intermittent_model_saving=True,
+            intermittent_saving_patience=3,
+        )
+        full = [e + 1 for e in range(10) if is_full_validation_epoch(config, e)]
+        self.assertEqual(full, [3, 4, 6, 8, 9, 10])
+
+        config.checkpointing, config.intermittent_model_saving = False, False
+        full = [e + 1 for e in range(10) if is_full_validation_epoch(config, e)]
+        self.assertEqual(full, [10])
+
+    def test_step_callback_per_optimizer_step(self):
+        """Test that the callback runs after every optimizer step, not every micro-batch."""
+        config = SimpleNamespace(
+            use_amp=False, reg_param=0.001, gradient_accumulation_steps=2
+        )
+        model = TinyVAE()
+        loader = DataLoader(
+            TensorDataset(torch.randn(10, 4), torch.zeros(10)), batch_size=2
+        )
+        steps = []
+        fit(
+            config,
+            model,
+            loader,
+            VAELoss(config),
+            torch.optim.SGD(model.parameters(), lr=0.1),
+            torch.device("cpu"),
+            helper.get_grad_scaler(config, torch.device("cpu")),
+            is_ddp_active=False,
+            local_rank=0,
+            epoch_num=0,
+            step_callback=lambda: steps.append(1),
+        )
+        # 5 micro-batches in groups of 2, 2 and 1
+        self.assertEqual(len(steps), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()